@@ -0,0 +1,82 @@
+"""
+Measures the memory a cached plugin keeps with tracemalloc: the whole compiled
+plugin and the compiled functions on their own, per plugin and per function.
+
+    python -m benchmarks.bench_function_records --paths 1000
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from benchmarks.bench_ref_resolver import build_large_openapi_doc
+from openplugin.core.functions import Functions
+from openplugin.core.plugin import PluginBuilder
+from openplugin.core.plugin_cache import compile_plugin
+
+
+def measure(func) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    result = func()
+    wall_time = time.perf_counter() - start_time
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "result": result,
+        "wall_time_seconds": round(wall_time, 4),
+        "retained_bytes": current,
+        "peak_bytes": peak,
+    }
+
+
+def compile_functions(plugin) -> Functions:
+    functions = Functions()
+    functions.add_from_plugin_operations(plugin)
+    functions.precompute_json()
+    return functions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paths", type=int, default=1000)
+    parser.add_argument("--schemas", type=int, default=50)
+    args = parser.parse_args()
+
+    openapi_doc_obj = build_large_openapi_doc(args.paths, args.schemas)
+    compiled = measure(
+        lambda: compile_plugin(
+            "bench", lambda: PluginBuilder.build_from_openapi_doc_obj(openapi_doc_obj)
+        )
+    )
+    plugin = compiled["result"].plugin
+    functions = measure(lambda: compile_functions(plugin))
+    function_count = len(functions["result"].functions)
+    property_count = sum(
+        len(function.param_properties or [])
+        for function in functions["result"].functions
+    )
+
+    results = {
+        "paths": args.paths,
+        "functions": function_count,
+        "properties": property_count,
+        "compiled_plugin": {
+            "wall_time_seconds": compiled["wall_time_seconds"],
+            "retained_mb": round(compiled["retained_bytes"] / (1024 * 1024), 2),
+            "peak_mb": round(compiled["peak_bytes"] / (1024 * 1024), 2),
+        },
+        "functions_only": {
+            "wall_time_seconds": functions["wall_time_seconds"],
+            "retained_mb": round(functions["retained_bytes"] / (1024 * 1024), 2),
+            "bytes_per_function": functions["retained_bytes"] // max(function_count, 1),
+        },
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compares the peak memory of compiling a large openapi doc file in full with the
+streaming mode, which decodes it in chunks and resolves one operation at a time.
+The generated doc is inlined like most large vendor specs, --keep-refs keeps its
+components instead.
+
+    python -m benchmarks.bench_openapi_stream --paths 1000
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_ref_resolver import build_large_openapi_doc
+from openplugin.core.plugin import PluginBuilder
+from openplugin.core.plugin_cache import compile_plugin
+from openplugin.core.ref_resolver import resolve_refs
+
+
+def compile_in_full(openapi_doc_file: str):
+    return compile_plugin(
+        "full", lambda: PluginBuilder.build_from_openapi_doc_file(openapi_doc_file)
+    )
+
+
+def compile_streaming(openapi_doc_file: str):
+    return compile_plugin(
+        "streaming",
+        lambda: PluginBuilder.build_from_openapi_doc_file(
+            openapi_doc_file, streaming=True
+        ),
+        resolve_per_operation=True,
+    )
+
+
+def measure(func, openapi_doc_file: str) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    result = func(openapi_doc_file)
+    wall_time = time.perf_counter() - start_time
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        "wall_time_seconds": round(wall_time, 4),
+        "retained_memory_mb": round(current / (1024 * 1024), 2),
+        "peak_memory_mb": round(peak / (1024 * 1024), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paths", type=int, default=1000)
+    parser.add_argument("--schemas", type=int, default=50)
+    parser.add_argument("--keep-refs", action="store_true")
+    args = parser.parse_args()
+
+    openapi_doc_obj = build_large_openapi_doc(args.paths, args.schemas)
+    if not args.keep_refs:
+        openapi_doc_obj = resolve_refs(openapi_doc_obj)
+        del openapi_doc_obj["components"]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        openapi_doc_file = os.path.join(tmp_dir, "openapi.json")
+        with open(openapi_doc_file, "w") as file:
+            json.dump(openapi_doc_obj, file)
+        del openapi_doc_obj
+
+        assert (
+            compile_in_full(openapi_doc_file).functions.get_litellm_json()
+            == compile_streaming(openapi_doc_file).functions.get_litellm_json()
+        )
+
+        results = {
+            "paths": args.paths,
+            "schemas": args.schemas,
+            "doc_size_mb": round(os.path.getsize(openapi_doc_file) / (1024 * 1024), 2),
+            "full": measure(compile_in_full, openapi_doc_file),
+            "streaming": measure(compile_streaming, openapi_doc_file),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Compares the single-pass $ref resolver with jsonref + to_plain_dict on a large
+generated openapi doc with heavy component reuse.
+
+    python -m benchmarks.bench_ref_resolver --paths 2000
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+import jsonref
+
+from openplugin.core.ref_resolver import resolve_refs, to_plain_dict
+
+
+def build_large_openapi_doc(path_count: int = 2000, schema_count: int = 50) -> dict:
+    schemas = {}
+    for i in range(schema_count):
+        properties: dict = {
+            f"field_{j}": {"type": "string", "description": f"Field {j} of {i}"}
+            for j in range(10)
+        }
+        # schemas embed the next ones of their group, so refs nest a few levels
+        for j in range(1, 3):
+            if i % 5 + j < 5 and i + j < schema_count:
+                properties[f"child_{j}"] = {
+                    "$ref": f"#/components/schemas/Schema{i + j}"
+                }
+        properties["tags"] = {
+            "type": "array",
+            "items": {"$ref": "#/components/schemas/Tag"},
+        }
+        schemas[f"Schema{i}"] = {"type": "object", "properties": properties}
+    schemas["Tag"] = {
+        "type": "object",
+        "properties": {"name": {"type": "string"}, "value": {"type": "string"}},
+    }
+
+    paths = {}
+    for i in range(path_count):
+        schema_ref = {"$ref": f"#/components/schemas/Schema{i % schema_count}"}
+        paths[f"/resource_{i}/{{id}}"] = {
+            "get": {
+                "operationId": f"getResource{i}",
+                "summary": f"Get resource {i}",
+                "parameters": [
+                    {"$ref": "#/components/parameters/Id"},
+                    {"$ref": "#/components/parameters/Limit"},
+                ],
+                "responses": {
+                    "200": {
+                        "description": "ok",
+                        "content": {"application/json": {"schema": schema_ref}},
+                    }
+                },
+            },
+            "post": {
+                "operationId": f"updateResource{i}",
+                "summary": f"Update resource {i}",
+                "parameters": [{"$ref": "#/components/parameters/Id"}],
+                "requestBody": {
+                    "content": {"application/json": {"schema": schema_ref}}
+                },
+                "responses": {
+                    "200": {
+                        "description": "ok",
+                        "content": {"application/json": {"schema": schema_ref}},
+                    }
+                },
+            },
+        }
+
+    return {
+        "openapi": "3.0.1",
+        "info": {"title": "Large benchmark API", "version": "1.0.0"},
+        "servers": [{"url": "https://api.example.com"}],
+        "x-openplugin": {"name": "Large benchmark API", "schemaVersion": "0.0.1"},
+        "paths": paths,
+        "components": {
+            "parameters": {
+                "Id": {
+                    "name": "id",
+                    "in": "path",
+                    "required": True,
+                    "schema": {"type": "string"},
+                },
+                "Limit": {
+                    "name": "limit",
+                    "in": "query",
+                    "schema": {"type": "integer", "default": 10},
+                },
+            },
+            "schemas": schemas,
+        },
+    }
+
+
+def resolve_with_jsonref(openapi_doc_obj: dict):
+    return to_plain_dict(jsonref.JsonRef.replace_refs(openapi_doc_obj))
+
+
+def measure(func, openapi_doc_obj: dict, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start_time = time.perf_counter()
+        result = func(openapi_doc_obj)
+        timings.append(time.perf_counter() - start_time)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = func(openapi_doc_obj)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        "wall_time_seconds_min": round(min(timings), 4),
+        "wall_time_seconds_mean": round(sum(timings) / len(timings), 4),
+        "peak_memory_mb": round(peak / (1024 * 1024), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paths", type=int, default=2000)
+    parser.add_argument("--schemas", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    openapi_doc_obj = build_large_openapi_doc(args.paths, args.schemas)
+    assert resolve_refs(openapi_doc_obj) == resolve_with_jsonref(openapi_doc_obj)
+
+    results = {
+        "paths": args.paths,
+        "schemas": args.schemas,
+        "doc_size_mb": round(len(json.dumps(openapi_doc_obj)) / (1024 * 1024), 2),
+        "jsonref": measure(resolve_with_jsonref, openapi_doc_obj, args.repeat),
+        "ref_resolver": measure(resolve_refs, openapi_doc_obj, args.repeat),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Builds the checked-in openapi doc corpus the benchmark suite runs against. The
+docs are generated deterministically, rerun this after changing a generator:
+
+    python -m benchmarks.corpus
+"""
+import json
+import os
+from typing import Callable, Dict, List
+
+from benchmarks.bench_ref_resolver import build_large_openapi_doc
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+
+def build_ref_heavy_openapi_doc(path_count: int = 200, schema_count: int = 40) -> dict:
+    """
+    Request bodies composed with allOf of shared base schemas, parameters and
+    responses by $ref and schemas nesting each other a few levels deep.
+    """
+    schemas: Dict[str, dict] = {
+        "Audit": {
+            "type": "object",
+            "properties": {
+                "created_at": {"type": "string", "format": "date-time"},
+                "updated_at": {"type": "string", "format": "date-time"},
+                "owner": {"$ref": "#/components/schemas/Owner"},
+            },
+        },
+        "Owner": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                "email": {"type": "string", "format": "email"},
+                "tags": {
+                    "type": "array",
+                    "items": {"$ref": "#/components/schemas/Tag"},
+                },
+            },
+        },
+        "Tag": {
+            "type": "object",
+            "properties": {"name": {"type": "string"}, "value": {"type": "string"}},
+        },
+    }
+    for i in range(schema_count):
+        properties: Dict[str, dict] = {
+            f"field_{j}": {
+                "type": "string",
+                "description": f"Field {j} of entity {i}",
+                "enum": [f"value_{k}" for k in range(j % 4 + 1)],
+            }
+            for j in range(8)
+        }
+        if i + 1 < schema_count:
+            properties["next"] = {"$ref": f"#/components/schemas/Entity{i + 1}Base"}
+        schemas[f"Entity{i}Base"] = {
+            "type": "object",
+            "required": ["field_0"],
+            "properties": properties,
+        }
+        related = f"#/components/schemas/Entity{(i + 7) % schema_count}Base"
+        schemas[f"Entity{i}"] = {
+            "allOf": [
+                {"$ref": f"#/components/schemas/Entity{i}Base"},
+                {"$ref": "#/components/schemas/Audit"},
+                {
+                    "type": "object",
+                    "properties": {
+                        "related": {
+                            "type": "array",
+                            "items": {"$ref": related},
+                        }
+                    },
+                },
+            ]
+        }
+
+    paths = {}
+    for i in range(path_count):
+        entity = f"#/components/schemas/Entity{i % schema_count}"
+        paths[f"/entities_{i}/{{id}}"] = {
+            "get": {
+                "operationId": f"getEntity{i}",
+                "summary": f"Get entity {i}",
+                "parameters": [
+                    {"$ref": "#/components/parameters/Id"},
+                    {"$ref": "#/components/parameters/Expand"},
+                ],
+                "responses": {"200": {"$ref": "#/components/responses/Entity"}},
+            },
+            "put": {
+                "operationId": f"replaceEntity{i}",
+                "summary": f"Replace entity {i}",
+                "parameters": [{"$ref": "#/components/parameters/Id"}],
+                "requestBody": {
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "allOf": [
+                                    {"$ref": entity},
+                                    {
+                                        "type": "object",
+                                        "properties": {
+                                            "reason": {"type": "string"},
+                                        },
+                                    },
+                                ]
+                            }
+                        }
+                    }
+                },
+                "responses": {"200": {"$ref": "#/components/responses/Entity"}},
+            },
+        }
+
+    return {
+        "openapi": "3.0.1",
+        "info": {"title": "Ref heavy benchmark API", "version": "1.0.0"},
+        "servers": [{"url": "https://api.example.com"}],
+        "x-openplugin": {"name": "Ref heavy benchmark API", "schemaVersion": "0.0.1"},
+        "paths": paths,
+        "components": {
+            "parameters": {
+                "Id": {
+                    "name": "id",
+                    "in": "path",
+                    "required": True,
+                    "schema": {"type": "string"},
+                },
+                "Expand": {
+                    "name": "expand",
+                    "in": "query",
+                    "schema": {"type": "array", "items": {"type": "string"}},
+                },
+            },
+            "responses": {
+                "Entity": {
+                    "description": "ok",
+                    "content": {
+                        "application/json": {
+                            "schema": {"$ref": "#/components/schemas/Entity0"}
+                        }
+                    },
+                }
+            },
+            "schemas": schemas,
+        },
+    }
+
+
+CORPUS: Dict[str, Callable[[], dict]] = {
+    "tiny": lambda: build_large_openapi_doc(5, 5),
+    "paths_100": lambda: build_large_openapi_doc(100, 50),
+    "paths_1k": lambda: build_large_openapi_doc(1000, 50),
+    "ref_heavy": lambda: build_ref_heavy_openapi_doc(),
+}
+
+
+def get_corpus_file(name: str) -> str:
+    return os.path.join(CORPUS_DIR, f"{name}.json")
+
+
+def load_corpus_doc(name: str) -> dict:
+    with open(get_corpus_file(name), "r") as file:
+        return json.load(file)
+
+
+def get_corpus_names() -> List[str]:
+    return list(CORPUS)
+
+
+def write_corpus():
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    for name, build in CORPUS.items():
+        with open(get_corpus_file(name), "w") as file:
+            json.dump(build(), file, separators=(",", ":"))
+            file.write("\n")
+
+
+if __name__ == "__main__":
+    write_corpus()
@@ -0,0 +1,247 @@
+"""
+Offline benchmark suite of plugin compilation over the checked-in corpus. Each
+stage of each doc runs in its own process, so peak RSS is not carried over
+from the previous one. Results are written as json, --compare exits non-zero
+when a stage got slower or allocates more than --max-regression allows.
+
+    python -m benchmarks.run_suite --output results.json
+    python -m benchmarks.run_suite --compare baseline.json --max-regression 0.2
+"""
+import argparse
+import copy
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from benchmarks.corpus import get_corpus_file, get_corpus_names, load_corpus_doc
+from openplugin.core.config import Config
+from openplugin.core.execution.implementations.operation_execution_with_imprompt import (  # noqa: E501
+    OperationExecutionWithImprompt,
+)
+from openplugin.core.execution.operation_execution import OperationExecutionParams
+from openplugin.core.function_providers import FunctionProviders
+from openplugin.core.functions import Functions
+from openplugin.core.plugin import PluginBuilder
+
+# metrics compared by --compare, lower is better
+COMPARED_METRICS = ("wall_time_seconds_min", "allocated_peak_mb")
+
+
+def get_peak_rss_mb() -> float:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def build_plugin(openapi_doc_obj: dict):
+    return PluginBuilder.build_from_openapi_doc_obj(copy.deepcopy(openapi_doc_obj))
+
+
+def build_functions(openapi_doc_obj: dict) -> Functions:
+    functions = Functions()
+    functions.add_from_plugin(build_plugin(openapi_doc_obj))
+    return functions
+
+
+# each stage prepares its input untimed and returns the call to measure
+def prepare_build_plugin(openapi_doc_obj: dict) -> Callable:
+    doc = copy.deepcopy(openapi_doc_obj)
+    return lambda: PluginBuilder.build_from_openapi_doc_obj(doc)
+
+
+def prepare_add_from_plugin(openapi_doc_obj: dict) -> Callable:
+    plugin = build_plugin(openapi_doc_obj)
+
+    def run():
+        functions = Functions()
+        functions.add_from_plugin(plugin)
+        return functions
+
+    return run
+
+
+def prepare_get_litellm_json(openapi_doc_obj: dict) -> Callable:
+    functions = build_functions(openapi_doc_obj)
+    return functions.get_litellm_json
+
+
+def prepare_get_missing_required_parameter(openapi_doc_obj: dict) -> Callable:
+    plugin = build_plugin(openapi_doc_obj)
+    params = OperationExecutionParams(
+        config=Config(),
+        api="",
+        path="",
+        method="",
+        query_params={},
+        body=None,
+        header={},
+        response_obj_200=None,
+        function_provider=FunctionProviders.build().get_default_provider(),
+        plugin_op_property_map=plugin.plugin_op_property_map,
+        operation_index=plugin.operation_index,
+    )
+    # validating params copies the property map, copies share it instead
+    executions = [
+        OperationExecutionWithImprompt(
+            params.model_copy(update={"api": path, "path": path, "method": method})
+        )
+        for path, method_map in (plugin.plugin_op_property_map or {}).items()
+        for method in method_map
+    ]
+    return lambda: [
+        execution.get_missing_required_parameter() for execution in executions
+    ]
+
+
+STAGES: Dict[str, Callable[[dict], Callable]] = {
+    "build_from_openapi_doc_obj": prepare_build_plugin,
+    "add_from_plugin": prepare_add_from_plugin,
+    "get_litellm_json": prepare_get_litellm_json,
+    "get_missing_required_parameter": prepare_get_missing_required_parameter,
+}
+
+
+def run_stage(corpus_name: str, stage: str, repeat: int) -> dict:
+    openapi_doc_obj = load_corpus_doc(corpus_name)
+    prepare = STAGES[stage]
+    rss_before_mb = get_peak_rss_mb()
+
+    timings = []
+    for _ in range(repeat):
+        run = prepare(openapi_doc_obj)
+        gc.collect()
+        start_time = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - start_time)
+        del run, result
+
+    run = prepare(openapi_doc_obj)
+    gc.collect()
+    tracemalloc.start()
+    result = run()
+    retained, peak = tracemalloc.get_traced_memory()
+    blocks = sum(
+        stat.count for stat in tracemalloc.take_snapshot().statistics("filename")
+    )
+    tracemalloc.stop()
+    del run, result
+
+    peak_rss_mb = get_peak_rss_mb()
+    return {
+        "wall_time_seconds_min": round(min(timings), 5),
+        "wall_time_seconds_mean": round(sum(timings) / len(timings), 5),
+        "allocated_peak_mb": round(peak / (1024 * 1024), 3),
+        "retained_mb": round(retained / (1024 * 1024), 3),
+        "retained_blocks": blocks,
+        "peak_rss_mb": round(peak_rss_mb, 2),
+        "peak_rss_increase_mb": round(peak_rss_mb - rss_before_mb, 2),
+    }
+
+
+def run_in_process(corpus_name: str, stage: str, repeat: int) -> dict:
+    # fork where possible, so children skip importing everything again
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_stage, corpus_name, stage, repeat).result()
+
+
+def get_openplugin_version():
+    try:
+        from importlib.metadata import version
+
+        return version("openplugin")
+    except Exception:
+        return None
+
+
+def run_suite(corpus_names: List[str], stages: List[str], repeat: int) -> dict:
+    results: Dict[str, dict] = {}
+    for corpus_name in corpus_names:
+        openapi_doc_obj = load_corpus_doc(corpus_name)
+        results[corpus_name] = {
+            "doc_size_bytes": os.path.getsize(get_corpus_file(corpus_name)),
+            "paths": len(openapi_doc_obj.get("paths", {})),
+            "stages": {},
+        }
+        for stage in stages:
+            print(f"[BENCHMARK] corpus={corpus_name}, stage={stage}", file=sys.stderr)
+            results[corpus_name]["stages"][stage] = run_in_process(
+                corpus_name, stage, repeat
+            )
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "openplugin_version": get_openplugin_version(),
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    """
+    Metrics that grew more than max_regression (0.2 is 20%) over the baseline,
+    for the docs and stages found in both results.
+    """
+    regressions = []
+    for corpus_name, corpus_result in current["results"].items():
+        baseline_stages = (
+            baseline.get("results", {}).get(corpus_name, {}).get("stages", {})
+        )
+        for stage, metrics in corpus_result["stages"].items():
+            for metric in COMPARED_METRICS:
+                before = baseline_stages.get(stage, {}).get(metric)
+                after = metrics.get(metric)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before
+                if change > max_regression:
+                    regressions.append(
+                        f"{corpus_name}.{stage}.{metric}: {before} -> {after} (+{change:.0%})"  # noqa: E501
+                    )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--corpus", nargs="*", default=get_corpus_names())
+    parser.add_argument("--stages", nargs="*", default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="file to write the results to")
+    parser.add_argument("--compare", help="results of a previous run")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run_suite(args.corpus, args.stages, args.repeat)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"[BENCHMARK-REGRESSION] {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import ast
-import asyncio
 import base64
 import json
 from typing import Dict, List, Optional, Tuple, Type
@@ -19,6 +18,8 @@ from langchain_core.tools import ToolException
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
 
+from ...core.helper import run_sync
+from ...core.manifest_fetcher import manifest_fetcher
 from ..agent_actions import InpResponse
 from ..agent_execution import (
     AgentExecution,
@@ -56,31 +57,22 @@ def run_plugin(
     selected_operations=None,
     session_variables=None,
 ):
-    from ...core.config import Config
-    from ...utils.run_plugin_pipeline import run_pipeline
-
-    if header is None:
-        header = {}
-    config = Config(**config)
-    selected_operations = None
-    response = asyncio.run(
-        run_pipeline(
-            openapi_doc_obj=None,
-            openapi_doc_url=openapi_doc_url,
+    # sync tool runs have no event loop to await in, async agents use arun_plugin
+    return run_sync(
+        arun_plugin(
             prompt=prompt,
+            openapi_doc_url=openapi_doc_url,
             header=header,
-            function_provider_name=function_provider_name,
-            conversation=conversation,
-            auth_query_param=auth_query_param,
             config=config,
-            run_all_output_modules=False,
             enable_ui_form_controls=enable_ui_form_controls,
-            session_variables=session_variables,
+            auth_query_param=auth_query_param,
+            conversation=conversation,
+            function_provider_name=function_provider_name,
             output_module_names=output_module_names,
-            selected_operations=selected_operations,
+            selected_operations=None,
+            session_variables=session_variables,
         )
     )
-    return response
 
 
 async def arun_plugin(
@@ -188,8 +180,12 @@ def build_agent_executor(
     tool_map: Dict[str, Dict] = {}
     openplugin_tools_by_name = {}
     openplugin_tools_by_url = {}
-    for tool_input in tools_input:
-        openplugin_json = requests.get(tool_input["openapi_doc_url"]).json()
+    # download every tool's doc at once instead of one after another
+    manifests = manifest_fetcher.fetch_all(
+        [tool_input["openapi_doc_url"] for tool_input in tools_input]
+    )
+    for tool_input, manifest in zip(tools_input, manifests):
+        openplugin_json = manifest.get_json()
         name = openplugin_json.get("x-openplugin", {}).get("name")
         plugin_key = None
         if tool_key_map:
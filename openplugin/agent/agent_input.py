@@ -2,9 +2,10 @@ import json
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
-from httpx import request
 from pydantic import BaseModel, Field, model_validator
 
+from openplugin.core.manifest_fetcher import manifest_fetcher
+
 from .agent_templates import get_langchain_openai_agent_template
 
 
@@ -71,7 +72,7 @@ class AgentManifest(BaseModel):
         if isinstance(data, dict):
             agent_url = data.get("agent_url")
             if agent_url:
-                agent_json = request("GET", agent_url).json()
+                agent_json = manifest_fetcher.fetch_json(agent_url)
                 data["name"] = agent_json.get("name")
                 data["instruction"] = agent_json.get("instruction")
                 data["tools"] = agent_json.get("tools")
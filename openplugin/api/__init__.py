@@ -11,8 +11,11 @@ from openplugin.api import (
     helpers,
     info,
     plugin_execution_pipeline,
+    plugin_registry,
     processors,
 )
+from openplugin.core.plugin_registry import preload_plugin_registry
+from openplugin.core.plugin_snapshot import load_snapshot_from_env
 
 
 # Define a function to create the FastAPI application
@@ -66,6 +69,10 @@ def create_app(root_path: Optional[str] = None) -> FastAPI:
     router.include_router(function_providers.router)
     router.include_router(helpers.router)
     router.include_router(agent_execution_pipeline.router)
+    router.include_router(plugin_registry.router)
     app.include_router(router, prefix=API_PREFIX)
 
+    load_snapshot_from_env()
+    preload_plugin_registry()
+
     return app
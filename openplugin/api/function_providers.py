@@ -2,13 +2,14 @@ import os
 from typing import Dict, List, Optional
 
 from fastapi import APIRouter, HTTPException
-from httpx import request
 from pydantic import BaseModel
 
 from openplugin.core import FunctionProvider, FunctionProviders
 from openplugin.core.config import Config
-from openplugin.core.functions import Functions
-from openplugin.core.plugin import PluginBuilder
+from openplugin.core.llm_client_pool import llm_client_pool
+from openplugin.core.manifest_fetcher import manifest_fetcher
+from openplugin.core.plugin_cache import compiled_plugin_cache
+from openplugin.core.provider_limiter import provider_limiter
 
 router = APIRouter(
     dependencies=[],
@@ -63,7 +64,7 @@ def get_function_providers(
 
     default_fp = os.environ.get("DEFAULT_FUNCTION_PROVIDER", "OpenAI [gpt-4]")
     if openplugin_manifest_url is not None:
-        openplugin_manifest_json = request("GET", openplugin_manifest_url).json()
+        openplugin_manifest_json = manifest_fetcher.fetch_json(openplugin_manifest_url)
         if openplugin_manifest_json.get("default_function_provider") is not None:
             default_fp = openplugin_manifest_json.get("default_function_provider")
 
@@ -81,6 +82,28 @@ def get_function_providers(
         raise HTTPException(status_code=404, detail="Function provider not found.")
 
 
+@router.get(
+    "/function-providers/client-pool",
+    tags=["function-providers"],
+    description=(
+        "Endpoint to retrieve the hit rate and connections of pooled LLM clients"
+    ),
+)
+def get_llm_client_pool_stats():
+    return llm_client_pool.get_stats()
+
+
+@router.get(
+    "/function-providers/rate-limits",
+    tags=["function-providers"],
+    description=(
+        "Endpoint to retrieve the queue depth and wait times of provider rate limits"
+    ),
+)
+def get_provider_rate_limit_stats():
+    return provider_limiter.get_stats()
+
+
 class FunctionProviderResponse(BaseModel):
     fc_request_json: List[Dict]
 
@@ -94,10 +117,8 @@ class FunctionProviderResponse(BaseModel):
 def get_function_provider_request(function_provider_name: str, openapi_doc_url: str):
     try:
         function_providers.get_by_name(function_provider_name)
-        functions = Functions()
-        plugin = PluginBuilder.build_from_openapi_doc_url(openapi_doc_url)
-        functions.add_from_plugin(plugin)
-        function_json = functions.get_json()
+        compiled_plugin = compiled_plugin_cache.get_or_compile_from_url(openapi_doc_url)
+        function_json = compiled_plugin.functions.get_json()
         return FunctionProviderResponse(fc_request_json=function_json)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed: {e}")
@@ -127,12 +148,10 @@ def run_function_provider(run_function_input: RunFunctionInput):
             run_function_input.function_provider_name
         )
         if run_function_input.function_json is None:
-            functions = Functions()
-            plugin = PluginBuilder.build_from_openapi_doc_url(
+            compiled_plugin = compiled_plugin_cache.get_or_compile_from_url(
                 run_function_input.openapi_doc_url
             )
-            functions.add_from_plugin(plugin)
-            function_json = functions.get_json()
+            function_json = compiled_plugin.functions.get_json()
         func_response = function_provider.run(
             run_function_input.prompt, function_json, run_function_input.config
         )
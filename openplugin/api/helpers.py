@@ -1,13 +1,16 @@
 import traceback
+from typing import List, Optional
 
 import requests
 from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.security.api_key import APIKey
 from pydantic import BaseModel
 
 from openplugin.api import auth
 from openplugin.core.functions import Functions
-from openplugin.core.plugin import PluginBuilder
+from openplugin.core.plugin_cache import compiled_plugin_cache
+from openplugin.core.plugin_validation import is_http_url, validate_plugins
 
 # Create a FastAPI router instance
 router = APIRouter(
@@ -31,10 +34,45 @@ def plugin_validator(
     openapi_doc_url: dict = Body(None),
     api_key: APIKey = Depends(auth.get_api_key),
 ):
-    plugin = PluginBuilder.build_from_openapi_doc_obj(openapi_doc_url)
+    # editors validate on every change, the cache recompiles only the
+    # operations that changed since the previous version of the plugin
+    plugin = compiled_plugin_cache.get_or_compile(openapi_doc_url).plugin
     return PluginValidationResponse(message="Plugin is valid.", plugin_name=plugin.name)
 
 
+@router.post(
+    "/plugin-validator/batch",
+    tags=["plugin-validator"],
+    description=(
+        "Endpoint to validate many plugin manifests in parallel, results are "
+        "streamed as NDJSON"
+    ),
+)
+def plugin_validator_batch(
+    openapi_doc_objs: Optional[List[dict]] = Body(None),
+    openapi_doc_urls: Optional[List[str]] = Body(None),
+    api_key: APIKey = Depends(auth.get_api_key),
+):
+    sources: list = [*(openapi_doc_objs or []), *(openapi_doc_urls or [])]
+    if not sources:
+        raise HTTPException(
+            status_code=400,
+            detail="Either openapi_doc_objs or openapi_doc_urls is required",
+        )
+    # local files are only validated from the cli, never for api callers
+    invalid_urls = [url for url in openapi_doc_urls or [] if not is_http_url(url)]
+    if invalid_urls:
+        raise HTTPException(
+            status_code=400,
+            detail=f"openapi_doc_urls must be http(s) urls: {invalid_urls}",
+        )
+    results = (
+        result.model_dump_json() + "\n"
+        for result in validate_plugins(sources, allow_files=False)
+    )
+    return StreamingResponse(results, media_type="application/x-ndjson")
+
+
 class FunctionResponse(BaseModel):
     message: str
     functions: dict
@@ -12,11 +12,12 @@ from pydantic import BaseModel, Field
 from openplugin.api import auth
 from openplugin.core.config import Config
 from openplugin.core.function_providers import FunctionProviders
-from openplugin.core.plugin import PluginBuilder
+from openplugin.core.plugin_cache import compiled_plugin_cache
 from openplugin.core.plugin_execution_pipeline import (
     PluginExecutionPipeline,
     PluginExecutionPipelineError,
 )
+from openplugin.core.plugin_registry import PluginRegistryError, plugin_registry
 from openplugin.core.port import Port, PortType
 
 # Create a FastAPI router instance
@@ -57,9 +58,10 @@ class PluginExecutionResponse(BaseModel):
     tags=["plugin-execution-pipeline"],
     description="Enpoint to run a plugin pipeline",
 )
-def plugin_execution_pipeline(
+async def plugin_execution_pipeline(
     openapi_doc_url: Optional[str] = Body(None),
     openapi_doc_obj: Optional[dict] = Body(None),
+    plugin_id: Optional[str] = Body(None),
     prompt: str = Body(...),
     header: dict = Body(...),
     function_provider_input: Optional[FunctionProviderInput] = Body(
@@ -82,18 +84,30 @@ def plugin_execution_pipeline(
     try:
         pipeline = None
         input = Port(data_type=PortType.TEXT, value=prompt)
-        if openapi_doc_obj is not None:
-            plugin_obj = PluginBuilder.build_from_openapi_doc_obj(openapi_doc_obj)
+        # fetching and compiling are blocking, keep them off the event loop
+        if plugin_id is not None:
+            compiled_plugin = await asyncio.to_thread(plugin_registry.get, plugin_id)
+            plugin_obj = compiled_plugin.plugin
+        elif openapi_doc_obj is not None:
+            compiled_plugin = await asyncio.to_thread(
+                compiled_plugin_cache.get_or_compile, openapi_doc_obj
+            )
+            plugin_obj = compiled_plugin.plugin
         elif openapi_doc_url is not None:
             if openapi_doc_url.startswith("http"):
-                plugin_obj = PluginBuilder.build_from_openapi_doc_url(openapi_doc_url)
+                compiled_plugin = await asyncio.to_thread(
+                    compiled_plugin_cache.get_or_compile_from_url, openapi_doc_url
+                )
             else:
-                plugin_obj = PluginBuilder.build_from_openapi_doc_file(openapi_doc_url)
+                compiled_plugin = await asyncio.to_thread(
+                    compiled_plugin_cache.get_or_compile_from_file, openapi_doc_url
+                )
+            plugin_obj = compiled_plugin.plugin
         else:
             return JSONResponse(
                 status_code=400,
                 content={
-                    "message": "Either openapi_doc_url URL or openapi_doc_obj is required"
+                    "message": "Either plugin_id, openapi_doc_url URL or openapi_doc_obj is required"  # noqa: E501
                 },
             )
 
@@ -110,22 +124,21 @@ def plugin_execution_pipeline(
         json_data = {}
         error = None
         trace: Dict[Any, Any] = {"steps": []}
-        response_obj = asyncio.run(
-            pipeline.start(
-                input=input,
-                config=config,
-                function_provider=function_providers.get_by_name(
-                    function_provider_input.name
-                ),
-                header=header,
-                auth_query_param=auth_query_param,
-                output_module_names=output_module_names,
-                run_all_output_modules=run_all_output_modules,
-                conversation=conversation,
-                selected_operations=selected_operations,
-                enable_ui_form_controls=enable_ui_form_controls,
-                session_variables=session_variables,
-            )
+        # awaited in the server loop, the pooled llm clients are bound to it
+        response_obj = await pipeline.start(
+            input=input,
+            config=config,
+            function_provider=function_providers.get_by_name(
+                function_provider_input.name
+            ),
+            header=header,
+            auth_query_param=auth_query_param,
+            output_module_names=output_module_names,
+            run_all_output_modules=run_all_output_modules,
+            conversation=conversation,
+            selected_operations=selected_operations,
+            enable_ui_form_controls=enable_ui_form_controls,
+            session_variables=session_variables,
         )
         json_data = response_obj.model_dump(
             exclude={"output_ports__type_object", "output_ports__value"}
@@ -149,6 +162,8 @@ def plugin_execution_pipeline(
             "trace": trace,
         }
         return response
+    except PluginRegistryError as e:
+        return JSONResponse(status_code=e.status_code, content={"message": e.message})
     except PluginExecutionPipelineError as e:
         traceback.print_exc()
         error = {"message": e.message}
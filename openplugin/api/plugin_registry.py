@@ -0,0 +1,89 @@
+import traceback
+from typing import List, Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.security.api_key import APIKey
+from pydantic import BaseModel
+
+from openplugin.api import auth
+from openplugin.core.plugin_registry import (
+    PluginRegistryError,
+    RegisteredPlugin,
+    plugin_registry,
+)
+
+# Create a FastAPI router instance
+router = APIRouter(
+    dependencies=[],
+    responses={404: {"description": "Not found"}},
+)
+
+
+class PluginListResponse(BaseModel):
+    plugins: List[RegisteredPlugin]
+    stats: dict
+
+
+@router.post(
+    "/plugins",
+    tags=["plugin-registry"],
+    description="Enpoint to register a plugin manifest once and get its plugin_id",
+    response_model=RegisteredPlugin,
+)
+def register_plugin(
+    openapi_doc_url: Optional[str] = Body(None),
+    openapi_doc_obj: Optional[dict] = Body(None),
+    api_key: APIKey = Depends(auth.get_api_key),
+):
+    try:
+        if openapi_doc_obj is not None:
+            return plugin_registry.register(openapi_doc_obj)
+        if openapi_doc_url is not None:
+            return plugin_registry.register_from_url(openapi_doc_url)
+    except PluginRegistryError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=400, detail=f"Failed to register plugin. {e}")
+    raise HTTPException(
+        status_code=400,
+        detail="Either openapi_doc_url URL or openapi_doc_obj is required",
+    )
+
+
+@router.get(
+    "/plugins",
+    tags=["plugin-registry"],
+    description="Enpoint to list registered plugins",
+    response_model=PluginListResponse,
+)
+def list_plugins(api_key: APIKey = Depends(auth.get_api_key)):
+    return PluginListResponse(
+        plugins=plugin_registry.list(), stats=plugin_registry.get_stats()
+    )
+
+
+@router.get(
+    "/plugins/{plugin_id}",
+    tags=["plugin-registry"],
+    description="Enpoint to get a registered plugin",
+    response_model=RegisteredPlugin,
+)
+def get_plugin(plugin_id: str, api_key: APIKey = Depends(auth.get_api_key)):
+    try:
+        return plugin_registry.get_registration(plugin_id)
+    except PluginRegistryError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+
+@router.delete(
+    "/plugins/{plugin_id}",
+    tags=["plugin-registry"],
+    description="Enpoint to remove a registered plugin",
+    response_model=RegisteredPlugin,
+)
+def unregister_plugin(plugin_id: str, api_key: APIKey = Depends(auth.get_api_key)):
+    try:
+        return plugin_registry.unregister(plugin_id)
+    except PluginRegistryError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
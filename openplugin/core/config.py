@@ -23,6 +23,20 @@ class Config(BaseModel):
     aws_region_name: Optional[str] = None
     azure_api_key: Optional[str] = None
     groq_api_key: Optional[str] = None
+    # operations sent to the llm per request, see Functions.get_shortlist
+    shortlist_top_k: Optional[int] = None
+    shortlist_min_score: Optional[float] = None
+    # tokens of x-few-shot-examples sent per request
+    few_shot_token_budget: Optional[int] = None
+    # reuse function calling responses of repeated requests, see
+    # FunctionResponseCache, None follows OPENPLUGIN_FUNCTION_RESPONSE_CACHE_ENABLED
+    cache_function_response: Optional[bool] = None
+    # name of a function provider the signature step is also sent to when the
+    # selected one is slower than usual, see arun_hedged
+    hedge_function_provider: Optional[str] = None
+    # stream the signature step and start the api call as soon as the tool
+    # call arguments are complete, replaces hedging when both are set
+    stream_function_call: Optional[bool] = None
 
     def replace_missing_with_system_keys(self):
         if not self.openai_api_key and os.environ.get("OPENAI_API_KEY"):
@@ -0,0 +1,112 @@
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from .function_compaction import DEFAULT_TOKEN_MODEL, count_json_tokens
+from .operation_ranker import FunctionIndexCache, tokenize
+
+DEFAULT_FEW_SHOT_TOKEN_BUDGET = int(
+    os.environ.get("OPENPLUGIN_FEW_SHOT_TOKEN_BUDGET", 0)
+)
+
+
+class SelectedExample(BaseModel):
+    function_name: str
+    prompt: Optional[str] = None
+    similarity: float
+    tokens: int
+
+
+class ExampleSelection(BaseModel):
+    token_budget: int
+    total_examples: int
+    tokens_used: int
+    kept: List[SelectedExample] = []
+
+
+class FewShotExampleSelector:
+    """
+    TF-IDF matrix of the x-few-shot-examples of functions, one l2 normalized
+    row per example built from its prompt and function name, and the tokens
+    each example adds to the prompt.
+    """
+
+    def __init__(self, functions: Sequence, token_model: str = DEFAULT_TOKEN_MODEL):
+        self.examples: List[Tuple[str, Dict]] = [
+            (function.name, example)
+            for function in functions
+            for example in function.x_few_shot_examples or []
+        ]
+        documents = [
+            tokenize(example.get("prompt")) + tokenize(name)
+            for name, example in self.examples
+        ]
+        self.tokens = np.array(
+            [count_json_tokens(example, token_model) for _, example in self.examples],
+            dtype=np.int64,
+        )
+
+        self.vocabulary: Dict[str, int] = {}
+        for tokens in documents:
+            for token in tokens:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+        self.matrix = np.zeros((len(documents), len(self.vocabulary)))
+        for row, tokens in enumerate(documents):
+            for token in tokens:
+                self.matrix[row, self.vocabulary[token]] += 1
+        doc_freq = np.count_nonzero(self.matrix, axis=0)
+        self.idf = np.log((1 + len(documents)) / (1 + doc_freq)) + 1
+        self.matrix *= self.idf
+        norms = np.linalg.norm(self.matrix, axis=1, keepdims=True)
+        self.matrix /= np.where(norms == 0, 1, norms)
+
+    def get_similarities(self, prompt: str) -> np.ndarray:
+        query = np.zeros(len(self.vocabulary))
+        for token in tokenize(prompt):
+            index = self.vocabulary.get(token)
+            if index is not None:
+                query[index] += 1
+        query *= self.idf
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.zeros(len(self.examples))
+        return self.matrix @ (query / norm)
+
+    def select(
+        self, prompt: str, token_budget: int
+    ) -> Tuple[List[int], ExampleSelection]:
+        """
+        Indexes of the examples most similar to the prompt that fit in
+        token_budget, in their original order.
+        """
+        similarities = self.get_similarities(prompt)
+        kept: List[int] = []
+        tokens_used = 0
+        for index in np.argsort(-similarities, kind="stable"):
+            if tokens_used + self.tokens[index] <= token_budget:
+                kept.append(int(index))
+                tokens_used += int(self.tokens[index])
+        selection = ExampleSelection(
+            token_budget=token_budget,
+            total_examples=len(self.examples),
+            tokens_used=tokens_used,
+            kept=[
+                SelectedExample(
+                    function_name=self.examples[index][0],
+                    prompt=self.examples[index][1].get("prompt"),
+                    similarity=round(float(similarities[index]), 4),
+                    tokens=int(self.tokens[index]),
+                )
+                for index in kept
+            ],
+        )
+        return sorted(kept), selection
+
+
+_selector_cache = FunctionIndexCache(FewShotExampleSelector)
+
+
+def get_example_selector(functions: Sequence) -> FewShotExampleSelector:
+    return _selector_cache.get(functions)
@@ -12,6 +12,11 @@ from tenacity import RetryError, retry, stop_after_attempt, wait_random_exponent
 
 from openplugin.utils import get_llm_response_from_messages
 
+from ...operation_index import (
+    OperationIndex,
+    build_required_parameters,
+    build_x_lookup_specs,
+)
 from ..operation_execution import (
     OperationExecution,
     OperationExecutionParams,
@@ -141,35 +146,40 @@ def process_x_dep_array(
     plugin_op_property_map: Optional[Dict[str, Dict[str, Dict]]] = None,
     headers=None,
     parameter_name=None,
+    operation_index: Optional[OperationIndex] = None,
 ):
     responses = []
-    op_property = None
-    if plugin_op_property_map:
-        for p in plugin_op_property_map.keys():
-            for m in plugin_op_property_map[p].keys():
-                if p == path and m == method:
-                    op_property = plugin_op_property_map[p][m]
-
     query_params_obj: Optional[Dict[str, Any]] = None
-    if op_property and op_property.get("parameters"):
-        for prop in op_property.get("parameters", []):
-            if prop.get("in") == "query":
-                if query_params_obj is None:
-                    query_params_obj = {}
-                query_params_obj[prop.get("name")] = None
-
     body_obj: Optional[Dict[str, Any]] = None
-    if op_property and op_property.get("requestBody"):
-        body_obj = {}
-        body_properties = (
-            op_property.get("requestBody", {})
-            .get("content", {})
-            .get("application/json", {})
-            .get("schema", {})
-            .get("properties")
-        )
-        for prop in body_properties.keys():
-            body_obj[prop] = None
+    entry = operation_index.get(path, method) if operation_index else None
+    if entry is not None:
+        if entry.query_parameter_names:
+            query_params_obj = dict.fromkeys(entry.query_parameter_names)
+        if entry.operation.get("requestBody"):
+            body_obj = dict.fromkeys(entry.body_property_names)
+    else:
+        op_property = None
+        if plugin_op_property_map:
+            op_property = plugin_op_property_map.get(path, {}).get(method)
+
+        if op_property and op_property.get("parameters"):
+            for prop in op_property.get("parameters", []):
+                if prop.get("in") == "query":
+                    if query_params_obj is None:
+                        query_params_obj = {}
+                    query_params_obj[prop.get("name")] = None
+
+        if op_property and op_property.get("requestBody"):
+            body_obj = {}
+            body_properties = (
+                op_property.get("requestBody", {})
+                .get("content", {})
+                .get("application/json", {})
+                .get("schema", {})
+                .get("properties")
+            )
+            for prop in body_properties.keys():
+                body_obj[prop] = None
 
     response_json = response_json[:5]
     traces = []
@@ -337,63 +347,20 @@ class OperationExecutionWithImprompt(OperationExecution):
                 and self.params.response_obj_200
                 and isinstance(response_json, list)
             ):
-                if (
-                    self.params.response_obj_200.get("schema", {}).get("type")
-                    == "array"
-                ):
-                    items = self.params.response_obj_200.get("schema", {}).get(
-                        "items", {}
+                for x_lookup in self.get_x_lookup_specs():
+                    response_json, tracing = process_x_dep_array(
+                        response_json,
+                        self.params.response_obj_200.get("server"),
+                        x_lookup.get("path"),
+                        x_lookup.get("method"),
+                        x_lookup.get("parameter"),
+                        x_lookup.get("additional_parameters"),
+                        self.params.plugin_op_property_map,
+                        self.params.header,
+                        x_lookup.get("parameter_name"),
+                        self.params.operation_index,
                     )
-                    if items.get("x-lookup") is not None:
-                        if items.get("type") in [
-                            "string",
-                            "number",
-                            "integer",
-                            "boolean",
-                        ]:
-                            path = items.get("x-lookup").get("path")
-                            method = items.get("x-lookup").get("method")
-                            lookup_parameter = items.get("x-lookup").get("parameter")
-                            lookup_additional_parameters = items.get("x-lookup").get(
-                                "additional_parameters"
-                            )
-                            response_json, tracing = process_x_dep_array(
-                                response_json,
-                                self.params.response_obj_200.get("server"),
-                                path,
-                                method,
-                                lookup_parameter,
-                                lookup_additional_parameters,
-                                self.params.plugin_op_property_map,
-                                self.params.header,
-                            )
-                            x_lookup_tracing.extend(tracing)
-                    elif items.get("properties"):
-                        item_properties = items.get("properties", {})
-                        for item_property in item_properties:
-                            item_obj = item_properties.get(item_property)
-                            path = item_obj.get("x-lookup", {}).get("path")
-                            method = item_obj.get("x-lookup", {}).get("method")
-                            lookup_parameter = item_obj.get("x-lookup", {}).get(
-                                "parameter"
-                            )
-                            lookup_additional_parameters = item_obj.get(
-                                "x-lookup", {}
-                            ).get("additional_parameters")
-
-                            if item_obj and lookup_parameter:
-                                response_json, tracing = process_x_dep_array(
-                                    response_json,
-                                    self.params.response_obj_200.get("server"),
-                                    path,
-                                    method,
-                                    lookup_parameter,
-                                    lookup_additional_parameters,
-                                    self.params.plugin_op_property_map,
-                                    self.params.header,
-                                    item_property,
-                                )
-                                x_lookup_tracing.extend(tracing)
+                    x_lookup_tracing.extend(tracing)
         except RetryError as e:
             original_exception = e.__cause__
             raise ExecutionException(
@@ -476,76 +443,30 @@ class OperationExecutionWithImprompt(OperationExecution):
             missing_params=[],
         )
 
+    def get_x_lookup_specs(self):
+        if self.params.operation_index:
+            entry = self.params.operation_index.get(
+                self.params.path, self.params.method
+            )
+            if entry is not None:
+                return entry.x_lookups
+        return build_x_lookup_specs(self.params.response_obj_200)
+
     def get_missing_required_parameter(self):
         required_parameters = []
         try:
-            op_property = None
-            plugin_op_property_map = self.params.plugin_op_property_map
-            if plugin_op_property_map:
-                for p in plugin_op_property_map.keys():
-                    for m in plugin_op_property_map[p].keys():
-                        if p == self.params.path and m == self.params.method:
-                            op_property = plugin_op_property_map[p][m]
-            if op_property:
-                if op_property.get("parameters"):
-                    for prop in op_property.get("parameters", []):
-                        if prop.get("required"):
-                            obj = {
-                                "name": prop.get("name"),
-                                "type": prop.get("schema", {}).get("type"),
-                                "format": prop.get("schema", {}).get("format"),
-                                "description": prop.get("description"),
-                                "title": prop.get("schema", {}).get("title"),
-                            }
-                            if prop.get("schema", {}).get("enum"):
-                                obj["enum"] = prop.get("schema", {}).get("enum")
-                            if prop.get("label"):
-                                obj["label"] = prop.get("label")
-                            required_parameters.append(obj)
-
-                if op_property.get("requestBody"):
-                    body_properties = (
-                        op_property.get("requestBody", {})
-                        .get("content", {})
-                        .get("application/json", {})
-                        .get("schema", {})
-                        .get("properties")
-                    )
-                    required = (
-                        op_property.get("requestBody", {})
-                        .get("content", {})
-                        .get("application/json", {})
-                        .get("schema", {})
-                        .get("required")
-                    )
-                    for prop in body_properties.keys():
-                        pval = body_properties[prop]
-                        if pval.get("required"):
-                            obj = {
-                                "name": prop,
-                                "type": pval.get("type"),
-                                "description": pval.get("description"),
-                                "title": pval.get("title"),
-                                "format": pval.get("format"),
-                            }
-                            if pval.get("label"):
-                                obj["label"] = pval.get("label")
-                            if pval.get("enum"):
-                                obj["enum"] = pval.get("enum")
-                            required_parameters.append(obj)
-                        elif required and prop in required:
-                            obj = {
-                                "name": prop,
-                                "type": pval.get("type"),
-                                "description": pval.get("description"),
-                                "title": pval.get("title"),
-                                "format": pval.get("format"),
-                            }
-                            if pval.get("label"):
-                                obj["label"] = pval.get("label")
-                            if pval.get("enum"):
-                                obj["enum"] = pval.get("enum")
-                            required_parameters.append(obj)
+            entry = None
+            if self.params.operation_index:
+                entry = self.params.operation_index.get(
+                    self.params.path, self.params.method
+                )
+            if entry is not None:
+                required_parameters = [dict(p) for p in entry.required_parameters]
+            elif self.params.plugin_op_property_map:
+                op_property = self.params.plugin_op_property_map.get(
+                    self.params.path, {}
+                ).get(self.params.method)
+                required_parameters = build_required_parameters(op_property)
         except Exception as e:
             logger.error(f"Error: {e}")
             logger.error(f"Error: {traceback.format_exc()}")
@@ -5,6 +5,7 @@ from pydantic import BaseModel
 
 from ..config import Config
 from ..function_providers import FunctionProvider
+from ..operation_index import OperationIndex
 
 
 class OperationExecutionResponse(BaseModel):
@@ -31,6 +32,7 @@ class OperationExecutionParams(BaseModel):
     response_obj_200: Optional[dict]
     function_provider: FunctionProvider
     plugin_op_property_map: Optional[Dict[str, Dict[str, Dict]]]
+    operation_index: Optional[OperationIndex] = None
     enable_ui_form_controls: bool = True
 
     def get_temperature(self):
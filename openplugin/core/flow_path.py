@@ -11,6 +11,10 @@ from openplugin.processors import (
     ProcessorType,
     get_processor_from_str,
 )
+from openplugin.processors.processor import (
+    PROCESSOR_IMPLEMENTATION_MAP,
+    PROCESSOR_NAME_MAP,
+)
 
 from .config import Config
 from .helper import time_taken
@@ -30,29 +34,51 @@ class ProcessorNode(BaseModel):
     output_port: Port
     processor_type: ProcessorType
     processor_implementation_type: ProcessorImplementationType
-    processor: Processor
     metadata: Dict[Any, Any]
     log_title: str
 
     @root_validator(pre=True)
     def setup(cls, values):
+        # work on a copy so the openapi doc the values came from is not modified
+        values = dict(values)
         assert "input_port" in values
         values["input_port"] = convert_str_to_port(values["input_port"])
 
         assert "output_port" in values
         values["output_port"] = convert_str_to_port(values["output_port"])
 
-        values["processor"] = get_processor_from_str(
-            processor_type=values["processor_type"],
-            implementation_type=values["processor_implementation_type"],
-            metadata=values["metadata"],
+        processor_type = ProcessorType(values["processor_type"])
+        implementation_type = ProcessorImplementationType(
+            values["processor_implementation_type"]
         )
+        if PROCESSOR_IMPLEMENTATION_MAP[implementation_type] != processor_type:
+            raise ValueError(
+                "Invalid implementation type: {} for processor type: {}".format(
+                    implementation_type, processor_type
+                )
+            )
         values["log_title"] = f"[PROCESSING-FINISHED] name={values['processor_type']}"
         return values
 
+    def build_processor(self) -> Processor:
+        # the node is shared by every request using the compiled plugin, and
+        # processors keep per request state (file names, api keys), so each run
+        # builds its own processor
+        return get_processor_from_str(
+            processor_type=self.processor_type.value,
+            implementation_type=self.processor_implementation_type.value,
+            metadata=self.metadata,
+        )
+
+    def get_processor_name(self) -> str:
+        # the name the built processor would get, without importing it
+        return self.metadata.get("name") or PROCESSOR_NAME_MAP[self.processor_type]
+
     @time_taken
-    async def run_processor(self, input: Port, config: Config) -> Port:
-        return await self.processor.process(input, config)
+    async def run_processor(
+        self, processor: Processor, input: Port, config: Config
+    ) -> Port:
+        return await processor.process(input, config)
 
 
 class FlowPath(BaseModel):
@@ -67,6 +93,7 @@ class FlowPath(BaseModel):
 
     @root_validator(pre=True)
     def setup(cls, values):
+        values = dict(values)
         assert "initial_input_port" in values
         values["initial_input_port"] = convert_str_to_port(values["initial_input_port"])
         assert "finish_output_port" in values
@@ -78,27 +105,28 @@ class FlowPath(BaseModel):
         metadata = {}
         for processor in self.processors:
             if processor.metadata:
-                metadata[processor.processor.name] = processor.metadata
+                metadata[processor.get_processor_name()] = processor.metadata
         return metadata
 
     async def run(self, input: Port, config: Config) -> Port:
         port = input
         start_time = time.time()
         processor_run_log = []
-        for processor in self.processors:
+        for node in self.processors:
+            processor = node.build_processor()
             input_text = port.value
             if isinstance(input_text, dict):
                 input_text = json.dumps(input_text)
             else:
                 input_text = str(input_text)
-            port = await processor.run_processor(port, config)
+            port = await node.run_processor(processor, port, config)
 
             output_text = port.value
             if isinstance(output_text, dict):
                 output_text = json.dumps(output_text)
             else:
                 output_text = str(output_text)
-            label = f"{self.name} [{processor.processor.name}]"
+            label = f"{self.name} [{processor.name}]"
             processor_run_log.append(
                 {
                     "label": label,
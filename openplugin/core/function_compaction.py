@@ -0,0 +1,179 @@
+import copy
+import json
+import os
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import litellm
+from pydantic import BaseModel
+
+DEFAULT_TOOL_TOKEN_BUDGET = int(os.environ.get("OPENPLUGIN_TOOL_TOKEN_BUDGET", 0))
+DEFAULT_TOKEN_MODEL = os.environ.get("OPENPLUGIN_TOKEN_COUNT_MODEL", "gpt-4")
+MAX_DESCRIPTION_CHARS = 120
+MAX_ENUM_VALUES = 10
+ENUM_SAMPLE_VALUES = 3
+
+EXAMPLE_KEYS = ("example", "examples")
+
+
+def count_json_tokens(obj, token_model: str = DEFAULT_TOKEN_MODEL) -> int:
+    """
+    Tokens of the compact json of obj, counted with the local tokenizer of the
+    model, litellm falls back to tiktoken for unknown models.
+    """
+    text = json.dumps(obj, separators=(",", ":"))
+    return litellm.token_counter(model=token_model, text=text)
+
+
+class CompactionReport(BaseModel):
+    token_budget: int
+    token_model: str
+    tokens_before: int
+    tokens_after: int
+    within_budget: bool
+    stages: List[str] = []
+    removed_fields: List[str] = []
+
+
+def _get_properties(function_json: Dict) -> Dict:
+    return (function_json.get("parameters") or {}).get("properties") or {}
+
+
+def _trim(text: str) -> str:
+    trimmed = text[:MAX_DESCRIPTION_CHARS].rsplit(" ", 1)[0]
+    return trimmed.rstrip(" ,.;:") + "..."
+
+
+def drop_examples(function_json: Dict) -> List[str]:
+    removed = []
+    for name, obj in _get_properties(function_json).items():
+        for key in EXAMPLE_KEYS:
+            if key in obj:
+                del obj[key]
+                removed.append(f"parameters.properties.{name}.{key}")
+    return removed
+
+
+def trim_descriptions(function_json: Dict) -> List[str]:
+    removed = []
+    objs = [("", function_json), ("parameters.", function_json.get("parameters"))]
+    for name, obj in _get_properties(function_json).items():
+        objs.append((f"parameters.properties.{name}.", obj))
+    for prefix, obj in objs:
+        if not isinstance(obj, dict):
+            continue
+        description = obj.get("description")
+        if isinstance(description, str) and len(description) > MAX_DESCRIPTION_CHARS:
+            obj["description"] = _trim(description)
+            removed.append(f"{prefix}description")
+    return removed
+
+
+def collapse_enums(function_json: Dict) -> List[str]:
+    removed = []
+    for name, obj in _get_properties(function_json).items():
+        enum = obj.get("enum")
+        if isinstance(enum, list) and len(enum) > MAX_ENUM_VALUES:
+            del obj["enum"]
+            values = ", ".join(str(value) for value in enum[:ENUM_SAMPLE_VALUES])
+            obj["description"] = f"{obj.get('description') or ''} (e.g. {values})"
+            obj["description"] = obj["description"].strip()
+            removed.append(f"parameters.properties.{name}.enum")
+    return removed
+
+
+COMPACTION_STAGES: List[Tuple[str, Callable[[Dict], List[str]]]] = [
+    ("drop_examples", drop_examples),
+    ("trim_descriptions", trim_descriptions),
+    ("collapse_enums", collapse_enums),
+]
+
+
+def compact_function_json(
+    function_json: List[Dict],
+    token_counts: List[int],
+    optional_properties: List[Set[str]],
+    token_budget: int,
+    token_model: str = DEFAULT_TOKEN_MODEL,
+) -> Tuple[List[Dict], CompactionReport]:
+    """
+    Shrinks function json to token_budget by dropping examples, trimming
+    descriptions, collapsing long enums and finally dropping optional
+    parameters. Each stage goes through the largest functions first and stops
+    as soon as the json fits, so the json is changed no more than needed.
+    token_counts are the tokens of each function json on its own, the list is
+    measured as their sum. The given json is not modified.
+    """
+    counts = list(token_counts)
+    tokens_before = sum(counts)
+    report = CompactionReport(
+        token_budget=token_budget,
+        token_model=token_model,
+        tokens_before=tokens_before,
+        tokens_after=tokens_before,
+        within_budget=tokens_before <= token_budget,
+    )
+    if report.within_budget:
+        return function_json, report
+
+    compacted: List[Optional[Dict]] = [None] * len(function_json)
+
+    def fits() -> bool:
+        return sum(counts) <= token_budget
+
+    def get_compacted(index: int) -> Dict:
+        function = compacted[index]
+        if function is None:
+            function = copy.deepcopy(function_json[index])
+            compacted[index] = function
+        return function
+
+    def record(stage: str, index: int, removed: List[str]) -> bool:
+        if not removed:
+            return False
+        if stage not in report.stages:
+            report.stages.append(stage)
+        name = function_json[index].get("name")
+        report.removed_fields.extend(f"{name}.{field}" for field in removed)
+        counts[index] = count_json_tokens(compacted[index], token_model)
+        return fits()
+
+    order = sorted(range(len(function_json)), key=lambda i: counts[i], reverse=True)
+    done = False
+    for stage, compact in COMPACTION_STAGES:
+        for index in order:
+            if record(stage, index, compact(get_compacted(index))):
+                done = True
+                break
+        if done:
+            break
+
+    if not done:
+        for index in order:
+            function = get_compacted(index)
+            properties = _get_properties(function)
+            required = set((function.get("parameters") or {}).get("required") or [])
+            names = [
+                name
+                for name in properties
+                if name in optional_properties[index] and name not in required
+            ]
+            names.sort(key=lambda name: len(json.dumps(properties[name])), reverse=True)
+            for name in names:
+                del properties[name]
+                if record(
+                    "drop_optional_parameters",
+                    index,
+                    [f"parameters.properties.{name}"],
+                ):
+                    done = True
+                    break
+            if done:
+                break
+
+    result = [
+        function if function is not None else function_json[index]
+        for index, function in enumerate(compacted)
+    ]
+    report.tokens_after = sum(counts)
+    report.within_budget = report.tokens_after <= token_budget
+    return result, report
@@ -0,0 +1,216 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+from pydantic import BaseModel
+
+from .config import Config
+from .function_providers import FunctionProvider, FunctionResponse
+
+DEFAULT_HEDGE_PERCENTILE = float(os.environ.get("OPENPLUGIN_HEDGE_PERCENTILE", 0.9))
+DEFAULT_HEDGE_DELAY_SECONDS = float(
+    os.environ.get("OPENPLUGIN_HEDGE_DELAY_SECONDS", 3.0)
+)
+DEFAULT_HEDGE_MIN_DELAY_SECONDS = float(
+    os.environ.get("OPENPLUGIN_HEDGE_MIN_DELAY_SECONDS", 0.5)
+)
+DEFAULT_HEDGE_MIN_SAMPLES = int(os.environ.get("OPENPLUGIN_HEDGE_MIN_SAMPLES", 20))
+DEFAULT_LATENCY_WINDOW = int(os.environ.get("OPENPLUGIN_HEDGE_LATENCY_WINDOW", 200))
+
+
+class ProviderLatencies:
+    """
+    Rolling window of function calling latencies per provider. The hedge
+    delay of a provider is the percentile of its window, or default_delay
+    until min_samples latencies were seen.
+    """
+
+    def __init__(
+        self,
+        window: int = DEFAULT_LATENCY_WINDOW,
+        percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        min_samples: int = DEFAULT_HEDGE_MIN_SAMPLES,
+        default_delay: float = DEFAULT_HEDGE_DELAY_SECONDS,
+        min_delay: float = DEFAULT_HEDGE_MIN_DELAY_SECONDS,
+    ):
+        self.window = window
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider_name: str, latency_seconds: float):
+        with self._lock:
+            latencies = self._latencies.get(provider_name)
+            if latencies is None:
+                latencies = deque(maxlen=self.window)
+                self._latencies[provider_name] = latencies
+            latencies.append(latency_seconds)
+
+    def get_hedge_delay(self, provider_name: str) -> float:
+        with self._lock:
+            latencies = sorted(self._latencies.get(provider_name) or [])
+        if len(latencies) < self.min_samples:
+            return self.default_delay
+        index = min(len(latencies) - 1, int(self.percentile * len(latencies)))
+        return max(self.min_delay, latencies[index])
+
+    def clear(self):
+        with self._lock:
+            self._latencies.clear()
+
+
+provider_latencies = ProviderLatencies()
+
+
+def is_valid_tool_call(func_response: FunctionResponse, function_json) -> bool:
+    """
+    Whether the response calls one of the tools with all of its required
+    parameters.
+    """
+    if not func_response.is_function_call:
+        return False
+    arguments = func_response.detected_function_arguments
+    if not isinstance(arguments, dict):
+        return False
+    for tool in function_json or []:
+        function = tool.get("function", tool)
+        if function.get("name") == func_response.detected_function_name:
+            required = (function.get("parameters") or {}).get("required") or []
+            return all(name in arguments for name in required)
+    return False
+
+
+class HedgeAttempt(BaseModel):
+    provider: str
+    model: str
+    role: str
+    # running, won, lost, failed or cancelled
+    status: str = "running"
+    latency_seconds: Optional[float] = None
+    # time spent in the provider queue, part of latency_seconds
+    queue_wait_seconds: Optional[float] = None
+    cost: float = 0
+    total_tokens: Optional[int] = None
+    valid_tool_call: bool = False
+    error: Optional[str] = None
+
+
+class HedgingTrace(BaseModel):
+    delay_seconds: float
+    hedged: bool = False
+    winner: Optional[str] = None
+    attempts: List[HedgeAttempt] = []
+    total_cost: float = 0
+    total_tokens: int = 0
+
+
+async def arun_hedged(
+    primary: FunctionProvider,
+    secondary: FunctionProvider,
+    request_prompt: str,
+    function_json,
+    config: Optional[Config],
+    conversation: Optional[List] = [],
+    x_few_shot_examples: Optional[List] = [],
+    latencies: ProviderLatencies = provider_latencies,
+) -> Tuple[FunctionResponse, HedgingTrace]:
+    """
+    Runs the request on the primary provider and, when it has not answered
+    within its hedge delay, on the secondary provider as well. The first
+    valid tool call wins and the other attempt is cancelled. Without any, the
+    primary's response is returned. Cancelled attempts have no known cost.
+    """
+    trace = HedgingTrace(delay_seconds=latencies.get_hedge_delay(primary.name))
+    tasks: Dict[asyncio.Task, Tuple[HedgeAttempt, float]] = {}
+
+    def start(provider: FunctionProvider, role: str):
+        attempt = HedgeAttempt(
+            provider=provider.name, model=provider.get_model_name(), role=role
+        )
+        task = asyncio.ensure_future(
+            provider.arun(
+                request_prompt,
+                function_json,
+                config,
+                conversation=conversation,
+                x_few_shot_examples=x_few_shot_examples,
+            )
+        )
+        tasks[task] = (attempt, time.time())
+        trace.attempts.append(attempt)
+
+    start(primary, "primary")
+    done, pending = await asyncio.wait(list(tasks), timeout=trace.delay_seconds)
+    if not done:
+        trace.hedged = True
+        logger.info(
+            f"[FUNCTION-CALL-HEDGED] primary={primary.name}, secondary={secondary.name}, delay={round(trace.delay_seconds, 4)} seconds"  # noqa: E501
+        )
+        start(secondary, "secondary")
+        pending = set(tasks)
+
+    responses: Dict[str, FunctionResponse] = {}
+    errors: Dict[str, BaseException] = {}
+    winner: Optional[asyncio.Task] = None
+    while winner is None:
+        # the primary goes first when both finished together
+        for task in [task for task in tasks if task in done]:
+            attempt, start_time = tasks[task]
+            if attempt.status != "running":
+                continue
+            attempt.latency_seconds = time.time() - start_time
+            error = task.exception()
+            if error is not None:
+                attempt.status = "failed"
+                attempt.error = str(error)
+                errors[attempt.role] = error
+                continue
+            func_response = task.result()
+            attempt.queue_wait_seconds = func_response.queue_wait_seconds
+            # the hedge delay follows how fast the provider answers, not how
+            # long our own rate limit queued the request
+            latencies.record(
+                attempt.provider,
+                attempt.latency_seconds - (attempt.queue_wait_seconds or 0),
+            )
+            attempt.status = "lost"
+            attempt.cost = func_response.cost
+            attempt.total_tokens = func_response.total_tokens
+            attempt.valid_tool_call = is_valid_tool_call(func_response, function_json)
+            responses[attempt.role] = func_response
+            if attempt.valid_tool_call and winner is None:
+                winner = task
+        if winner is not None or not pending:
+            break
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+    # cancelled attempts are not recorded, how long they were queued is unknown
+    for task in pending:
+        attempt, start_time = tasks[task]
+        task.cancel()
+        attempt.status = "cancelled"
+        attempt.latency_seconds = time.time() - start_time
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    trace.total_cost = sum(attempt.cost for attempt in trace.attempts)
+    trace.total_tokens = sum(attempt.total_tokens or 0 for attempt in trace.attempts)
+    if winner is not None:
+        attempt = tasks[winner][0]
+        attempt.status = "won"
+        trace.winner = attempt.provider
+        return winner.result(), trace
+    for role in ["primary", "secondary"]:
+        if role in responses:
+            attempt = next(a for a in trace.attempts if a.role == role)
+            attempt.status = "won"
+            trace.winner = attempt.provider
+            return responses[role], trace
+    raise errors["primary"]
@@ -1,21 +1,61 @@
+import asyncio
+import hashlib
 import json
 import os
 import time
 import traceback
 from abc import abstractmethod
-from typing import List, Optional
+from typing import Any, Callable, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from langchain_community.callbacks import get_openai_callback
 from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from pydantic import BaseModel, validator
 
 from .config import Config
+from .llm_client_pool import LLMClientPool, hash_api_key, llm_client_pool
+from .provider_limiter import estimate_tokens, provider_limiter
 
 load_dotenv()
 
+TOGETHER_BASE_URL = "https://api.together.xyz/v1"
+DEFAULT_MAX_CACHED_CHAINS = int(
+    os.environ.get("OPENPLUGIN_LLM_CHAIN_CACHE_MAX_SIZE", 128)
+)
+
+# few-shot prompts piped into the tools bound model, per model, tools and examples
+llm_chain_cache = LLMClientPool(max_size=DEFAULT_MAX_CACHED_CHAINS)
+
+
+def compute_json_hash(obj) -> str:
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def get_streamed_tool_call(message) -> Optional[Tuple[str, dict]]:
+    """
+    Name and arguments of the first tool call of a partly streamed message,
+    once the arguments are a complete json object. Nothing streamed after the
+    closing brace can change them.
+    """
+    tool_call_chunks = getattr(message, "tool_call_chunks", None)
+    if tool_call_chunks:
+        tool_call_chunk = tool_call_chunks[0]
+        if not tool_call_chunk.get("name") or not tool_call_chunk.get("args"):
+            return None
+        try:
+            arguments = json.loads(tool_call_chunk["args"])
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(arguments, dict):
+            return None
+        return tool_call_chunk["name"], arguments
+    # models that do not stream send the whole message at once
+    if message.tool_calls:
+        return message.tool_calls[0]["name"], message.tool_calls[0]["args"]
+    return None
+
 
 class FunctionResponse(BaseModel):
     response_content: str
@@ -28,6 +68,10 @@ class FunctionResponse(BaseModel):
     detected_function_name: Optional[str] = None
     detected_function_arguments: Optional[dict] = None
     system_prompt: Optional[str] = None
+    # served by the function response cache instead of the llm
+    cached: bool = False
+    # time spent queued behind the provider's rate limits
+    queue_wait_seconds: Optional[float] = None
 
 
 class LLMConfig(BaseModel):
@@ -36,16 +80,57 @@ class LLMConfig(BaseModel):
     max_tokens: int = 4096
 
 
+# env var and config attribute of each provider's api key, env var first
+API_KEY_SOURCES = {
+    "openai": ("OPENAI_API_KEY", "openai_api_key"),
+    "openaichat": ("OPENAI_API_KEY", "openai_api_key"),
+    "mistral": ("MISTRAL_API_KEY", "mistral_api_key"),
+    "fireworks": ("FIREWORKS_API_KEY", "fireworks_api_key"),
+    "anthropic": ("ANTHROPIC_API_KEY", "anthropic_api_key"),
+    "cohere": ("COHERE_API_KEY", "cohere_api_key"),
+    "groq": ("GROQ_API_KEY", "groq_api_key"),
+    "togetherai": ("TOGETHER_API_KEY", "together_api_key"),
+}
+
+
 class FunctionLLM(BaseModel):
     provider: str
     model_name: str
     configuration: LLMConfig
 
+    def get_api_key(self, config: Optional[Config]) -> Optional[str]:
+        source = API_KEY_SOURCES.get(self.provider.lower())
+        if source is None:
+            return None
+        env_var, config_attr = source
+        if os.environ.get(env_var) is not None:
+            return os.environ[env_var]
+        if config is not None:
+            return getattr(config, config_attr, None)
+        return None
+
     def get_callback_manager(self):
         if self.provider.lower() in ["openai", "openaichat"]:
             return get_openai_callback()
         return None
 
+    def _get_pooled_client(
+        self, api_key: Optional[str], base_url: Optional[str], build: Callable
+    ):
+        key = (
+            self.provider.lower(),
+            self.model_name,
+            hash_api_key(api_key),
+            base_url,
+            self.configuration.temperature,
+            self.configuration.max_tokens,
+        )
+        try:
+            loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        return llm_client_pool.get(key, build, loop=loop)
+
     def convert_to_langchain_llm_model(self, config: Optional[Config]):
         if self.provider.lower() in ["openai", "openaichat"]:
             from langchain_openai import ChatOpenAI
@@ -56,10 +141,14 @@ class FunctionLLM(BaseModel):
                 openai_api_key = config.openai_api_key
             else:
                 raise Exception("OpenAI API Key not found")
-            return ChatOpenAI(
-                model=self.model_name,
-                temperature=self.configuration.temperature,
-                api_key=openai_api_key,
+            return self._get_pooled_client(
+                openai_api_key,
+                None,
+                lambda: ChatOpenAI(
+                    model=self.model_name,
+                    temperature=self.configuration.temperature,
+                    api_key=openai_api_key,
+                ),
             )
         elif self.provider.lower() == "mistral":
             from langchain_mistralai.chat_models import ChatMistralAI
@@ -70,11 +159,15 @@ class FunctionLLM(BaseModel):
                 mistral_api_key = config.mistral_api_key
             else:
                 raise Exception("MISTRAL_API_KEY API Key not found")
-            return ChatMistralAI(
-                model=self.model_name,
-                temperature=self.configuration.temperature,
-                max_tokens=self.configuration.max_tokens,
-                mistral_api_key=mistral_api_key,
+            return self._get_pooled_client(
+                mistral_api_key,
+                None,
+                lambda: ChatMistralAI(
+                    model=self.model_name,
+                    temperature=self.configuration.temperature,
+                    max_tokens=self.configuration.max_tokens,
+                    mistral_api_key=mistral_api_key,
+                ),
             )
         elif self.provider.lower() == "fireworks":
             from langchain_fireworks import ChatFireworks
@@ -85,11 +178,15 @@ class FunctionLLM(BaseModel):
                 fireworks_api_key = config.fireworks_api_key
             else:
                 raise Exception("Fireworks API Key not found")
-            return ChatFireworks(
-                model=self.model_name,
-                temperature=self.configuration.temperature,
-                max_tokens=self.configuration.max_tokens,
-                api_key=fireworks_api_key,
+            return self._get_pooled_client(
+                fireworks_api_key,
+                None,
+                lambda: ChatFireworks(
+                    model=self.model_name,
+                    temperature=self.configuration.temperature,
+                    max_tokens=self.configuration.max_tokens,
+                    api_key=fireworks_api_key,
+                ),
             )
         elif self.provider.lower() == "anthropic":
             from langchain_anthropic import ChatAnthropic
@@ -100,16 +197,22 @@ class FunctionLLM(BaseModel):
                 anthropic_api_key = config.anthropic_api_key
             else:
                 raise Exception("Anthropic API Key not found")
-            return ChatAnthropic(
-                model=self.model_name,
-                temperature=self.configuration.temperature,
-                max_tokens=self.configuration.max_tokens,
-                api_key=anthropic_api_key,
+            return self._get_pooled_client(
+                anthropic_api_key,
+                None,
+                lambda: ChatAnthropic(
+                    model=self.model_name,
+                    temperature=self.configuration.temperature,
+                    max_tokens=self.configuration.max_tokens,
+                    api_key=anthropic_api_key,
+                ),
             )
         elif self.provider.lower() == "google":
             from langchain_google_vertexai import ChatVertexAI
 
-            return ChatVertexAI(model=self.model_name)
+            return self._get_pooled_client(
+                None, None, lambda: ChatVertexAI(model=self.model_name)
+            )
         elif self.provider.lower() == "cohere":
             from langchain_cohere import ChatCohere
 
@@ -119,7 +222,11 @@ class FunctionLLM(BaseModel):
                 cohere_api_key = config.cohere_api_key
             else:
                 raise Exception("Cohere API Key not found")
-            return ChatCohere(model="command-r", cohere_api_key=cohere_api_key)
+            return self._get_pooled_client(
+                cohere_api_key,
+                None,
+                lambda: ChatCohere(model="command-r", cohere_api_key=cohere_api_key),
+            )
         elif self.provider.lower() == "groq":
             from langchain_groq import ChatGroq
 
@@ -129,8 +236,12 @@ class FunctionLLM(BaseModel):
                 groq_api_key = config.groq_api_key
             else:
                 raise Exception("Groq API Key not found")
-            return ChatGroq(
-                temperature=0, groq_api_key=groq_api_key, model_name=self.model_name
+            return self._get_pooled_client(
+                groq_api_key,
+                None,
+                lambda: ChatGroq(
+                    temperature=0, groq_api_key=groq_api_key, model_name=self.model_name
+                ),
             )
         elif self.provider.lower() == "togetherai":
             from langchain_openai import ChatOpenAI
@@ -142,10 +253,14 @@ class FunctionLLM(BaseModel):
             else:
                 raise Exception("Together API Key not found")
 
-            return ChatOpenAI(
-                base_url="https://api.together.xyz/v1",
-                api_key=together_api_key,
-                model=self.model_name,
+            return self._get_pooled_client(
+                together_api_key,
+                TOGETHER_BASE_URL,
+                lambda: ChatOpenAI(
+                    base_url=TOGETHER_BASE_URL,
+                    api_key=together_api_key,
+                    model=self.model_name,
+                ),
             )
         else:
             raise ValueError(f"LLM provider {self.provider} not supported")
@@ -199,6 +314,46 @@ class FunctionProvider(BaseModel):
     ) -> FunctionResponse:
         pass
 
+    async def arun(
+        self,
+        request_prompt: str,
+        function_json,
+        config: Optional[Config],
+        conversation: Optional[List] = [],
+        x_few_shot_examples: Optional[List] = [],
+    ) -> FunctionResponse:
+        # providers without a native async client run on a worker thread
+        return await asyncio.to_thread(
+            self.run,
+            request_prompt,
+            function_json,
+            config,
+            conversation=conversation,
+            x_few_shot_examples=x_few_shot_examples,
+        )
+
+    async def astream_run(
+        self,
+        request_prompt: str,
+        function_json,
+        config: Optional[Config],
+        on_tool_call: Callable[[str, dict], Any],
+        conversation: Optional[List] = [],
+        x_few_shot_examples: Optional[List] = [],
+    ) -> FunctionResponse:
+        """
+        Like arun, calling on_tool_call with the function name and arguments
+        as soon as they are streamed, before the response is complete.
+        Providers that do not stream never call it.
+        """
+        return await self.arun(
+            request_prompt,
+            function_json,
+            config,
+            conversation=conversation,
+            x_few_shot_examples=x_few_shot_examples,
+        )
+
 
 class LLMBasedFunctionProvider(FunctionProvider):
     llm: FunctionLLM
@@ -215,88 +370,230 @@ class LLMBasedFunctionProvider(FunctionProvider):
         x_few_shot_examples: Optional[List] = [],
     ) -> FunctionResponse:
         try:
-            start_time = time.time()
-            llm_model = self.llm.convert_to_langchain_llm_model(config)
-
-            examples_and_conversation = (
-                self.build_few_shot_examples_and_conversation(
-                    x_few_shot_examples, conversation=conversation
-                )
-            )
-            few_shot_prompt = ChatPromptTemplate.from_messages(
-                [
-                    ("system", self.system_prompt),
-                    *examples_and_conversation,
-                    ("human", "{query}"),
-                ]
-            )
-            call_back_manager = self.llm.get_callback_manager()
-            if call_back_manager:
-                with call_back_manager as cb:
-                    llm_with_tools = llm_model.bind_tools(function_json)
-                    chain = (
-                        {"query": RunnablePassthrough()}
-                        | few_shot_prompt
-                        | llm_with_tools
-                    )
-                    response = chain.invoke(request_prompt)
-                    llm_api_cost = cb.total_cost
-            else:
-                llm_with_tools = llm_model.bind_tools(function_json)
-                chain = (
-                    {"query": RunnablePassthrough()}
-                    | few_shot_prompt
-                    | llm_with_tools
+            chain = self.get_chain(function_json, config, x_few_shot_examples)
+            chain_input = self.build_chain_input(request_prompt, conversation)
+            with provider_limiter.limit(
+                self.llm.provider,
+                self.llm.get_api_key(config),
+                self.estimate_tokens(request_prompt, function_json, chain_input),
+            ) as lease:
+                start_time = time.time()
+                call_back_manager = self.llm.get_callback_manager()
+                if call_back_manager:
+                    with call_back_manager as cb:
+                        response = chain.invoke(chain_input)
+                        llm_api_cost = cb.total_cost
+                else:
+                    response = chain.invoke(chain_input)
+                    llm_api_cost = 0
+                func_response = self.build_function_response(
+                    response, llm_api_cost, start_time
                 )
-                response = chain.invoke(request_prompt)
-                llm_api_cost = 0
+                lease.tokens_used = func_response.total_tokens
+            func_response.queue_wait_seconds = lease.wait_seconds
+            return func_response
+        except Exception as e:
+            traceback.print_exc()
+            print(e)
+            raise e
 
-            llm_latency_seconds = time.time() - start_time
-            total_tokens = response.response_metadata.get("token_usage", {}).get(
-                "total_tokens"
-            )
-            tool_calls = response.additional_kwargs.get("tool_calls")
-            if not tool_calls:
-                tool_calls = response.tool_calls
-
-            is_function_call = False
-            function_name = None
-            arguments = None
-            if tool_calls and len(tool_calls) > 0:
-                if tool_calls[0].get("type") == "function":
-                    is_function_call = True
-                    message_json = tool_calls[0]
-                    function_name = message_json.get("function").get("name")
-                    arguments = json.loads(message_json["function"]["arguments"])
+    async def arun(
+        self,
+        request_prompt: str,
+        function_json,
+        config: Optional[Config],
+        conversation: Optional[List] = [],
+        x_few_shot_examples: Optional[List] = [],
+    ) -> FunctionResponse:
+        return await self._arun(
+            request_prompt, function_json, config, conversation, x_few_shot_examples
+        )
+
+    async def astream_run(
+        self,
+        request_prompt: str,
+        function_json,
+        config: Optional[Config],
+        on_tool_call: Callable[[str, dict], Any],
+        conversation: Optional[List] = [],
+        x_few_shot_examples: Optional[List] = [],
+    ) -> FunctionResponse:
+        return await self._arun(
+            request_prompt,
+            function_json,
+            config,
+            conversation,
+            x_few_shot_examples,
+            on_tool_call=on_tool_call,
+        )
+
+    async def _arun(
+        self,
+        request_prompt: str,
+        function_json,
+        config: Optional[Config],
+        conversation: Optional[List],
+        x_few_shot_examples: Optional[List],
+        on_tool_call: Optional[Callable[[str, dict], Any]] = None,
+    ) -> FunctionResponse:
+        try:
+            chain = self.get_chain(function_json, config, x_few_shot_examples)
+            chain_input = self.build_chain_input(request_prompt, conversation)
+            async with provider_limiter.alimit(
+                self.llm.provider,
+                self.llm.get_api_key(config),
+                self.estimate_tokens(request_prompt, function_json, chain_input),
+            ) as lease:
+                start_time = time.time()
+                # the openai callback is kept in a context variable, so it also
+                # collects the cost of calls awaited inside it
+                call_back_manager = self.llm.get_callback_manager()
+                if call_back_manager:
+                    with call_back_manager as cb:
+                        response = await self.ainvoke_chain(
+                            chain, chain_input, on_tool_call
+                        )
+                        llm_api_cost = cb.total_cost
                 else:
-                    is_function_call = True
-                    message_json = tool_calls[0]
-                    function_name = message_json.get("name")
-                    arguments = message_json["args"]
-            response_metadata = {
-                "response": response.additional_kwargs,
-                "metadata": response.response_metadata,
-            }
-            return FunctionResponse(
-                response_content=str(response.content),
-                usage=response.response_metadata,
-                cost=llm_api_cost,
-                llm_latency_seconds=llm_latency_seconds,
-                total_tokens=total_tokens,
-                is_function_call=is_function_call,
-                detected_function_name=function_name,
-                detected_function_arguments=arguments,
-                response_metadata=response_metadata,
-                system_prompt=self.system_prompt,
-            )
+                    response = await self.ainvoke_chain(
+                        chain, chain_input, on_tool_call
+                    )
+                    llm_api_cost = 0
+                func_response = self.build_function_response(
+                    response, llm_api_cost, start_time
+                )
+                lease.tokens_used = func_response.total_tokens
+            func_response.queue_wait_seconds = lease.wait_seconds
+            return func_response
         except Exception as e:
             traceback.print_exc()
             print(e)
             raise e
 
+    async def ainvoke_chain(
+        self,
+        chain,
+        chain_input: dict,
+        on_tool_call: Optional[Callable[[str, dict], Any]] = None,
+    ):
+        if on_tool_call is None:
+            return await chain.ainvoke(chain_input)
+        # streamed responses carry no token usage with most providers
+        response = None
+        tool_call = None
+        async for chunk in chain.astream(chain_input):
+            response = chunk if response is None else response + chunk
+            if tool_call is None:
+                tool_call = get_streamed_tool_call(response)
+                if tool_call is not None:
+                    on_tool_call(*tool_call)
+        return response
+
+    def get_chain(
+        self,
+        function_json,
+        config: Optional[Config],
+        x_few_shot_examples: Optional[List],
+    ):
+        """
+        Few-shot prompt piped into the model with the tools bound. Only depends
+        on the model, tools and examples, so it is built once per function set
+        and requests only add the conversation and the query. The prompt
+        before the conversation stays identical across requests, which keeps
+        it eligible for provider side prompt caching.
+        """
+        llm_model = self.llm.convert_to_langchain_llm_model(config)
+        # the cached chain keeps the model alive, so its id is not reused
+        key = (
+            self.llm.provider.lower(),
+            id(llm_model),
+            self.system_prompt,
+            compute_json_hash(function_json),
+            compute_json_hash(x_few_shot_examples or []),
+        )
+        return llm_chain_cache.get(
+            key,
+            lambda: self.build_chain(llm_model, function_json, x_few_shot_examples),
+        )
+
+    def build_chain(
+        self, llm_model, function_json, x_few_shot_examples: Optional[List]
+    ):
+        few_shot_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", self.system_prompt),
+                *self.build_few_shot_examples(x_few_shot_examples),
+                MessagesPlaceholder("conversation"),
+                ("human", "{query}"),
+            ]
+        )
+        return few_shot_prompt | llm_model.bind_tools(function_json)
+
+    def estimate_tokens(self, request_prompt: str, function_json, chain_input) -> int:
+        # providers count max_tokens against the tokens per minute up front,
+        # the estimate is settled with the real usage once the call returns
+        conversation = [message.content for message in chain_input["conversation"]]
+        return (
+            estimate_tokens(self.system_prompt, request_prompt, function_json)
+            + estimate_tokens(conversation)
+            + self.llm.configuration.max_tokens
+        )
+
+    def build_chain_input(self, request_prompt: str, conversation: Optional[List]):
+        return {
+            "query": request_prompt,
+            "conversation": self.build_conversation(conversation),
+        }
+
+    def build_function_response(
+        self, response, llm_api_cost: float, start_time: float
+    ) -> FunctionResponse:
+        llm_latency_seconds = time.time() - start_time
+        total_tokens = response.response_metadata.get("token_usage", {}).get(
+            "total_tokens"
+        )
+        tool_calls = response.additional_kwargs.get("tool_calls")
+        if not tool_calls:
+            tool_calls = response.tool_calls
+
+        is_function_call = False
+        function_name = None
+        arguments = None
+        if tool_calls and len(tool_calls) > 0:
+            if tool_calls[0].get("type") == "function":
+                is_function_call = True
+                message_json = tool_calls[0]
+                function_name = message_json.get("function").get("name")
+                arguments = json.loads(message_json["function"]["arguments"])
+            else:
+                is_function_call = True
+                message_json = tool_calls[0]
+                function_name = message_json.get("name")
+                arguments = message_json["args"]
+        response_metadata = {
+            "response": response.additional_kwargs,
+            "metadata": response.response_metadata,
+        }
+        return FunctionResponse(
+            response_content=str(response.content),
+            usage=response.response_metadata,
+            cost=llm_api_cost,
+            llm_latency_seconds=llm_latency_seconds,
+            total_tokens=total_tokens,
+            is_function_call=is_function_call,
+            detected_function_name=function_name,
+            detected_function_arguments=arguments,
+            response_metadata=response_metadata,
+            system_prompt=self.system_prompt,
+        )
+
     def build_few_shot_examples_and_conversation(
         self, x_few_shot_examples: Optional[List], conversation: Optional[List]
     ) -> List:
+        messages = self.build_few_shot_examples(x_few_shot_examples)
+        return messages + self.build_conversation(conversation)
+
+    def build_few_shot_examples(self, x_few_shot_examples: Optional[List]) -> List:
         messages: List = []
         if x_few_shot_examples:
             for example in x_few_shot_examples:
@@ -326,7 +623,10 @@ class LLMBasedFunctionProvider(FunctionProvider):
                             tool_call_id=example.get("tool_call_id"),
                         )
                     )
+        return messages
 
+    def build_conversation(self, conversation: Optional[List]) -> List:
+        messages: List = []
         if conversation:
             for conv in conversation:
                 if conv.get("role") == "user":
@@ -0,0 +1,362 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from loguru import logger
+
+from .function_providers import FunctionResponse, compute_json_hash
+
+DEFAULT_ENABLED = (
+    os.environ.get("OPENPLUGIN_FUNCTION_RESPONSE_CACHE_ENABLED", "false").lower()
+    == "true"
+)
+DEFAULT_BACKEND = os.environ.get("OPENPLUGIN_FUNCTION_RESPONSE_CACHE_BACKEND", "memory")
+DEFAULT_TTL_SECONDS = float(
+    os.environ.get("OPENPLUGIN_FUNCTION_RESPONSE_CACHE_TTL_SECONDS", 3600)
+)
+DEFAULT_MAX_ENTRIES = int(
+    os.environ.get("OPENPLUGIN_FUNCTION_RESPONSE_CACHE_MAX_ENTRIES", 1024)
+)
+DEFAULT_SQLITE_FILE = os.environ.get(
+    "OPENPLUGIN_FUNCTION_RESPONSE_CACHE_FILE", "function_response_cache.sqlite"
+)
+
+
+def normalize_prompt(prompt: Optional[str]) -> str:
+    # only whitespace, casing is kept as values are extracted from the prompt
+    return " ".join((prompt or "").split())
+
+
+def compute_function_cache_key(
+    model_name: str,
+    temperature: Any,
+    function_json: Any,
+    request_prompt: str,
+    conversation: Optional[List] = None,
+    few_shot_examples: Optional[List] = None,
+) -> str:
+    data = json.dumps(
+        [
+            model_name,
+            temperature,
+            compute_json_hash(function_json),
+            normalize_prompt(request_prompt),
+            conversation or [],
+            few_shot_examples or [],
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class FunctionResponseCacheBackend(ABC):
+    """
+    Storage of cached function responses as json, with the source id and
+    version of the plugin each one was built from.
+    """
+
+    name: str
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Tuple[str, float, str]]:
+        """(plugin version, expires at, response json) stored under key."""
+        pass
+
+    @abstractmethod
+    def put(
+        self,
+        key: str,
+        plugin_source_id: str,
+        plugin_version: str,
+        expires_at: float,
+        value: str,
+    ):
+        pass
+
+    @abstractmethod
+    def delete(self, key: str):
+        pass
+
+    @abstractmethod
+    def invalidate_plugin(self, plugin_source_id: str) -> int:
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class MemoryFunctionResponseCacheBackend(FunctionResponseCacheBackend):
+    name = "memory"
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Tuple[str, str, float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, float, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2], entry[3]
+
+    def put(
+        self,
+        key: str,
+        plugin_source_id: str,
+        plugin_version: str,
+        expires_at: float,
+        value: str,
+    ):
+        with self._lock:
+            self._entries[key] = (plugin_source_id, plugin_version, expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_plugin(self, plugin_source_id: str) -> int:
+        with self._lock:
+            keys = [
+                key
+                for key, entry in self._entries.items()
+                if entry[0] == plugin_source_id
+            ]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteFunctionResponseCacheBackend(FunctionResponseCacheBackend):
+    """
+    Cached function responses in a local sqlite file, shared by the workers of
+    a host and kept across restarts.
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        file: str = DEFAULT_SQLITE_FILE,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.file = file
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(file, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS function_responses ("
+                "key TEXT PRIMARY KEY, plugin_source_id TEXT, plugin_version TEXT, "
+                "expires_at REAL, last_used REAL, value TEXT)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS function_responses_plugin "
+                "ON function_responses (plugin_source_id)"
+            )
+
+    def get(self, key: str) -> Optional[Tuple[str, float, str]]:
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT plugin_version, expires_at, value FROM function_responses "
+                "WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None:
+                self._connection.execute(
+                    "UPDATE function_responses SET last_used = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+        return row
+
+    def put(
+        self,
+        key: str,
+        plugin_source_id: str,
+        plugin_version: str,
+        expires_at: float,
+        value: str,
+    ):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO function_responses "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, plugin_source_id, plugin_version, expires_at, time.time(), value),
+            )
+            # drop the least recently used rows past max_entries
+            self._connection.execute(
+                "DELETE FROM function_responses WHERE key IN ("
+                "SELECT key FROM function_responses ORDER BY last_used DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, key: str):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM function_responses WHERE key = ?", (key,)
+            )
+
+    def invalidate_plugin(self, plugin_source_id: str) -> int:
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM function_responses WHERE plugin_source_id = ?",
+                (plugin_source_id,),
+            )
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM function_responses")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM function_responses"
+            ).fetchone()[0]
+
+
+def build_function_response_cache_backend(
+    name: str = DEFAULT_BACKEND,
+) -> FunctionResponseCacheBackend:
+    if name == "memory":
+        return MemoryFunctionResponseCacheBackend()
+    if name == "sqlite":
+        return SQLiteFunctionResponseCacheBackend()
+    raise ValueError(f"Function response cache backend {name} not supported")
+
+
+class FunctionResponseCache:
+    """
+    Function calling responses of repeated requests, so the same prompt
+    against the same tools skips the llm round trip. Entries expire after
+    ttl_seconds (never when <= 0) and are dropped once the plugin they were
+    built from changes.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[FunctionResponseCacheBackend] = None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        enabled: bool = DEFAULT_ENABLED,
+    ):
+        self._backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def backend(self) -> FunctionResponseCacheBackend:
+        # built on first use, so the sqlite file is only created when needed
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = build_function_response_cache_backend()
+        return self._backend
+
+    def is_enabled(self, enabled: Optional[bool] = None) -> bool:
+        return self.enabled if enabled is None else enabled
+
+    def get(
+        self, key: str, plugin_version: Optional[str]
+    ) -> Optional[FunctionResponse]:
+        entry = self.backend.get(key)
+        if entry is not None:
+            version, expires_at, value = entry
+            if version != (plugin_version or ""):
+                self.backend.delete(key)
+                self.invalidations += 1
+            elif expires_at and expires_at <= time.time():
+                self.backend.delete(key)
+                self.expirations += 1
+            else:
+                self.hits += 1
+                func_response = FunctionResponse.model_validate_json(value)
+                func_response.cached = True
+                return func_response
+        self.misses += 1
+        return None
+
+    def put(
+        self,
+        key: str,
+        plugin_source_id: str,
+        plugin_version: Optional[str],
+        func_response: FunctionResponse,
+    ):
+        expires_at = 0.0
+        if self.ttl_seconds > 0:
+            expires_at = time.time() + self.ttl_seconds
+        self.backend.put(
+            key,
+            plugin_source_id,
+            plugin_version or "",
+            expires_at,
+            func_response.model_dump_json(),
+        )
+
+    def invalidate_plugin(self, plugin_source_id: str) -> int:
+        if self._backend is None:
+            return 0
+        count = self._backend.invalidate_plugin(plugin_source_id)
+        if count:
+            self.invalidations += count
+            logger.info(
+                f"[FUNCTION-RESPONSE-CACHE-INVALIDATED] plugin_source_id={plugin_source_id}, entries={count}"  # noqa: E501
+            )
+        return count
+
+    def get_stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name,
+            "entries": len(self.backend),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def clear(self):
+        if self._backend is not None:
+            self._backend.clear()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+
+function_response_cache = FunctionResponseCache()
@@ -1,19 +1,46 @@
 import re
 import traceback
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
 
-import jsonref
 import requests
 from openapi_parser import parse
-from pydantic import BaseModel
-
+from pydantic import BaseModel, ConfigDict
+
+from .example_selector import (
+    DEFAULT_FEW_SHOT_TOKEN_BUDGET,
+    ExampleSelection,
+    get_example_selector,
+)
+from .function_compaction import (
+    DEFAULT_TOKEN_MODEL,
+    DEFAULT_TOOL_TOKEN_BUDGET,
+    CompactionReport,
+    compact_function_json,
+    count_json_tokens,
+)
+from .helper import run_sync
+from .operation_ranker import (
+    DEFAULT_SHORTLIST_MIN_SCORE,
+    DEFAULT_SHORTLIST_TOP_K,
+    OperationShortlist,
+    RankedOperation,
+    get_ranker,
+    get_score_margin,
+    shortlist_indexes,
+    tokenize,
+)
 from .plugin import Plugin, PluginOperation
+from .records import REQUIRED, Record
+from .ref_resolver import RefResolver, ResolvedComponents, resolve_refs
 
 
-class API(BaseModel):
+class API(Record):
     url: str
     method: str
 
+    _fields = {"url": REQUIRED, "method": REQUIRED}
+    __slots__ = tuple(_fields)
+
     def call(self, params):
         if self.method.lower() == "get":
             response = requests.request(
@@ -26,15 +53,73 @@ class API(BaseModel):
         return response.json()
 
 
+SUPPORTED_METHODS = [
+    "get",
+    "post",
+    "put",
+    "delete",
+    "patch",
+    "head",
+    "options",
+    "x-amazon-apigateway-any-method",
+]
+
+
+def get_server_url(openapi_doc_json: dict) -> str:
+    servers = openapi_doc_json.get("servers")
+    if isinstance(servers, dict) and servers.get("url"):
+        return servers.get("url", "")
+    if servers is None or len(servers) == 0:
+        raise ValueError("No server found in OpenAPI json")
+    return servers[0].get("url")
+
+
+# validate for litellm character restrictions: r"^[a-zA-Z0-9_-]{1,64}$"
+FUNCTION_NAME_PATTERN = re.compile("[a-zA-Z0-9_-]{1,64}")
+
+
+# python types of the json schema types tool call arguments are checked against
+JSON_TYPES: Dict[str, Any] = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
+
+
 def build_function_name(name):
-    # validate for litellm character restrictions: r"^[a-zA-Z0-9_-]{1,64}$"
-    pattern = re.compile("[a-zA-Z0-9_-]{1,64}")
-    matches = pattern.findall(name)
+    matches = FUNCTION_NAME_PATTERN.findall(name)
     name = "".join(matches)
     return name[:64]
 
 
-class FunctionProperty(BaseModel):
+def get_operation_key(path: str, method: str) -> Tuple[str, str]:
+    return path.lower(), method.lower()
+
+
+def parse_selected_operations(
+    selected_operations: Optional[Iterable[str]],
+) -> Optional[Set[Tuple[str, str]]]:
+    """
+    Operation keys of "method<PATH>path" selections, or None when nothing is
+    selected and every operation is used.
+    """
+    selected_op_keys = set()
+    for selected_operation in selected_operations or []:
+        if "<PATH>" in selected_operation:
+            method, path = selected_operation.split("<PATH>", 1)
+            selected_op_keys.add(get_operation_key(path, method))
+    return selected_op_keys or None
+
+
+class APIModel(BaseModel):
+    url: str
+    method: str
+
+
+class FunctionPropertyModel(BaseModel):
     name: str
     type: str
     description: Optional[str] = None
@@ -56,15 +141,20 @@ class FunctionProperty(BaseModel):
     x_dependent: Optional[Dict] = None
 
 
-class Function(BaseModel):
+class FunctionModel(BaseModel):
+    """
+    Validated form of a Function, for the API boundary and for values that
+    need coercing.
+    """
+
     name: Optional[str]
     path: Optional[str]
     method: Optional[str]
-    api: Optional[API]
+    api: Optional[APIModel]
     description: Optional[str]
     param_type: Optional[str]
     param_description: Optional[str] = None
-    param_properties: Optional[List[FunctionProperty]] = []
+    param_properties: Optional[List[FunctionPropertyModel]] = []
     x_helpers: Optional[List[str]] = []
     x_few_shot_examples: Optional[List[Dict]] = []
     human_usage_examples: Optional[List[str]] = []
@@ -72,6 +162,107 @@ class Function(BaseModel):
     x_dependent_parameter_map: Optional[Dict[str, str]] = {}
     response_obj_200: Optional[Dict[str, Any]] = {}
 
+
+class FunctionProperty(Record):
+    # fields of FunctionPropertyModel
+    name: str
+    type: str
+    description: Optional[str]
+    enum: Optional[Any]
+    items: Optional[Any]
+    x_helpers: Optional[List[str]]
+    is_required: bool
+    example: Optional[Any]
+    default: Optional[Any]
+    format: Optional[Any]
+    pattern: Optional[Any]
+    minLength: Optional[Any]
+    maxLength: Optional[Any]
+    minimum: Optional[Any]
+    maximum: Optional[Any]
+    additionalProperties: Optional[Any]
+    readOnly: Optional[Any]
+    writeOnly: Optional[Any]
+    x_dependent: Optional[Dict]
+
+    _fields = {
+        name: REQUIRED if field.is_required() else field.default
+        for name, field in FunctionPropertyModel.model_fields.items()
+    }
+    __slots__ = tuple(_fields)
+
+    def to_model(self) -> FunctionPropertyModel:
+        return FunctionPropertyModel(**self.to_dict())
+
+
+class Function(Record):
+    """
+    A compiled operation. Plugins keep thousands of these, so they are frozen
+    slotted records, converted to a FunctionModel only where a pydantic model
+    is needed.
+    """
+
+    # fields of FunctionModel
+    name: Optional[str]
+    path: Optional[str]
+    method: Optional[str]
+    api: Optional[API]
+    description: Optional[str]
+    param_type: Optional[str]
+    param_description: Optional[str]
+    param_properties: Optional[List[FunctionProperty]]
+    x_helpers: Optional[List[str]]
+    x_few_shot_examples: Optional[List[Dict]]
+    human_usage_examples: Optional[List[str]]
+    plugin_signature_helpers: Optional[List[str]]
+    x_dependent_parameter_map: Optional[Dict[str, str]]
+    response_obj_200: Optional[Dict[str, Any]]
+
+    _property_map: Optional[Dict[str, Dict[str, Any]]]
+    _openai_function_json: Optional[Dict[str, Any]]
+    _expanded_json: Optional[Dict[str, Any]]
+    _token_counts: Optional[Dict[Any, int]]
+    _search_terms: Optional[Any]
+
+    _fields = {
+        name: REQUIRED if field.is_required() else field.default
+        for name, field in FunctionModel.model_fields.items()
+    }
+    # a compiled function never changes, so its tool json is built once and
+    # shared. Callers must not modify what the getters return.
+    __slots__ = tuple(_fields) + (
+        "_property_map",
+        "_openai_function_json",
+        "_expanded_json",
+        "_token_counts",
+        "_search_terms",
+    )
+
+    def __init__(self, **values):
+        super().__init__(**values)
+        for name in self.__slots__[len(self._fields) :]:
+            object.__setattr__(self, name, None)
+
+    @classmethod
+    def from_model(cls, model: FunctionModel) -> "Function":
+        values = dict(model)
+        if model.api is not None:
+            values["api"] = API(**model.api.model_dump())
+        values["param_properties"] = [
+            FunctionProperty(**param_property.model_dump())
+            for param_property in model.param_properties or []
+        ]
+        return cls(**values)
+
+    def to_model(self) -> FunctionModel:
+        values = self.to_dict()
+        if self.api is not None:
+            values["api"] = APIModel(**self.api.to_dict())
+        values["param_properties"] = [
+            param_property.to_model() for param_property in self.param_properties or []
+        ]
+        return FunctionModel(**values)
+
     def get_api_url(self):
         return self.api.url
 
@@ -95,6 +286,11 @@ class Function(BaseModel):
         """
 
     def get_property_map(self):
+        if self._property_map is None:
+            self._property_map = self._build_property_map()
+        return self._property_map
+
+    def _build_property_map(self):
         map = {}
         for param_property in self.param_properties:
             description = ""
@@ -146,6 +342,11 @@ class Function(BaseModel):
         return map
 
     def get_openai_function_json(self):
+        if self._openai_function_json is None:
+            self._openai_function_json = self._build_openai_function_json()
+        return self._openai_function_json
+
+    def _build_openai_function_json(self):
         # validate for litellm character restrictions: r"^[a-zA-Z0-9_-]{1,64}$"
         validated_name = build_function_name(self.name)
         description = ""
@@ -172,7 +373,77 @@ class Function(BaseModel):
             json["parameters"]["description"] = self.param_description
         return json
 
+    def get_token_count(self, token_model: str = DEFAULT_TOKEN_MODEL) -> int:
+        """
+        Tokens of the function json, counted once per tokenizer model.
+        """
+        if self._token_counts is None:
+            self._token_counts = {}
+        if token_model not in self._token_counts:
+            self._token_counts[token_model] = count_json_tokens(
+                self.get_openai_function_json(), token_model
+            )
+        return self._token_counts[token_model]
+
+    def get_search_terms(self) -> List[str]:
+        if self._search_terms is None:
+            texts = [self.name, self.description]
+            texts.extend(self.x_helpers or [])
+            texts.extend(self.human_usage_examples or [])
+            self._search_terms = [term for text in texts for term in tokenize(text)]
+        return self._search_terms
+
+    def get_optional_properties(self) -> Set[str]:
+        return {
+            param_property.name
+            for param_property in self.param_properties or []
+            if not param_property.is_required
+        }
+
+    def has_x_dependent_properties(self) -> bool:
+        return any(
+            param_property.x_dependent for param_property in self.param_properties or []
+        )
+
+    def validate_arguments(self, arguments: Any) -> List[str]:
+        """
+        Errors of tool call arguments against the compiled parameters: unknown
+        names, missing required ones, wrong json types and values outside the
+        enum.
+        """
+        if not isinstance(arguments, dict):
+            return ["arguments are not an object"]
+        errors = []
+        properties = {
+            param_property.name: param_property
+            for param_property in self.param_properties or []
+        }
+        for name in sorted(set(arguments) - set(properties)):
+            errors.append(f"unknown parameter {name}")
+        for name, param_property in properties.items():
+            if name not in arguments:
+                if param_property.is_required:
+                    errors.append(f"missing required parameter {name}")
+                continue
+            value = arguments[name]
+            json_types = JSON_TYPES.get(param_property.type)
+            # bool is an int in python, but not a json number
+            if json_types is not None and (
+                not isinstance(value, json_types)
+                or isinstance(value, bool) != (param_property.type == "boolean")
+            ):
+                errors.append(f"{name} is not of type {param_property.type}")
+                continue
+            if param_property.enum and value not in param_property.enum:
+                errors.append(f"{name} is not one of {param_property.enum}")
+        return errors
+
     def get_expanded_json(self):
+        if self._expanded_json is None:
+            self._expanded_json = self._build_expanded_json()
+        return self._expanded_json
+
+    def _build_expanded_json(self):
         validated_name = build_function_name(self.name)
         description = ""
         if self.description:
@@ -201,6 +472,8 @@ class Function(BaseModel):
 
 
 class Functions(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     functions: List[Function] = []
     helpers: dict = {}
     plugin_map: dict = {}
@@ -208,24 +481,157 @@ class Functions(BaseModel):
 
     # adhere to function calling format
     def get_json(self):
-        json = []
-        for function in self.functions:
-            json.append(function.get_openai_function_json())
-        return json
+        return [function.get_openai_function_json() for function in self.functions]
 
     def get_expanded_json(self):
-        json = []
-        for function in self.functions:
-            json.append(function.get_expanded_json())
-        return json
+        return [function.get_expanded_json() for function in self.functions]
 
     def get_litellm_json(self):
-        json = []
-        for function in self.functions:
-            json.append(
-                {"type": "function", "function": function.get_openai_function_json()}
+        return [
+            {"type": "function", "function": function.get_openai_function_json()}
+            for function in self.functions
+        ]
+
+    def get_compacted_json(
+        self,
+        token_budget: int = DEFAULT_TOOL_TOKEN_BUDGET,
+        token_model: str = DEFAULT_TOKEN_MODEL,
+    ) -> Tuple[List[Dict], Optional[CompactionReport]]:
+        """
+        get_json shrunk to token_budget tokens, with a report of what was
+        removed. A budget of 0 turns compaction off and returns no report.
+        """
+        function_json = self.get_json()
+        if token_budget <= 0:
+            return function_json, None
+        return compact_function_json(
+            function_json,
+            [function.get_token_count(token_model) for function in self.functions],
+            [function.get_optional_properties() for function in self.functions],
+            token_budget,
+            token_model,
+        )
+
+    def get_compacted_litellm_json(
+        self,
+        token_budget: int = DEFAULT_TOOL_TOKEN_BUDGET,
+        token_model: str = DEFAULT_TOKEN_MODEL,
+    ) -> Tuple[List[Dict], Optional[CompactionReport]]:
+        if token_budget <= 0:
+            return self.get_litellm_json(), None
+        function_json, report = self.get_compacted_json(token_budget, token_model)
+        return [
+            {"type": "function", "function": function} for function in function_json
+        ], report
+
+    def get_shortlist(
+        self,
+        prompt: str,
+        top_k: int = DEFAULT_SHORTLIST_TOP_K,
+        min_score: float = DEFAULT_SHORTLIST_MIN_SCORE,
+    ) -> Tuple["Functions", Optional[OperationShortlist]]:
+        """
+        The top_k functions for the prompt by BM25 score, leaving out those
+        scoring below min_score times the best one. Runs locally, a top_k of 0
+        turns it off and returns no report.
+        """
+        if top_k <= 0:
+            return self, None
+        scores = get_ranker(self.functions).score(prompt)
+        kept = shortlist_indexes(scores, top_k, min_score)
+        report = OperationShortlist(
+            top_k=top_k,
+            min_score=min_score,
+            applied=kept is not None,
+            total_operations=len(self.functions),
+        )
+        if kept is None:
+            return self, report
+
+        report.shortlist = [
+            RankedOperation(
+                name=self.functions[index].name,
+                path=self.functions[index].path,
+                method=self.functions[index].method,
+                score=round(float(scores[index]), 4),
             )
-        return json
+            for index in kept
+        ]
+        next_score, margin = get_score_margin(scores, kept)
+        if next_score is not None and margin is not None:
+            report.next_score = round(next_score, 4)
+            report.margin = round(margin, 4)
+
+        functions = Functions(helpers=self.helpers)
+        # same order as before, so the tool json stays stable across prompts
+        for index in sorted(kept):
+            func = self.functions[index]
+            functions.plugin_map[func.name] = self.plugin_map.get(func.name)
+            functions.function_map[func.name] = func
+            functions.functions.append(func)
+        return functions, report
+
+    def get_few_shot_examples(
+        self,
+        prompt: Optional[str] = None,
+        token_budget: int = DEFAULT_FEW_SHOT_TOKEN_BUDGET,
+    ) -> Tuple[List[Dict], Optional[ExampleSelection]]:
+        """
+        x-few-shot-examples of every function with their tool call id and
+        function name. With a token budget, only the examples most similar to
+        the prompt that fit in it are kept and a report of them is returned.
+        """
+        examples = []
+        tool_id = 1
+        for function in self.functions:
+            if function.x_few_shot_examples:
+                for x in function.x_few_shot_examples:
+                    vals = {k: v for k, v in x.items()}
+                    vals["tool_call_id"] = tool_id
+                    vals["name"] = function.name
+                    examples.append(vals)
+            tool_id += 1
+        if token_budget <= 0 or not examples:
+            return examples, None
+        indexes, selection = get_example_selector(self.functions).select(
+            prompt or "", token_budget
+        )
+        return [examples[index] for index in indexes], selection
+
+    @classmethod
+    def from_plugins(
+        cls,
+        openapi_doc_urls: List[str],
+        selected_operations: Optional[Dict[str, List[str]]] = None,
+        max_workers: Optional[int] = None,
+    ) -> "Functions":
+        """
+        Functions of several plugins, fetched and compiled concurrently and
+        merged in the order of openapi_doc_urls. selected_operations maps an
+        openapi doc url to the operations to keep of that plugin.
+        """
+        return run_sync(
+            cls.afrom_plugins(openapi_doc_urls, selected_operations, max_workers)
+        )
+
+    @classmethod
+    async def afrom_plugins(
+        cls,
+        openapi_doc_urls: List[str],
+        selected_operations: Optional[Dict[str, List[str]]] = None,
+        max_workers: Optional[int] = None,
+    ) -> "Functions":
+        from .plugin_loader import DEFAULT_COMPILE_WORKERS, afrom_plugins
+
+        return await afrom_plugins(
+            openapi_doc_urls,
+            selected_operations,
+            max_workers or DEFAULT_COMPILE_WORKERS,
+        )
+
+    def precompute_json(self):
+        for function in self.functions:
+            function.get_openai_function_json()
 
     def get_plugin_from_func_name(self, function_name):
         return self.plugin_map.get(function_name)
@@ -236,27 +642,34 @@ class Functions(BaseModel):
     def add_from_plugin(
         self, plugin: Plugin, selected_operations: Optional[List[str]] = None
     ):
-        valid_operations = []
-        selected_op_key_set = set()
-        if selected_operations:
-            for selected_operation in selected_operations:
-                if "<PATH>" in selected_operation:
-                    selected_operation_path = selected_operation.split("<PATH>")[1]
-                    selected_operation_method = selected_operation.split("<PATH>")[0]
-                    selected_op_key_set.add(
-                        f"{selected_operation_path}_{selected_operation_method}"
-                    )
+        selected_op_keys = parse_selected_operations(selected_operations)
+
+        from .plugin_cache import compiled_plugin_cache
+        from .plugin_registry import plugin_registry
+
+        compiled_plugin = compiled_plugin_cache.get(plugin.content_hash)
+        if compiled_plugin is None:
+            # registered plugins stay compiled after the cache evicts them
+            compiled_plugin = plugin_registry.peek(plugin.content_hash)
+        if compiled_plugin is not None:
+            # reuse the functions compiled once for the whole plugin
+            view = compiled_plugin.get_functions(selected_op_keys)
+            for func in view.functions:
+                self.plugin_map[func.name] = plugin
+                self.function_map[func.name] = func
+                self.functions.append(func)
+            return
 
+        valid_operations = []
         if plugin.plugin_operations:
             for key in plugin.plugin_operations.keys():
                 method_obj = plugin.plugin_operations.get(key)
                 if method_obj:
                     for method in method_obj.keys():
-                        if selected_op_key_set:
-                            key_name = f"{key}_{method}".lower()
-                            if key_name in selected_op_key_set:
-                                valid_operations.append(key_name)
-                        else:
+                        if (
+                            selected_op_keys is None
+                            or (key.lower(), method.lower()) in selected_op_keys
+                        ):
                             valid_operations.append(key + "_" + method)
 
         self.add_from_openapi_spec(
@@ -267,6 +680,46 @@ class Functions(BaseModel):
             header=None,
         )
 
+    def add_from_plugin_operations(
+        self,
+        plugin: Plugin,
+        previous: Optional["Functions"] = None,
+        changed_operations: Optional[Set[Tuple[str, str]]] = None,
+    ):
+        """
+        Builds functions from the resolved operations of the plugin, reusing
+        the previous function of every operation not in changed_operations.
+        """
+        # only looked up for the refs a cycle left in place
+        reference_map = ResolvedComponents(RefResolver(plugin.openapi_doc_obj))
+        previous_functions: Dict[Tuple[Optional[str], Optional[str]], Function] = {}
+        if previous is not None and changed_operations is not None:
+            for previous_func in previous.functions:
+                previous_functions[
+                    (previous_func.path, previous_func.method)
+                ] = previous_func
+        server_url = get_server_url(plugin.openapi_doc_obj)
+        for path, method_map in (plugin.plugin_op_property_map or {}).items():
+            for method, operation_obj in method_map.items():
+                if method.lower() not in SUPPORTED_METHODS:
+                    continue
+                func: Optional[Function] = None
+                if changed_operations is not None:
+                    if (path, method) not in changed_operations:
+                        func = previous_functions.get((path, method))
+                if func is None:
+                    func = self._build_function(
+                        operation_obj,
+                        server_url,
+                        path,
+                        method,
+                        reference_map,
+                        plugin.plugin_operations,
+                    )
+                self.plugin_map[func.name] = plugin
+                self.function_map[func.name] = func
+                self.functions.append(func)
+
     def get_prompt_signatures_prompt(self):
         prompt = ""
         index = 1
@@ -345,18 +798,11 @@ class Functions(BaseModel):
         valid_operations: Optional[List[str]],
     ):
         functions = []
-        openapi_doc_json = to_plain_dict(jsonref.JsonRef.replace_refs(openapi_doc_obj))
+        openapi_doc_json = resolve_refs(openapi_doc_obj)
         if openapi_doc_json is None:
             raise ValueError("Could not fetch OpenAPI json from URL")
 
-        servers = openapi_doc_json.get("servers")
-
-        if isinstance(servers, dict) and servers.get("url"):
-            server_url = servers.get("url", "")
-        else:
-            if servers is None or len(servers) == 0:
-                raise ValueError("No server found in OpenAPI json")
-            server_url = servers[0].get("url")
+        server_url = get_server_url(openapi_doc_json)
 
         paths = openapi_doc_json.get("paths")
         if paths is None:
@@ -366,16 +812,7 @@ class Functions(BaseModel):
 
         for path in paths:
             for method in paths[path]:
-                if method.lower() not in [
-                    "get",
-                    "post",
-                    "put",
-                    "delete",
-                    "patch",
-                    "head",
-                    "options",
-                    "x-amazon-apigateway-any-method",
-                ]:
+                if method.lower() not in SUPPORTED_METHODS:
                     continue
                 if valid_operations is not None:
                     if f"{path}_{method}" not in valid_operations:
@@ -383,49 +820,67 @@ class Functions(BaseModel):
                 # print("\n\n=-=-=-=-=-=-=-=-=-==-=-=-=-=-=-=-=-=-=")
                 # print(f"RUNNING FOR: path={path}, method={method}")
                 # print("=-=-=-=-=-=-=-=-=-==-=-=-=-=-=-=-=-=-=")
-                operation_obj = paths[path][method]
-                function_values = self._parse_openapi_operation(
-                    operation_obj, server_url, path, method, reference_map
-                )
-
-                # add human usage examples
-                human_usage_examples = []
-                if plugin_operations_map is not None:
-                    op_obj = plugin_operations_map.get(path, {}).get(method)
-                    if op_obj:
-                        human_usage_examples = op_obj.human_usage_examples
-                function_values["human_usage_examples"] = human_usage_examples
-
-                # add plugin signature helpers
-                plugin_signature_helpers = []
-                if plugin_operations_map is not None:
-                    op_obj = plugin_operations_map.get(path, {}).get(method)
-                    if op_obj:
-                        plugin_signature_helpers = op_obj.plugin_signature_helpers
-
-                function_values["plugin_signature_helpers"] = plugin_signature_helpers
-                function_values["path"] = path
-                function_values["method"] = method
-                response_obj_200 = (
-                    operation_obj.get("responses", {})
-                    .get("200", {})
-                    .get("content", {})
-                    .get("application/json")
+                func = self._build_function(
+                    paths[path][method],
+                    server_url,
+                    path,
+                    method,
+                    reference_map,
+                    plugin_operations_map,
                 )
-                if response_obj_200:
-                    response_obj_200["server"] = server_url
-                function_values["response_obj_200"] = response_obj_200
-
-                function_values["x_few_shot_examples"] = operation_obj.get(
-                    "x-few-shot-examples", []
-                )
-                func = Function(**function_values)
                 if plugin:
                     self.plugin_map[func.name] = plugin
                 self.function_map[func.name] = func
                 functions.append(func)
         return functions
 
+    def _build_function(
+        self,
+        operation_obj: dict,
+        server_url: str,
+        path: str,
+        method: str,
+        reference_map: Mapping,
+        plugin_operations_map: Optional[dict],
+    ) -> Function:
+        function_values = self._parse_openapi_operation(
+            operation_obj, server_url, path, method, reference_map
+        )
+
+        # add human usage examples
+        human_usage_examples = []
+        if plugin_operations_map is not None:
+            op_obj = plugin_operations_map.get(path, {}).get(method)
+            if op_obj:
+                human_usage_examples = op_obj.human_usage_examples
+        function_values["human_usage_examples"] = human_usage_examples
+
+        # add plugin signature helpers
+        plugin_signature_helpers = []
+        if plugin_operations_map is not None:
+            op_obj = plugin_operations_map.get(path, {}).get(method)
+            if op_obj:
+                plugin_signature_helpers = op_obj.plugin_signature_helpers
+
+        function_values["plugin_signature_helpers"] = plugin_signature_helpers
+        function_values["path"] = path
+        function_values["method"] = method
+        response_obj_200 = (
+            operation_obj.get("responses", {})
+            .get("200", {})
+            .get("content", {})
+            .get("application/json")
+        )
+        if response_obj_200:
+            # resolved subtrees are shared, so never modify them in place
+            response_obj_200 = {**response_obj_200, "server": server_url}
+        function_values["response_obj_200"] = response_obj_200
+
+        function_values["x_few_shot_examples"] = operation_obj.get(
+            "x-few-shot-examples", []
+        )
+        return Function(**function_values)
+
     def _build_reference_map(self, openapi_doc_json: dict):
         ref_map: Dict[str, Any] = {}
         components = openapi_doc_json.get("components", {})
@@ -527,7 +982,7 @@ class Functions(BaseModel):
         server_url: str,
         path: str,
         method: str,
-        reference_map: dict,
+        reference_map: Mapping,
     ):
         # print(json.dumps(operation_obj, indent=2))
         function_values: Dict[str, Any] = {}
@@ -609,8 +1064,7 @@ class Functions(BaseModel):
                 if isinstance(param_properties, dict):
                     params = []
                     for key in param_properties.keys():
-                        param_properties[key]["name"] = key
-                        params.append(param_properties[key])
+                        params.append({**param_properties[key], "name": key})
                 else:
                     params = param_properties
                 # required_params = body_content.get("required", {})
@@ -624,8 +1078,7 @@ class Functions(BaseModel):
                     if isinstance(param_properties, dict):
                         params = []
                         for key in param_properties.keys():
-                            param_properties[key]["name"] = key
-                            params.append(param_properties[key])
+                            params.append({**param_properties[key], "name": key})
                     else:
                         params = param_properties
                 # required_params = params.get("required", {})
@@ -637,8 +1090,7 @@ class Functions(BaseModel):
                         if isinstance(p_props, dict):
                             params = []
                             for key in p_props.keys():
-                                p_props[key]["name"] = key
-                                params.append(p_props[key])
+                                params.append({**p_props[key], "name": key})
                         elif isinstance(p_props, list):
                             params.extend(obj.get("properties", []))
                         # required_params = obj.get("required", {})
@@ -681,7 +1133,7 @@ class Functions(BaseModel):
                 else:
                     u = f"{server_url}{path}"
 
-                function_values["api"] = API(url=u, method=method)
+                function_values["api"] = APIModel(url=u, method=method)
                 validated_name = build_function_name(
                     f"{method}{path.replace('/', '_')}"
                 )
@@ -709,7 +1161,7 @@ class Functions(BaseModel):
                             properties_values["x_helpers"] = helpers
                             key = f"For path={path}, method={method}, parameter={parameter.name}"
                             self.helpers[key] = helpers
-                        g_properties.append(FunctionProperty(**properties_values))
+                        g_properties.append(properties_values)
                     function_values["param_properties"] = g_properties
                 elif method.lower() == "post" or method.lower() == "put":
                     p_properties = []
@@ -795,18 +1247,10 @@ class Functions(BaseModel):
                         .get(method, {})
                         .get("plugin_signature_helpers", [])
                     )
-                func = Function(**function_values)
+                # values here still need coercing, e.g. is_required="True"
+                func = Function.from_model(FunctionModel(**function_values))
                 if plugin:
                     self.plugin_map[func.name] = plugin
                 self.function_map[func.name] = func
                 functions.append(func)
         return functions
-
-
-def to_plain_dict(data):
-    if isinstance(data, dict):
-        return {key: to_plain_dict(value) for key, value in data.items()}
-    elif isinstance(data, list):
-        return [to_plain_dict(item) for item in data]
-    else:
-        return data
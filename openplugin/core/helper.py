@@ -1,34 +1,61 @@
+import asyncio
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from loguru import logger
 
 
 def time_taken(func):
+    if asyncio.iscoroutinefunction(func):
+
+        async def async_wrapper(*args, **kwargs):
+            start_time = time.time()
+            result = await func(*args, **kwargs)
+            log_time_taken(func, args, start_time, time.time())
+            return result
+
+        return async_wrapper
+
     def wrapper(*args, **kwargs):
         start_time = time.time()
         result = func(*args, **kwargs)
-        end_time = time.time()
-
-        if func.__name__ == "_run_plugin_signature_selector":
-            logger.log(
-                "FLOW",
-                f"[PLUGIN-SIGNATURE-SELECTOR-FINISHED], time_taken={round((end_time - start_time),4)} seconds",  # noqa: E501
-            )
-        elif func.__name__ == "_run_plugin_execution":
-            logger.log(
-                "FLOW",
-                f"[PLUGIN-EXECUTION-FINISHED], time_taken={round((end_time - start_time),4)} seconds",  # noqa: E501
-            )
-        elif func.__name__ == "run_prompt_on_plugin":
-            logger.log(
-                "FLOW",
-                f"[PLUGIN-PIPELINE-FINISHED], total_time_taken={round((end_time - start_time),4)} seconds",  # noqa: E501
-            )
-        elif func.__name__ == "run_processor":
-            logger.log(
-                "FLOW",
-                f"{args[0].log_title}, total_time_taken={round((end_time - start_time),4)} seconds",  # noqa: E501
-            )
+        log_time_taken(func, args, start_time, time.time())
         return result
 
     return wrapper
+
+
+def log_time_taken(func, args, start_time: float, end_time: float):
+    if func.__name__ == "_run_plugin_signature_selector":
+        logger.log(
+            "FLOW",
+            f"[PLUGIN-SIGNATURE-SELECTOR-FINISHED], time_taken={round((end_time - start_time),4)} seconds",  # noqa: E501
+        )
+    elif func.__name__ == "_run_plugin_execution":
+        logger.log(
+            "FLOW",
+            f"[PLUGIN-EXECUTION-FINISHED], time_taken={round((end_time - start_time),4)} seconds",  # noqa: E501
+        )
+    elif func.__name__ == "run_prompt_on_plugin":
+        logger.log(
+            "FLOW",
+            f"[PLUGIN-PIPELINE-FINISHED], total_time_taken={round((end_time - start_time),4)} seconds",  # noqa: E501
+        )
+    elif func.__name__ == "run_processor":
+        logger.log(
+            "FLOW",
+            f"{args[0].log_title}, total_time_taken={round((end_time - start_time),4)} seconds",  # noqa: E501
+        )
+
+
+def run_sync(coroutine):
+    """
+    Runs a coroutine to completion from sync code, on a separate thread when
+    this thread is already running an event loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+from loguru import logger
+
+DEFAULT_MAX_CLIENTS = int(os.environ.get("OPENPLUGIN_LLM_CLIENT_POOL_MAX_SIZE", 32))
+DEFAULT_IDLE_SECONDS = float(
+    os.environ.get("OPENPLUGIN_LLM_CLIENT_POOL_IDLE_SECONDS", 300)
+)
+# attributes langchain chat models and provider sdks keep their clients in
+CLIENT_ATTRIBUTES = ("client", "async_client", "_client", "_async_client")
+
+
+def hash_api_key(api_key: Optional[str]) -> str:
+    if not api_key:
+        return ""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def count_connections(client: Any, max_depth: int = 4) -> int:
+    """
+    Open connections of the httpx clients behind a chat model, found through
+    the attributes sdks usually keep them in. 0 when there are none to find.
+    """
+    count = 0
+    seen = set()
+    stack = [(client, 0)]
+    while stack:
+        obj, depth = stack.pop()
+        if obj is None or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, (httpx.Client, httpx.AsyncClient)):
+            pool = getattr(getattr(obj, "_transport", None), "_pool", None)
+            count += len(getattr(pool, "connections", None) or [])
+            continue
+        if depth < max_depth:
+            for name in CLIENT_ATTRIBUTES:
+                try:
+                    stack.append((getattr(obj, name, None), depth + 1))
+                except Exception:
+                    continue
+    return count
+
+
+class LLMClientPool:
+    """
+    Chat model clients shared across requests, so their HTTP connection pools
+    and keep-alive connections are reused instead of a new TLS handshake per
+    request. Keys are tuples starting with the provider and must cover
+    everything the client was built with. Least recently used clients are
+    dropped past max_size and after idle_seconds without use.
+    Async connections are bound to the event loop they were opened in, so
+    clients used from a coroutine are only shared within its loop and are
+    dropped once that loop is closed.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_CLIENTS,
+        idle_seconds: float = DEFAULT_IDLE_SECONDS,
+    ):
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._clients: OrderedDict[
+            Tuple, Tuple[Any, float, Optional[weakref.ref]]
+        ] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.idle_evictions = 0
+        self.loop_evictions = 0
+
+    def get(
+        self,
+        key: Tuple,
+        build: Callable[[], Any],
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> Any:
+        if self.max_size <= 0:
+            return build()
+        if loop is not None:
+            key = key + (id(loop),)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            self._evict_closed_loops()
+            entry = self._clients.get(key)
+            # the id of a collected loop can be taken by a new one
+            if entry is not None and (entry[2] is None or entry[2]() is loop):
+                self._clients[key] = (entry[0], now, entry[2])
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        # built outside the lock, two racing builds of one key just keep the last
+        client = build()
+        with self._lock:
+            loop_ref = weakref.ref(loop) if loop is not None else None
+            self._clients[key] = (client, now, loop_ref)
+            self._clients.move_to_end(key)
+            while len(self._clients) > self.max_size:
+                evicted_key, _ = self._clients.popitem(last=False)
+                self.evictions += 1
+                logger.info(f"[LLM-CLIENT-EVICTED] provider={evicted_key[0]}")
+        return client
+
+    def _evict_idle(self, now: float):
+        # the oldest entry is the least recently used, stop at the first fresh one
+        while self._clients:
+            key, (_, last_used, _) = next(iter(self._clients.items()))
+            if now - last_used < self.idle_seconds:
+                break
+            del self._clients[key]
+            self.idle_evictions += 1
+
+    def _evict_closed_loops(self):
+        for key, (_, _, loop_ref) in list(self._clients.items()):
+            if loop_ref is None:
+                continue
+            loop = loop_ref()
+            if loop is None or loop.is_closed():
+                del self._clients[key]
+                self.loop_evictions += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            self._evict_closed_loops()
+            clients = [client for client, _, _ in self._clients.values()]
+            providers: Dict[str, int] = {}
+            for key in self._clients:
+                providers[key[0]] = providers.get(key[0], 0) + 1
+            total = self.hits + self.misses
+            stats = {
+                "clients": len(clients),
+                "max_size": self.max_size,
+                "idle_seconds": self.idle_seconds,
+                "clients_by_provider": providers,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "idle_evictions": self.idle_evictions,
+                "loop_evictions": self.loop_evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+        stats["connections"] = sum(count_connections(client) for client in clients)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.idle_evictions = 0
+            self.loop_evictions = 0
+
+
+llm_client_pool = LLMClientPool()
@@ -0,0 +1,254 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import requests
+from loguru import logger
+from pydantic import BaseModel
+
+from .helper import run_sync
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "OPENPLUGIN_MANIFEST_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "openplugin_manifests"),
+)
+DEFAULT_TTL_SECONDS = float(os.environ.get("OPENPLUGIN_MANIFEST_CACHE_TTL_SECONDS", 60))
+DEFAULT_STALE_TTL_SECONDS = float(
+    os.environ.get("OPENPLUGIN_MANIFEST_STALE_TTL_SECONDS", 3600)
+)
+DEFAULT_TIMEOUT_SECONDS = float(
+    os.environ.get("OPENPLUGIN_MANIFEST_FETCH_TIMEOUT_SECONDS", 10)
+)
+DEFAULT_MAX_ENTRIES = int(os.environ.get("OPENPLUGIN_MANIFEST_CACHE_MAX_ENTRIES", 256))
+
+
+class ManifestFetchError(Exception):
+    def __init__(self, message="Failed to fetch manifest"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class FetchedManifest(BaseModel):
+    url: str
+    content: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float
+
+    def get_json(self):
+        # parsed on every call so callers are free to modify the result
+        return json.loads(self.content)
+
+    def get_content_hash(self) -> str:
+        return hashlib.sha256(self.content).hexdigest()
+
+    def get_age_seconds(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class ManifestFetcher:
+    """
+    Fetches manifests and openapi docs over HTTP with an in-memory and on-disk
+    store. Stored documents are revalidated with ETag / If-Modified-Since, stale
+    documents are served while they are revalidated in the background and
+    concurrent fetches of the same URL share one request.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        stale_ttl_seconds: float = DEFAULT_STALE_TTL_SECONDS,
+        timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, FetchedManifest] = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="manifest-revalidate"
+        )
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "fetches": 0,
+            "not_modified": 0,
+            "errors": 0,
+        }
+
+    def fetch(self, url: str) -> FetchedManifest:
+        manifest = self._get_stored(url)
+        if manifest is not None:
+            age = manifest.get_age_seconds()
+            if age < self.ttl_seconds:
+                self._count("hits")
+                return manifest
+            if age < self.ttl_seconds + self.stale_ttl_seconds:
+                self._count("stale_hits")
+                self._revalidate_in_background(url)
+                return manifest
+        return self._revalidate(url)
+
+    def fetch_json(self, url: str):
+        return self.fetch(url).get_json()
+
+    async def afetch(self, url: str) -> FetchedManifest:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.fetch, url)
+
+    async def afetch_all(self, urls: Sequence[str]) -> List[FetchedManifest]:
+        return list(await asyncio.gather(*[self.afetch(url) for url in urls]))
+
+    def fetch_all(self, urls: Sequence[str]) -> List[FetchedManifest]:
+        """
+        Fetches all urls concurrently, the manifests are returned in the order
+        of urls. A url given twice is requested once.
+        """
+        return run_sync(self.afetch_all(urls))
+
+    def invalidate(self, url: str):
+        with self._lock:
+            self._entries.pop(url, None)
+        path = self._get_disk_path(url)
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries)}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _revalidate_in_background(self, url: str):
+        with self._lock:
+            if url in self._inflight:
+                return
+        self._executor.submit(self._revalidate_quietly, url)
+
+    def _revalidate_quietly(self, url: str):
+        try:
+            self._revalidate(url)
+        except Exception as e:
+            logger.warning(f"[MANIFEST-REVALIDATE-FAILED] url={url}, error={e}")
+
+    def _revalidate(self, url: str) -> FetchedManifest:
+        with self._lock:
+            inflight = self._inflight.get(url)
+            if inflight is None:
+                future: Future = Future()
+                self._inflight[url] = future
+        if inflight is not None:
+            return inflight.result()
+        try:
+            manifest = self._request(url)
+            future.set_result(manifest)
+            return manifest
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+
+    def _request(self, url: str) -> FetchedManifest:
+        stored = self._get_stored(url)
+        headers = {}
+        if stored is not None:
+            if stored.etag:
+                headers["If-None-Match"] = stored.etag
+            if stored.last_modified:
+                headers["If-Modified-Since"] = stored.last_modified
+        try:
+            self._count("fetches")
+            response = requests.get(url, headers=headers, timeout=self.timeout_seconds)
+            if response.status_code == 304 and stored is not None:
+                self._count("not_modified")
+                manifest = stored.model_copy(update={"fetched_at": time.time()})
+            else:
+                response.raise_for_status()
+                manifest = FetchedManifest(
+                    url=url,
+                    content=response.content,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                    fetched_at=time.time(),
+                )
+        except Exception as e:
+            self._count("errors")
+            if stored is not None:
+                logger.warning(f"[MANIFEST-FETCH-FAILED] serving stale url={url}: {e}")
+                return stored
+            raise ManifestFetchError(f"Failed to fetch {url}: {e}")
+        self._store(manifest)
+        return manifest
+
+    def _get_stored(self, url: str) -> Optional[FetchedManifest]:
+        with self._lock:
+            manifest = self._entries.get(url)
+            if manifest is not None:
+                self._entries.move_to_end(url)
+                return manifest
+        manifest = self._read_from_disk(url)
+        if manifest is not None:
+            self._store_in_memory(manifest)
+        return manifest
+
+    def _store(self, manifest: FetchedManifest):
+        self._store_in_memory(manifest)
+        self._write_to_disk(manifest)
+
+    def _store_in_memory(self, manifest: FetchedManifest):
+        with self._lock:
+            self._entries[manifest.url] = manifest
+            self._entries.move_to_end(manifest.url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_disk_path(self, url: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def _read_from_disk(self, url: str) -> Optional[FetchedManifest]:
+        path = self._get_disk_path(url)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as file:
+                manifest = FetchedManifest.model_validate_json(file.read())
+            if manifest.url == url:
+                return manifest
+        except Exception as e:
+            logger.warning(f"[MANIFEST-CACHE-READ-FAILED] path={path}: {e}")
+        return None
+
+    def _write_to_disk(self, manifest: FetchedManifest):
+        path = self._get_disk_path(manifest.url)
+        if path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as file:
+                file.write(manifest.model_dump_json())
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"[MANIFEST-CACHE-WRITE-FAILED] path={path}: {e}")
+
+
+manifest_fetcher = ManifestFetcher()
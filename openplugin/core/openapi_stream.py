@@ -0,0 +1,145 @@
+import codecs
+import json
+import os
+from typing import IO, Any, Iterable, Iterator
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+STREAMING_MIN_BYTES = (
+    int(os.environ.get("OPENPLUGIN_STREAMING_PARSE_MIN_MB", 8)) * 1024 * 1024
+)
+# members of these top level keys are decoded one at a time
+STREAMED_KEYS = ("paths", "components")
+
+_WHITESPACE = " \t\n\r"
+
+
+class JsonStreamReader:
+    """
+    Pull parser over chunks of a json document. Objects can be walked key by
+    key with iter_keys, every other value is decoded whole with read_value, so
+    only the value being decoded is ever held as text.
+    """
+
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = iter(chunks)
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, min_size: int = 0) -> bool:
+        # drop what was already parsed before growing the buffer
+        if self._pos:
+            self._buffer = self._buffer[self._pos :]
+            self._pos = 0
+        target = max(len(self._buffer) + 1, min_size)
+        parts = [self._buffer]
+        size = len(self._buffer)
+        while size < target:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                break
+            parts.append(chunk)
+            size += len(chunk)
+        self._buffer = "".join(parts)
+        return size > len(parts[0])
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buffer):
+                if self._buffer[self._pos] not in _WHITESPACE:
+                    return self._buffer[self._pos]
+                self._pos += 1
+            if self._eof or not self._fill():
+                raise self._error("Unexpected end of document")
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise self._error(f"Expecting '{char}'")
+        self._pos += 1
+
+    def _error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self._buffer, self._pos)
+
+    def read_value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # a number may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # read as much again as is buffered, so retries stay linear
+            self._fill(2 * (len(self._buffer) - self._pos))
+
+    def iter_keys(self) -> Iterator[str]:
+        """
+        Yields the keys of the object at the current position. The value of
+        each key must be consumed before the next key is requested.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            if self._peek() != '"':
+                raise self._error("Expecting property name")
+            key = self.read_value()
+            self._expect(":")
+            yield key
+            char = self._peek()
+            self._pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise self._error("Expecting ',' delimiter")
+
+    def peek_char(self) -> str:
+        return self._peek()
+
+
+def iter_text_chunks(
+    byte_chunks: Iterable[bytes], encoding: str = "utf-8"
+) -> Iterator[str]:
+    return codecs.iterdecode(byte_chunks, encoding)
+
+
+def iter_file_chunks(
+    file: IO[bytes], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    return iter(lambda: file.read(chunk_size), b"")
+
+
+def read_openapi_doc(byte_chunks: Iterable[bytes]) -> dict:
+    """
+    Decodes an openapi doc from chunks of bytes. Every path and component is
+    decoded on its own, so the text of the whole document is never in memory.
+    """
+    reader = JsonStreamReader(iter_text_chunks(byte_chunks))
+    openapi_doc_obj: dict = {}
+    for key in reader.iter_keys():
+        if key in STREAMED_KEYS and reader.peek_char() == "{":
+            openapi_doc_obj[key] = read_object_members(reader, depth=2)
+        else:
+            openapi_doc_obj[key] = reader.read_value()
+    return openapi_doc_obj
+
+
+def read_object_members(reader: JsonStreamReader, depth: int) -> dict:
+    obj = {}
+    for key in reader.iter_keys():
+        if depth > 1 and reader.peek_char() == "{":
+            obj[key] = read_object_members(reader, depth - 1)
+        else:
+            obj[key] = reader.read_value()
+    return obj
+
+
+def read_openapi_doc_file(openapi_doc_file: str) -> dict:
+    with open(openapi_doc_file, "rb") as file:
+        return read_openapi_doc(iter_file_chunks(file))
@@ -0,0 +1,240 @@
+from typing import Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, ConfigDict
+
+from .flow_path import FlowPath
+
+PRIMITIVE_TYPES = ["string", "number", "integer", "boolean"]
+
+
+def normalize_operation_key(path: str, method: str) -> Tuple[str, str]:
+    return path.lower(), method.lower()
+
+
+def get_json_request_body_schema(op_property: dict) -> dict:
+    return (
+        op_property.get("requestBody", {})
+        .get("content", {})
+        .get("application/json", {})
+        .get("schema", {})
+    )
+
+
+def build_required_parameters(op_property: Optional[dict]) -> List[Dict]:
+    """
+    Describes the required query/path parameters and body properties of an
+    operation, in the shape returned to the client for missing parameters.
+    """
+    required_parameters: List[Dict] = []
+    if not op_property:
+        return required_parameters
+    for prop in op_property.get("parameters", []) or []:
+        if prop.get("required"):
+            obj = {
+                "name": prop.get("name"),
+                "type": prop.get("schema", {}).get("type"),
+                "format": prop.get("schema", {}).get("format"),
+                "description": prop.get("description"),
+                "title": prop.get("schema", {}).get("title"),
+            }
+            if prop.get("schema", {}).get("enum"):
+                obj["enum"] = prop.get("schema", {}).get("enum")
+            if prop.get("label"):
+                obj["label"] = prop.get("label")
+            required_parameters.append(obj)
+
+    if op_property.get("requestBody"):
+        schema = get_json_request_body_schema(op_property)
+        body_properties = schema.get("properties") or {}
+        required = schema.get("required")
+        for prop in body_properties.keys():
+            pval = body_properties[prop]
+            if pval.get("required") or (required and prop in required):
+                obj = {
+                    "name": prop,
+                    "type": pval.get("type"),
+                    "description": pval.get("description"),
+                    "title": pval.get("title"),
+                    "format": pval.get("format"),
+                }
+                if pval.get("label"):
+                    obj["label"] = pval.get("label")
+                if pval.get("enum"):
+                    obj["enum"] = pval.get("enum")
+                required_parameters.append(obj)
+    return required_parameters
+
+
+def build_x_lookup_specs(response_obj_200: Optional[dict]) -> List[Dict]:
+    """
+    Collects the x-lookup extensions of an array response. parameter_name is
+    None when the array items themselves are looked up.
+    """
+    specs: List[Dict] = []
+    if not response_obj_200:
+        return specs
+    if response_obj_200.get("schema", {}).get("type") != "array":
+        return specs
+    items = response_obj_200.get("schema", {}).get("items", {})
+    if items.get("x-lookup") is not None:
+        if items.get("type") in PRIMITIVE_TYPES:
+            x_lookup = items.get("x-lookup")
+            specs.append(
+                {
+                    "path": x_lookup.get("path"),
+                    "method": x_lookup.get("method"),
+                    "parameter": x_lookup.get("parameter"),
+                    "additional_parameters": x_lookup.get("additional_parameters"),
+                    "parameter_name": None,
+                }
+            )
+    elif items.get("properties"):
+        item_properties = items.get("properties", {})
+        for item_property in item_properties:
+            item_obj = item_properties.get(item_property)
+            x_lookup = item_obj.get("x-lookup", {}) if item_obj else {}
+            if item_obj and x_lookup.get("parameter"):
+                specs.append(
+                    {
+                        "path": x_lookup.get("path"),
+                        "method": x_lookup.get("method"),
+                        "parameter": x_lookup.get("parameter"),
+                        "additional_parameters": x_lookup.get("additional_parameters"),
+                        "parameter_name": item_property,
+                    }
+                )
+    return specs
+
+
+class OperationIndexEntry(BaseModel):
+    """
+    Everything the pipeline needs about one (path, method) of a plugin.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    path: str
+    method: str
+    position: int
+    operation: Dict
+    url_template: str
+    output_modules: Tuple[FlowPath, ...] = ()
+    filter: Optional[FlowPath] = None
+    required_parameters: Tuple[Dict, ...] = ()
+    query_parameter_names: Tuple[str, ...] = ()
+    body_property_names: Tuple[str, ...] = ()
+    x_lookups: Tuple[Dict, ...] = ()
+
+
+class OperationIndex(BaseModel):
+    """
+    Immutable (path, method) -> OperationIndexEntry map built once per plugin.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    entries: Dict[Tuple[str, str], OperationIndexEntry] = {}
+
+    def get(self, path: Optional[str], method: Optional[str]):
+        if path is None or method is None:
+            return None
+        return self.entries.get(normalize_operation_key(path, method))
+
+    def find_matching(self, operation: str, method: str) -> List[OperationIndexEntry]:
+        """
+        Entries whose path equals the operation or is a suffix of it, which
+        also matches full api urls.
+        """
+        operation, method = normalize_operation_key(operation, method)
+        matches: Dict[int, OperationIndexEntry] = {}
+        entry = self.entries.get((operation, method))
+        if entry is not None:
+            matches[entry.position] = entry
+        index = operation.find("/")
+        while index != -1:
+            entry = self.entries.get((operation[index:], method))
+            if entry is not None:
+                matches[entry.position] = entry
+            index = operation.find("/", index + 1)
+        return [matches[position] for position in sorted(matches)]
+
+    @staticmethod
+    def build(
+        plugin_operations: Optional[Dict],
+        plugin_op_property_map: Optional[Dict[str, Dict[str, Dict]]],
+        server_url: Optional[str] = None,
+        previous: Optional["OperationIndex"] = None,
+        changed_operations: Optional[Set[Tuple[str, str]]] = None,
+    ) -> "OperationIndex":
+        """
+        Entries of previous are reused for operations not in changed_operations.
+        """
+        server_url = server_url or ""
+        entries: Dict[Tuple[str, str], OperationIndexEntry] = {}
+        position = 0
+        paths = dict.fromkeys(
+            [*(plugin_op_property_map or {}).keys(), *(plugin_operations or {}).keys()]
+        )
+
+        for path in paths:
+            method_map = (plugin_op_property_map or {}).get(path) or {}
+            plugin_method_map = (plugin_operations or {}).get(path) or {}
+            methods = list(method_map.keys())
+            methods.extend(m for m in plugin_method_map.keys() if m not in methods)
+            for method in methods:
+                key = normalize_operation_key(path, method)
+                if key in entries:
+                    continue
+                previous_entry = None
+                if previous is not None and changed_operations is not None:
+                    if (path, method) not in changed_operations:
+                        previous_entry = previous.entries.get(key)
+                if previous_entry is not None and (
+                    previous_entry.path,
+                    previous_entry.method,
+                ) == (path, method):
+                    if previous_entry.position != position:
+                        previous_entry = previous_entry.model_copy(
+                            update={"position": position}
+                        )
+                    entries[key] = previous_entry
+                    position += 1
+                    continue
+                op_property = method_map.get(method) or {}
+                if not isinstance(op_property, dict):
+                    continue
+                plugin_operation = plugin_method_map.get(method)
+                response_obj_200 = (
+                    op_property.get("responses", {})
+                    .get("200", {})
+                    .get("content", {})
+                    .get("application/json")
+                )
+                if server_url.endswith("/") and path.startswith("/"):
+                    url_template = f"{server_url}{path[1:]}"
+                else:
+                    url_template = f"{server_url}{path}"
+                body_properties = (
+                    get_json_request_body_schema(op_property).get("properties") or {}
+                )
+                entries[key] = OperationIndexEntry(
+                    path=path,
+                    method=method,
+                    position=position,
+                    operation=op_property,
+                    url_template=url_template,
+                    output_modules=tuple(
+                        plugin_operation.output_modules if plugin_operation else []
+                    ),
+                    filter=plugin_operation.filter if plugin_operation else None,
+                    required_parameters=tuple(build_required_parameters(op_property)),
+                    query_parameter_names=tuple(
+                        prop.get("name")
+                        for prop in op_property.get("parameters", []) or []
+                        if prop.get("in") == "query"
+                    ),
+                    body_property_names=tuple(body_properties.keys()),
+                    x_lookups=tuple(build_x_lookup_specs(response_obj_200)),
+                )
+                position += 1
+        return OperationIndex(entries=entries)
@@ -0,0 +1,186 @@
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+DEFAULT_SHORTLIST_TOP_K = int(os.environ.get("OPENPLUGIN_SHORTLIST_TOP_K", 0))
+DEFAULT_SHORTLIST_MIN_SCORE = float(
+    os.environ.get("OPENPLUGIN_SHORTLIST_MIN_SCORE", 0.2)
+)
+RANKER_CACHE_SIZE = 64
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+# fmt: off
+STOP_WORDS = frozenset([
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "get", "i",
+    "in", "is", "it", "me", "my", "of", "on", "or", "please", "the", "this",
+    "to", "with", "you",
+])
+# fmt: on
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Lowercased words of text, with snake_case and camelCase names split and a
+    trailing plural "s" removed, so "productIds" matches "product id".
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.findall(text or ""):
+        token = match.lower()
+        if len(token) > 2 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        if token not in STOP_WORDS:
+            tokens.append(token)
+    return tokens
+
+
+class RankedOperation(BaseModel):
+    name: Optional[str]
+    path: Optional[str] = None
+    method: Optional[str] = None
+    score: float
+
+
+class OperationShortlist(BaseModel):
+    top_k: int
+    min_score: float
+    # False when every operation is sent, e.g. no operation matched the prompt
+    applied: bool
+    total_operations: int
+    shortlist: List[RankedOperation] = []
+    # score of the best operation left out, and how far below the last kept
+    # operation it is
+    next_score: Optional[float] = None
+    margin: Optional[float] = None
+
+
+class OperationRanker:
+    """
+    BM25 index over the name, description, x_helpers and human usage examples
+    of functions. Each function is a document, scoring runs locally in numpy.
+    """
+
+    def __init__(self, documents: Sequence[List[str]]):
+        self.document_count = len(documents)
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        term_freqs: List[int] = []
+        doc_lengths = np.zeros(self.document_count, dtype=np.float64)
+        for doc_id, tokens in enumerate(documents):
+            doc_lengths[doc_id] = len(tokens)
+            for token, count in Counter(tokens).items():
+                term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                doc_ids.append(doc_id)
+                term_freqs.append(count)
+        self.vocabulary = vocabulary
+
+        terms = np.array(term_ids, dtype=np.int64)
+        docs = np.array(doc_ids, dtype=np.int64)
+        tf = np.array(term_freqs, dtype=np.float64)
+        doc_freq = np.bincount(terms, minlength=len(vocabulary))
+        idf = np.log1p((self.document_count - doc_freq + 0.5) / (doc_freq + 0.5))
+        avg_length = doc_lengths.mean() if self.document_count else 0.0
+        norm = BM25_K1 * (
+            1 - BM25_B + BM25_B * doc_lengths[docs] / max(avg_length, 1e-9)
+        )
+        weights = idf[terms] * tf * (BM25_K1 + 1) / (tf + norm)
+
+        # postings of each term, stored contiguously by term id
+        order = np.argsort(terms, kind="stable")
+        self._doc_ids = docs[order]
+        self._weights = weights[order]
+        self._offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(doc_freq, out=self._offsets[1:])
+
+    def score(self, query: str) -> np.ndarray:
+        term_ids = {
+            self.vocabulary[token]
+            for token in tokenize(query)
+            if token in self.vocabulary
+        }
+        if not term_ids:
+            return np.zeros(self.document_count)
+        slices = [
+            slice(self._offsets[term_id], self._offsets[term_id + 1])
+            for term_id in term_ids
+        ]
+        return np.bincount(
+            np.concatenate([self._doc_ids[s] for s in slices]),
+            weights=np.concatenate([self._weights[s] for s in slices]),
+            minlength=self.document_count,
+        )
+
+
+class FunctionIndexCache:
+    """
+    Small LRU of indexes built over a list of compiled functions, keyed by
+    their identity so views sharing the same Function objects reuse them.
+    Entries hold their functions, so ids can't be reused while cached.
+    """
+
+    def __init__(self, build: Callable[[Sequence], Any], max_size: int = 64):
+        self.build = build
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[int, ...], Tuple[tuple, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, functions: Sequence) -> Any:
+        key = tuple(id(function) for function in functions)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                return cached[1]
+        index = self.build(functions)
+        with self._lock:
+            self._entries[key] = (tuple(functions), index)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return index
+
+
+_ranker_cache = FunctionIndexCache(
+    lambda functions: OperationRanker(
+        [function.get_search_terms() for function in functions]
+    ),
+    max_size=RANKER_CACHE_SIZE,
+)
+
+
+def get_ranker(functions: Sequence) -> OperationRanker:
+    return _ranker_cache.get(functions)
+
+
+def shortlist_indexes(
+    scores: np.ndarray, top_k: int, min_score: float
+) -> Optional[List[int]]:
+    """
+    Indexes of the top_k best scores, best first, leaving out the ones below
+    min_score times the best score. None when nothing should be left out.
+    """
+    if top_k <= 0 or len(scores) <= top_k:
+        return None
+    best = float(scores.max()) if len(scores) else 0.0
+    if best <= 0:
+        # no lexical match at all, let the llm see everything
+        return None
+    top = np.argsort(-scores, kind="stable")[:top_k]
+    return [int(i) for i in top if scores[i] >= best * min_score and scores[i] > 0]
+
+
+def get_score_margin(
+    scores: np.ndarray, kept: List[int]
+) -> Tuple[Optional[float], Optional[float]]:
+    kept_set = set(kept)
+    left_out = [score for i, score in enumerate(scores) if i not in kept_set]
+    if not left_out or not kept:
+        return None, None
+    next_score = float(max(left_out))
+    return next_score, float(scores[kept[-1]]) - next_score
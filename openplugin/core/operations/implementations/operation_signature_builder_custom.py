@@ -1,12 +1,12 @@
 import json
 import time
-from typing import List, Optional
+from typing import Any, Callable, List, Optional, Union
 
-from litellm import completion, completion_cost
+from litellm import acompletion, completion, completion_cost
 
 from ...config import Config
 from ...function_providers import FunctionProvider
-from ...functions import Functions
+from ...functions import Function, Functions
 from ...messages import Message, MessageType
 from ...plugin import Plugin
 from ...plugin_detected import PluginDetectedParams, SelectedApiSignatureResponse
@@ -15,9 +15,14 @@ from ..operation_signature_builder import (
 )
 from .operation_signature_builder_with_langchain import (
     LangchainOperationSignatureBuilder,
+    SignatureRequest,
 )
 
 
+class CompletionRequest(SignatureRequest):
+    completion_kwargs: dict
+
+
 # Custom API Signature Selector for OpenAI
 class CustomOperationSignatureBuilder(OperationSignatureBuilder):
     def __init__(
@@ -55,121 +60,166 @@ class CustomOperationSignatureBuilder(OperationSignatureBuilder):
     def run(
         self, messages: List[Message], conversation: Optional[List] = []
     ) -> SelectedApiSignatureResponse:
-        if self.function_provider.get_provider_name().lower() in ["cohere"]:
-            start_test_case_time = time.time()
-            functions = Functions()
-            functions.add_from_plugin(self.plugin, self.selected_operations)
-            # request_prompt = functions.get_x_helpers()
-            request_prompt = ""
-            for message in messages:
-                if message.message_type == MessageType.HumanMessage:
-                    request_prompt += f"\n#PROMPT={message.content}"
-            if len(functions.functions) == 0:
-                return SelectedApiSignatureResponse(
-                    run_completed=True,
-                    modified_input_prompt=request_prompt,
-                    final_text_response="No functions found",
-                    detected_plugin_operations=[],
-                    response_time=round(time.time() - start_test_case_time, 2),
-                    tokens_used=0,
-                    llm_api_cost=0,
-                    llm_calls=[],
-                )
-            f_messages = [
-                msg.get_openai_message()
-                for msg in messages
-                if msg.get_openai_message() is not None
-            ]
-            llm_api_key = None
-            if self.config is not None:
-                if self.function_provider.get_provider_name().lower() == "cohere":
-                    if not self.config.cohere_api_key:
-                        raise ValueError("Cohere API Key is not configured")
-                    else:
-                        llm_api_key = self.config.cohere_api_key
-                if self.function_provider.get_provider_name().lower() == "google":
-                    if not self.config.gemini_api_key:
-                        raise ValueError("Google API Key is not configured")
-                    else:
-                        llm_api_key = self.config.gemini_api_key
-            else:
-                raise ValueError("API Key is not configured")
-
-            detected_plugin_operations: list[PluginDetectedParams] = []
-            function_json = functions.get_litellm_json()
-            model = self.function_provider.get_model_name()
-            start_completion_time = time.time()
-            response = completion(
-                model=model,
-                messages=f_messages,
-                tools=function_json,
-                api_key=llm_api_key,
-                tool_choice="auto",  # auto is default, but we'll be explicit
-            )
-            # print("\nFirst LLM Response:\n", response)
-            response_message = response.choices[0].message
-            response_content = response_message.content
-            tool_calls = response_message.tool_calls
-            cost = completion_cost(completion_response=response)
-            llm_calls: list = []
-            llm_calls.append(
-                {
-                    "used_for": "signature_builder",
-                    "response": response_content,
-                    "model": self.function_provider.get_model_name(),
-                    "cost": cost,
-                    "usage": response.usage.total_tokens,
-                    "messages": f_messages,
-                    "request_prompt": request_prompt,
-                    "llm_latency_seconds": time.time() - start_completion_time,
-                    "response_prompt": response_content,
-                    "temperature": self.function_provider.get_temperature(),
-                    "max_tokens": self.function_provider.get_max_tokens(),
-                    "top_p": self.function_provider.get_top_p(),
-                    "status_code": "200",
-                }
+        if not self.is_litellm_provider():
+            return self.get_langchain_builder().run(messages, conversation)
+        request = self.build_completion_request(messages)
+        if isinstance(request, SelectedApiSignatureResponse):
+            return request
+        start_completion_time = time.time()
+        response = completion(**request.completion_kwargs)
+        return self.build_completion_response(request, response, start_completion_time)
+
+    async def arun(
+        self,
+        messages: List[Message],
+        conversation: Optional[List] = [],
+        on_tool_call: Optional[Callable[[Function, dict], Any]] = None,
+    ) -> SelectedApiSignatureResponse:
+        if not self.is_litellm_provider():
+            return await self.get_langchain_builder().arun(
+                messages, conversation, on_tool_call=on_tool_call
             )
-            if tool_calls and len(tool_calls) > 0:
-                function_name = tool_calls[0].function.name
-                detected_plugin = functions.get_plugin_from_func_name(function_name)
-                detected_function = functions.get_function_from_func_name(function_name)
-                mapped_parameters = json.loads(tool_calls[0].function.arguments)
-                p_detected = PluginDetectedParams(
-                    plugin=detected_plugin,
-                    api_called=detected_function.get_api_url(),
-                    method=detected_function.get_api_method(),
-                    mapped_operation_parameters=mapped_parameters,
-                    path=None,
-                )
-                detected_plugin_operations.append(p_detected)
-                final_text_response = ""
-            else:
-                final_text_response = response_content
-
-            func_response = response.dict()
-            response_obj = SelectedApiSignatureResponse(
+        # litellm completions are not streamed, on_tool_call is never called
+        request = self.build_completion_request(messages)
+        if isinstance(request, SelectedApiSignatureResponse):
+            return request
+        start_completion_time = time.time()
+        response = await acompletion(**request.completion_kwargs)
+        return self.build_completion_response(request, response, start_completion_time)
+
+    def is_litellm_provider(self) -> bool:
+        return self.function_provider.get_provider_name().lower() in ["cohere"]
+
+    def get_langchain_builder(self) -> LangchainOperationSignatureBuilder:
+        return LangchainOperationSignatureBuilder(
+            plugin=self.plugin,
+            function_provider=self.function_provider,
+            config=self.config,
+            selected_operations=self.selected_operations,
+            header=self.header,
+        )
+
+    def build_completion_request(
+        self, messages: List[Message]
+    ) -> Union[CompletionRequest, SelectedApiSignatureResponse]:
+        start_test_case_time = time.time()
+        functions = Functions()
+        functions.add_from_plugin(self.plugin, self.selected_operations)
+        # request_prompt = functions.get_x_helpers()
+        request_prompt = ""
+        for message in messages:
+            if message.message_type == MessageType.HumanMessage:
+                request_prompt += f"\n#PROMPT={message.content}"
+        if len(functions.functions) == 0:
+            return SelectedApiSignatureResponse(
                 run_completed=True,
                 modified_input_prompt=request_prompt,
-                final_text_response=final_text_response,
-                detected_plugin_operations=detected_plugin_operations,
-                response_time=time.time() - start_test_case_time,
-                tokens_used=response.usage.total_tokens,
-                llm_api_cost=cost,
-                llm_calls=llm_calls,
-                function_request_json=function_json,
-                function_response_json=func_response,
+                final_text_response="No functions found",
+                detected_plugin_operations=[],
+                response_time=round(time.time() - start_test_case_time, 2),
+                tokens_used=0,
+                llm_api_cost=0,
+                llm_calls=[],
             )
-            return response_obj
+        f_messages = [
+            msg.get_openai_message()
+            for msg in messages
+            if msg.get_openai_message() is not None
+        ]
+        llm_api_key = None
+        if self.config is not None:
+            if self.function_provider.get_provider_name().lower() == "cohere":
+                if not self.config.cohere_api_key:
+                    raise ValueError("Cohere API Key is not configured")
+                else:
+                    llm_api_key = self.config.cohere_api_key
+            if self.function_provider.get_provider_name().lower() == "google":
+                if not self.config.gemini_api_key:
+                    raise ValueError("Google API Key is not configured")
+                else:
+                    llm_api_key = self.config.gemini_api_key
         else:
-            oai_selector = LangchainOperationSignatureBuilder(
-                plugin=self.plugin,
-                function_provider=self.function_provider,
-                config=self.config,
-                selected_operations=self.selected_operations,
-                header=self.header,
+            raise ValueError("API Key is not configured")
+
+        function_json, compaction_report = functions.get_compacted_litellm_json()
+        return CompletionRequest(
+            start_time=start_test_case_time,
+            functions=functions,
+            request_prompt=request_prompt,
+            f_messages=f_messages,
+            function_json=function_json,
+            tool_compaction=(
+                compaction_report.model_dump() if compaction_report else None
+            ),
+            completion_kwargs={
+                "model": self.function_provider.get_model_name(),
+                "messages": f_messages,
+                "tools": function_json,
+                "api_key": llm_api_key,
+                "tool_choice": "auto",  # auto is default, but we'll be explicit
+            },
+        )
+
+    def build_completion_response(
+        self, request: CompletionRequest, response, start_completion_time: float
+    ) -> SelectedApiSignatureResponse:
+        functions = request.functions
+        detected_plugin_operations: list[PluginDetectedParams] = []
+        # print("\nFirst LLM Response:\n", response)
+        response_message = response.choices[0].message
+        response_content = response_message.content
+        tool_calls = response_message.tool_calls
+        cost = completion_cost(completion_response=response)
+        llm_calls: list = []
+        llm_calls.append(
+            {
+                "used_for": "signature_builder",
+                "response": response_content,
+                "model": self.function_provider.get_model_name(),
+                "cost": cost,
+                "usage": response.usage.total_tokens,
+                "messages": request.f_messages,
+                "request_prompt": request.request_prompt,
+                "llm_latency_seconds": time.time() - start_completion_time,
+                "response_prompt": response_content,
+                "temperature": self.function_provider.get_temperature(),
+                "max_tokens": self.function_provider.get_max_tokens(),
+                "top_p": self.function_provider.get_top_p(),
+                "status_code": "200",
+            }
+        )
+        if tool_calls and len(tool_calls) > 0:
+            function_name = tool_calls[0].function.name
+            detected_plugin = functions.get_plugin_from_func_name(function_name)
+            detected_function = functions.get_function_from_func_name(function_name)
+            mapped_parameters = json.loads(tool_calls[0].function.arguments)
+            p_detected = PluginDetectedParams(
+                plugin=detected_plugin,
+                api_called=detected_function.get_api_url(),
+                method=detected_function.get_api_method(),
+                mapped_operation_parameters=mapped_parameters,
+                path=None,
             )
-            response = oai_selector.run(messages, conversation)
-            return response
+            detected_plugin_operations.append(p_detected)
+            final_text_response = ""
+        else:
+            final_text_response = response_content
+
+        func_response = response.dict()
+        response_obj = SelectedApiSignatureResponse(
+            run_completed=True,
+            modified_input_prompt=request.request_prompt,
+            final_text_response=final_text_response,
+            detected_plugin_operations=detected_plugin_operations,
+            response_time=time.time() - request.start_time,
+            tokens_used=response.usage.total_tokens,
+            llm_api_cost=cost,
+            llm_calls=llm_calls,
+            function_request_json=request.function_json,
+            function_response_json=func_response,
+            tool_compaction=request.tool_compaction,
+        )
+        return response_obj
 
     @classmethod
     def get_pipeline_name(cls) -> str:
@@ -1,20 +1,58 @@
+import asyncio
 import time
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from loguru import logger
+from pydantic import BaseModel, ConfigDict
 
 from ...config import Config
+from ...example_selector import DEFAULT_FEW_SHOT_TOKEN_BUDGET
 from ...execution.implementations.operation_execution_with_imprompt import (
     OperationExecutionParams,
     OperationExecutionWithImprompt,
 )
-from ...function_providers import FunctionProvider, FunctionResponse
+from ...function_hedging import HedgingTrace, arun_hedged
+from ...function_providers import FunctionProvider, FunctionProviders, FunctionResponse
+from ...function_response_cache import (
+    compute_function_cache_key,
+    function_response_cache,
+)
 from ...functions import Function, Functions
 from ...messages import Message, MessageType
+from ...operation_ranker import DEFAULT_SHORTLIST_MIN_SCORE, DEFAULT_SHORTLIST_TOP_K
 from ...plugin import Plugin
 from ...plugin_detected import PluginDetectedParams, SelectedApiSignatureResponse
 from ..operation_signature_builder import (
     OperationSignatureBuilder,
 )
 
+_function_providers: Optional[FunctionProviders] = None
+
+
+def get_function_providers() -> FunctionProviders:
+    # read once on first use, not on import or on every request
+    global _function_providers
+    if _function_providers is None:
+        _function_providers = FunctionProviders.build()
+    return _function_providers
+
+
+class SignatureRequest(BaseModel):
+    """Everything prepared for the function provider call of one run."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    start_time: float
+    functions: Functions
+    request_prompt: str
+    f_messages: List
+    function_json: Any
+    tool_compaction: Optional[dict] = None
+    operation_shortlist: Optional[dict] = None
+    few_shot_selection: Optional[dict] = None
+    x_few_shot_examples: List = []
+    cache_key: Optional[str] = None
+
 
 # Custom API Signature Selector for OpenAI
 class LangchainOperationSignatureBuilder(OperationSignatureBuilder):
@@ -53,13 +91,154 @@ class LangchainOperationSignatureBuilder(OperationSignatureBuilder):
     def run(
         self, messages: List[Message], conversation: Optional[List] = []
     ) -> SelectedApiSignatureResponse:
-        system_prompt = None
-        x_few_shot_examples: List = []
+        request = self.build_signature_request(messages, conversation)
+        if isinstance(request, SelectedApiSignatureResponse):
+            return request
+        func_response = self.get_cached_function_response(request)
+        if func_response is None:
+            try:
+                func_response = self.function_provider.run(
+                    request.request_prompt,
+                    request.function_json,
+                    self.config,
+                    conversation=conversation,
+                    x_few_shot_examples=request.x_few_shot_examples,
+                )
+            except Exception as e:
+                print(e)
+                return self.build_failed_response(request, conversation, e)
+            self.cache_function_response(request, func_response)
+        x_dependent = self.resolve_x_dependent_parameters(request, func_response)
+        return self.build_signature_response(
+            request, conversation, func_response, x_dependent
+        )
 
+    async def arun(
+        self,
+        messages: List[Message],
+        conversation: Optional[List] = [],
+        on_tool_call: Optional[Callable[[Function, dict], Any]] = None,
+    ) -> SelectedApiSignatureResponse:
+        request = self.build_signature_request(messages, conversation)
+        if isinstance(request, SelectedApiSignatureResponse):
+            return request
+        func_response = self.get_cached_function_response(request)
+        hedging = None
+        streaming = None
+        if func_response is None:
+            try:
+                if on_tool_call is not None:
+                    func_response, streaming = await self.astream_function_provider(
+                        request, conversation, on_tool_call
+                    )
+                else:
+                    func_response, hedging = await self.arun_function_provider(
+                        request, conversation
+                    )
+            except Exception as e:
+                print(e)
+                return self.build_failed_response(request, conversation, e)
+            self.cache_function_response(request, func_response)
+        x_dependent: Tuple = (None, None)
+        if func_response.is_function_call:
+            # x-dependent resolution calls the dependent apis, keep it off the loop
+            x_dependent = await asyncio.to_thread(
+                self.resolve_x_dependent_parameters, request, func_response
+            )
+        return self.build_signature_response(
+            request, conversation, func_response, x_dependent, hedging, streaming
+        )
+
+    async def astream_function_provider(
+        self,
+        request: SignatureRequest,
+        conversation: Optional[List],
+        on_tool_call: Callable[[Function, dict], Any],
+    ) -> Tuple[FunctionResponse, Dict[str, Any]]:
+        """
+        Streams the function call and passes the first tool call to
+        on_tool_call once its arguments are complete and valid, while the rest
+        of the response is still generated. Functions with x-dependent
+        parameters are not passed on, their arguments change on resolution.
+        """
+        start_time = time.time()
+        streaming: Dict[str, Any] = {
+            "tool_call_seconds": None,
+            "response_seconds": None,
+            "dispatched": False,
+            "validation_errors": None,
+        }
+
+        def on_streamed_tool_call(function_name: str, arguments: dict):
+            streaming["tool_call_seconds"] = round(time.time() - start_time, 4)
+            function = request.functions.get_function_from_func_name(function_name)
+            if function is None:
+                streaming["validation_errors"] = [f"unknown function {function_name}"]
+                return
+            errors = function.validate_arguments(arguments)
+            if errors:
+                streaming["validation_errors"] = errors
+                return
+            if function.has_x_dependent_properties():
+                return
+            try:
+                streaming["dispatched"] = bool(on_tool_call(function, arguments))
+            except Exception as e:
+                logger.warning(f"[STREAMED-TOOL-CALL-DISPATCH-FAILED] {e}")
+            logger.info(
+                f"[STREAMED-TOOL-CALL] name={function_name}, dispatched={streaming['dispatched']}, seconds={streaming['tool_call_seconds']}"  # noqa: E501
+            )
+
+        func_response = await self.function_provider.astream_run(
+            request.request_prompt,
+            request.function_json,
+            self.config,
+            on_streamed_tool_call,
+            conversation=conversation,
+            x_few_shot_examples=request.x_few_shot_examples,
+        )
+        streaming["response_seconds"] = round(time.time() - start_time, 4)
+        return func_response, streaming
+
+    async def arun_function_provider(
+        self, request: SignatureRequest, conversation: Optional[List]
+    ) -> Tuple[FunctionResponse, Optional[HedgingTrace]]:
+        hedge_provider = self.get_hedge_function_provider()
+        if hedge_provider is None:
+            func_response = await self.function_provider.arun(
+                request.request_prompt,
+                request.function_json,
+                self.config,
+                conversation=conversation,
+                x_few_shot_examples=request.x_few_shot_examples,
+            )
+            return func_response, None
+        return await arun_hedged(
+            self.function_provider,
+            hedge_provider,
+            request.request_prompt,
+            request.function_json,
+            self.config,
+            conversation=conversation,
+            x_few_shot_examples=request.x_few_shot_examples,
+        )
+
+    def get_hedge_function_provider(self) -> Optional[FunctionProvider]:
+        if not self.config or not self.config.hedge_function_provider:
+            return None
+        provider = get_function_providers().get_by_name(
+            self.config.hedge_function_provider
+        )
+        if provider.name == self.function_provider.name:
+            return None
+        return provider
+
+    def build_signature_request(
+        self, messages: List[Message], conversation: Optional[List]
+    ) -> Union[SignatureRequest, SelectedApiSignatureResponse]:
         start_test_case_time = time.time()
         functions = Functions()
         functions.add_from_plugin(self.plugin, self.selected_operations)
-        llm_calls: list = []
         # request_prompt = functions.get_x_helpers()
         request_prompt = ""
         for message in messages:
@@ -75,10 +254,10 @@ class LangchainOperationSignatureBuilder(OperationSignatureBuilder):
                 response_time=round(time.time() - start_test_case_time, 2),
                 tokens_used=0,
                 llm_api_cost=0,
-                llm_calls=llm_calls,
-                system_prompt=system_prompt,
+                llm_calls=[],
+                system_prompt=None,
                 conversations=conversation,
-                examples=x_few_shot_examples,
+                examples=[],
             )
 
         f_messages = [
@@ -87,91 +266,204 @@ class LangchainOperationSignatureBuilder(OperationSignatureBuilder):
             if msg.get_openai_message() is not None
         ]
 
-        function_json = functions.get_json()
+        top_k = DEFAULT_SHORTLIST_TOP_K
+        min_score = DEFAULT_SHORTLIST_MIN_SCORE
+        if self.config and self.config.shortlist_top_k is not None:
+            top_k = self.config.shortlist_top_k
+        if self.config and self.config.shortlist_min_score is not None:
+            min_score = self.config.shortlist_min_score
+        prompt = " ".join(
+            message.content
+            for message in messages
+            if message.message_type == MessageType.HumanMessage
+        )
+        functions, shortlist_report = functions.get_shortlist(
+            prompt, top_k=top_k, min_score=min_score
+        )
+        operation_shortlist = None
+        if shortlist_report is not None:
+            operation_shortlist = shortlist_report.model_dump()
 
-        tool_id = 1
-        for function in functions.functions:
-            if function.x_few_shot_examples:
-                for x in function.x_few_shot_examples:
-                    vals = {k: v for k, v in x.items()}
-                    vals["tool_call_id"] = tool_id
-                    vals["name"] = function.name
-                    x_few_shot_examples.append(vals)
-            tool_id += 1
+        function_json, compaction_report = functions.get_compacted_json()
+        tool_compaction = None
+        if compaction_report is not None:
+            tool_compaction = compaction_report.model_dump()
 
-        final_text_response = None
-        detected_plugin_operations: list[PluginDetectedParams] = []
-        func_response_metadata_json = None
-        try:
-            # add x-helpers as conversation
-            if conversation:
-                for func in functions.functions:
-                    x_helper_prompt = ""
-                    if func.x_helpers and len(func.x_helpers) > 0:
-                        x_helper_prompt += f"For API Path={func.path} and method={func.method}, \n#HELPERS={func.x_helpers}"
-                    if func.param_properties:
-                        for prop in func.param_properties:
-                            if prop.x_helpers and len(prop.x_helpers) > 0:
-                                x_helper_prompt += f"\nFor property: {prop.name}, #HELPERS={prop.x_helpers}"
-                    if x_helper_prompt and len(x_helper_prompt) > 0:
-                        conversation.append(
-                            {"role": "system", "content": x_helper_prompt.strip()}
-                        )
-
-            func_response: FunctionResponse = self.function_provider.run(
-                request_prompt,
+        few_shot_token_budget = DEFAULT_FEW_SHOT_TOKEN_BUDGET
+        if self.config and self.config.few_shot_token_budget is not None:
+            few_shot_token_budget = self.config.few_shot_token_budget
+        few_shot_examples, example_selection = functions.get_few_shot_examples(
+            prompt, token_budget=few_shot_token_budget
+        )
+        few_shot_selection = None
+        if example_selection is not None:
+            few_shot_selection = example_selection.model_dump()
+
+        # add x-helpers as conversation
+        if conversation:
+            for func in functions.functions:
+                x_helper_prompt = ""
+                if func.x_helpers and len(func.x_helpers) > 0:
+                    x_helper_prompt += f"For API Path={func.path} and method={func.method}, \n#HELPERS={func.x_helpers}"
+                if func.param_properties:
+                    for prop in func.param_properties:
+                        if prop.x_helpers and len(prop.x_helpers) > 0:
+                            x_helper_prompt += f"\nFor property: {prop.name}, #HELPERS={prop.x_helpers}"
+                if x_helper_prompt and len(x_helper_prompt) > 0:
+                    conversation.append(
+                        {"role": "system", "content": x_helper_prompt.strip()}
+                    )
+
+        cache_key = None
+        if function_response_cache.is_enabled(
+            self.config.cache_function_response if self.config else None
+        ):
+            cache_key = compute_function_cache_key(
+                self.function_provider.get_model_name(),
+                self.function_provider.get_temperature(),
                 function_json,
-                self.config,
-                conversation=conversation,
-                x_few_shot_examples=x_few_shot_examples,
-            )
-            func_response_metadata_json = func_response.response_metadata
-            system_prompt = func_response.system_prompt
-            llm_calls.append(
-                {
-                    "used_for": "signature_builder",
-                    "response": func_response.response_content,
-                    "model": self.function_provider.get_model_name(),
-                    "cost": func_response.cost,
-                    "usage": func_response.usage,
-                    "messages": f_messages,
-                    "request_prompt": request_prompt,
-                    "llm_latency_seconds": func_response.llm_latency_seconds,
-                    "response_prompt": func_response.response_content,
-                    "temperature": self.function_provider.get_temperature(),
-                    "max_tokens": self.function_provider.get_max_tokens(),
-                    "top_p": self.function_provider.get_top_p(),
-                    "status_code": "200",
-                }
+                request_prompt,
+                conversation,
+                few_shot_examples,
             )
-        except Exception as e:
-            print(e)
-            return SelectedApiSignatureResponse(
-                run_completed=False,
-                modified_input_prompt=request_prompt,
-                final_text_response="Reason: " + str(e),
-                detected_plugin_operations=[],
-                response_time=round(time.time() - start_test_case_time, 2),
-                tokens_used=0,
-                llm_api_cost=0,
-                llm_calls=llm_calls,
-                function_request_json=function_json,
-                system_prompt=system_prompt,
-                conversations=conversation,
-                examples=x_few_shot_examples,
+
+        return SignatureRequest(
+            start_time=start_test_case_time,
+            functions=functions,
+            request_prompt=request_prompt,
+            f_messages=f_messages,
+            function_json=function_json,
+            tool_compaction=tool_compaction,
+            operation_shortlist=operation_shortlist,
+            few_shot_selection=few_shot_selection,
+            x_few_shot_examples=list(few_shot_examples),
+            cache_key=cache_key,
+        )
+
+    def get_cached_function_response(
+        self, request: SignatureRequest
+    ) -> Optional[FunctionResponse]:
+        if request.cache_key is None:
+            return None
+        return function_response_cache.get(request.cache_key, self.plugin.content_hash)
+
+    def cache_function_response(
+        self, request: SignatureRequest, func_response: FunctionResponse
+    ):
+        if request.cache_key is not None:
+            function_response_cache.put(
+                request.cache_key,
+                self.plugin.get_source_id(),
+                self.plugin.content_hash,
+                func_response,
             )
 
-        x_dep_tracing = None
+    def build_failed_response(
+        self,
+        request: SignatureRequest,
+        conversation: Optional[List],
+        error: Exception,
+    ) -> SelectedApiSignatureResponse:
+        return SelectedApiSignatureResponse(
+            run_completed=False,
+            modified_input_prompt=request.request_prompt,
+            final_text_response="Reason: " + str(error),
+            detected_plugin_operations=[],
+            response_time=round(time.time() - request.start_time, 2),
+            tokens_used=0,
+            llm_api_cost=0,
+            llm_calls=[],
+            function_request_json=request.function_json,
+            tool_compaction=request.tool_compaction,
+            operation_shortlist=request.operation_shortlist,
+            few_shot_selection=request.few_shot_selection,
+            system_prompt=None,
+            conversations=conversation,
+            examples=request.x_few_shot_examples,
+        )
+
+    def resolve_x_dependent_parameters(
+        self, request: SignatureRequest, func_response: FunctionResponse
+    ) -> Tuple:
+        if not func_response.is_function_call:
+            return None, None
+        detected_function = request.functions.get_function_from_func_name(
+            func_response.detected_function_name
+        )
+        return self.get_x_dependent_parameters(
+            request.request_prompt,
+            detected_function,
+            request.function_json,
+            func_response.detected_function_arguments,
+        )
+
+    def build_signature_response(
+        self,
+        request: SignatureRequest,
+        conversation: Optional[List],
+        func_response: FunctionResponse,
+        x_dependent: Tuple,
+        hedging: Optional[HedgingTrace] = None,
+        streaming: Optional[Dict[str, Any]] = None,
+    ) -> SelectedApiSignatureResponse:
+        llm_calls = [
+            {
+                "used_for": "signature_builder",
+                "response": func_response.response_content,
+                "model": self.function_provider.get_model_name(),
+                "cost": func_response.cost,
+                "usage": func_response.usage,
+                "messages": request.f_messages,
+                "request_prompt": request.request_prompt,
+                "llm_latency_seconds": func_response.llm_latency_seconds,
+                "response_prompt": func_response.response_content,
+                "temperature": self.function_provider.get_temperature(),
+                "max_tokens": self.function_provider.get_max_tokens(),
+                "top_p": self.function_provider.get_top_p(),
+                "status_code": "200",
+                "cached": func_response.cached,
+                "queue_wait_seconds": func_response.queue_wait_seconds,
+            }
+        ]
+        tokens_used = 0 if func_response.cached else func_response.total_tokens
+        llm_api_cost = 0 if func_response.cached else func_response.cost
+        if hedging is not None:
+            llm_calls[0]["model"] = next(
+                a.model for a in hedging.attempts if a.status == "won"
+            )
+            # the other attempt was paid for as well
+            for attempt in hedging.attempts:
+                if attempt.status != "won":
+                    llm_calls.append(
+                        {
+                            "used_for": "signature_builder_hedge",
+                            "model": attempt.model,
+                            "cost": attempt.cost,
+                            "usage": attempt.total_tokens,
+                            "llm_latency_seconds": attempt.latency_seconds,
+                            "status_code": attempt.status,
+                        }
+                    )
+            tokens_used = hedging.total_tokens
+            llm_api_cost = hedging.total_cost
+        final_text_response = None
+        detected_plugin_operations: list[PluginDetectedParams] = []
+        x_dependent_params, x_dep_tracing = x_dependent
         response_obj_200 = None
+        cache_trace = None
+        if request.cache_key is not None:
+            cache_trace = {
+                "hit": func_response.cached,
+                "backend": function_response_cache.backend.name,
+                "key": request.cache_key,
+            }
         if func_response.is_function_call:
             function_name = func_response.detected_function_name
+            functions = request.functions
             detected_plugin = functions.get_plugin_from_func_name(function_name)
             detected_function = functions.get_function_from_func_name(function_name)
             response_obj_200 = detected_function.response_obj_200
             mapped_parameters = func_response.detected_function_arguments
-            x_dependent_params, x_dep_tracing = self.get_x_dependent_parameters(
-                request_prompt, detected_function, function_json, mapped_parameters
-            )
             if x_dependent_params and len(x_dependent_params) > 0:
                 mapped_parameters = x_dependent_params
             p_detected = PluginDetectedParams(
@@ -187,20 +479,26 @@ class LangchainOperationSignatureBuilder(OperationSignatureBuilder):
 
         response_obj = SelectedApiSignatureResponse(
             run_completed=True,
-            modified_input_prompt=request_prompt,
+            modified_input_prompt=request.request_prompt,
             final_text_response=final_text_response,
             detected_plugin_operations=detected_plugin_operations,
-            response_time=time.time() - start_test_case_time,
-            tokens_used=func_response.total_tokens,
-            llm_api_cost=func_response.cost,
+            response_time=time.time() - request.start_time,
+            tokens_used=tokens_used,
+            llm_api_cost=llm_api_cost,
             llm_calls=llm_calls,
-            function_request_json=function_json,
-            function_response_json=func_response_metadata_json,
+            function_request_json=request.function_json,
+            function_response_json=func_response.response_metadata,
             x_dep_tracing=x_dep_tracing,
+            tool_compaction=request.tool_compaction,
+            operation_shortlist=request.operation_shortlist,
+            few_shot_selection=request.few_shot_selection,
+            function_response_cache=cache_trace,
+            hedging=hedging.model_dump() if hedging else None,
+            streaming=streaming,
             response_obj_200=response_obj_200,
-            system_prompt=system_prompt,
+            system_prompt=func_response.system_prompt,
             conversations=conversation,
-            examples=x_few_shot_examples,
+            examples=request.x_few_shot_examples,
         )
         return response_obj
 
@@ -261,6 +559,7 @@ class LangchainOperationSignatureBuilder(OperationSignatureBuilder):
                                     response_obj_200=detected_function.response_obj_200,
                                     function_provider=self.function_provider,
                                     plugin_op_property_map=self.plugin.plugin_op_property_map,
+                                    operation_index=self.plugin.get_operation_index(),
                                 )
                                 ex = OperationExecutionWithImprompt(params)
                                 response = ex.run()
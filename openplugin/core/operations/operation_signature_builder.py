@@ -1,8 +1,10 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Any, Callable, List, Optional
 
 from ..config import Config
 from ..function_providers import FunctionProvider
+from ..functions import Function
 from ..messages import Message
 from ..plugin import Plugin
 from ..plugin_detected import SelectedApiSignatureResponse
@@ -52,6 +54,20 @@ class OperationSignatureBuilder(ABC):
         """
         pass
 
+    async def arun(
+        self,
+        messages: List[Message],
+        conversation: Optional[List] = [],
+        on_tool_call: Optional[Callable[[Function, dict], Any]] = None,
+    ) -> SelectedApiSignatureResponse:
+        """
+        Async variant of run, builders without a native one run it on a worker
+        thread so the event loop is not blocked. Builders that stream the
+        function call pass on_tool_call the detected function and its
+        validated arguments before the response is complete.
+        """
+        return await asyncio.to_thread(self.run, messages, conversation)
+
     @classmethod
     @abstractmethod
     def get_pipeline_name(cls) -> str:
@@ -1,12 +1,31 @@
 import json
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 
-import jsonref
 import requests
 import yaml
 from pydantic import AnyHttpUrl, BaseModel, Field, ValidationError
 
 from .flow_path import FlowPath
+from .manifest_fetcher import manifest_fetcher
+from .openapi_stream import DEFAULT_CHUNK_SIZE, read_openapi_doc, read_openapi_doc_file
+from .operation_index import OperationIndex
+from .ref_resolver import ExternalRefError, RefResolver, resolve_refs
+
+
+def get_plugin_source_id(openapi_doc_obj: dict, source: Optional[str] = None) -> str:
+    """
+    Identifies the plugin every version of a doc belongs to: the url or file it
+    was loaded from, else its name and server url, so plugins that only share
+    a name are kept apart.
+    """
+    if source:
+        return source
+    name = (openapi_doc_obj.get("x-openplugin") or {}).get("name") or ""
+    servers = openapi_doc_obj.get("servers") or []
+    if isinstance(servers, dict):
+        servers = [servers]
+    server_url = servers[0].get("url") or "" if servers else ""
+    return f"{name}@{server_url}"
 
 
 class PluginAuth(BaseModel):
@@ -53,10 +72,18 @@ class Plugin(BaseModel):
     # first str is the path, second str is the method
     plugin_operations: Optional[Dict[str, Dict[str, PluginOperation]]] = None
     plugin_op_property_map: Optional[Dict[str, Dict[str, Dict]]] = None
+    # key of the compiled plugin cache entry this plugin belongs to
+    content_hash: Optional[str] = None
+    # where the plugin was loaded from, see get_source_id
+    source_id: Optional[str] = None
+    operation_index: Optional[OperationIndex] = None
 
     def get_openapi_doc_json(self):
         return requests.get(self.openapi_doc_url).json()
 
+    def get_source_id(self) -> str:
+        return self.source_id or get_plugin_source_id(self.openapi_doc_obj)
+
     def get_stuffed_openapi_doc_json(self):
         manifest_obj = requests.get(self.manifest_url).json()
         api_properties = {}
@@ -93,7 +120,16 @@ class Plugin(BaseModel):
         return False
 
     def get_manifest_dict(self):
-        j = self.dict(exclude={"api_endpoints", "manifest_url", "auth"})
+        j = self.dict(
+            exclude={
+                "api_endpoints",
+                "manifest_url",
+                "auth",
+                "content_hash",
+                "operation_index",
+                "source_id",
+            }
+        )
         j["auth"] = self.auth.dict(exclude_none=True)
         return j
 
@@ -134,57 +170,94 @@ class Plugin(BaseModel):
     def get_output_port_types(self):
         return [output.get_output_port_type() for output in self.output_modules]
 
+    def get_operation_index(self) -> OperationIndex:
+        if self.operation_index is None:
+            server_url = None
+            servers = self.openapi_doc_obj.get("servers")
+            if isinstance(servers, list) and servers:
+                server_url = servers[0].get("url")
+            self.operation_index = OperationIndex.build(
+                self.plugin_operations, self.plugin_op_property_map, server_url
+            )
+        return self.operation_index
+
     def get_supported_output_modules(self, operation: str, method: str):
         supported_output_modules = []
         if self.output_modules:
             supported_output_modules.extend(self.output_modules)
-        if self.plugin_operations:
-            for key1 in self.plugin_operations.keys():
-                if key1.lower() == operation.lower() or operation.lower().endswith(
-                    key1.lower()
-                ):
-                    for key2 in self.plugin_operations[key1].keys():
-                        if key2.lower() == method.lower():
-                            if self.plugin_operations[key1][key2].output_modules:
-                                supported_output_modules.extend(
-                                    self.plugin_operations[key1][key2].output_modules
-                                )
+        for entry in self.get_operation_index().find_matching(operation, method):
+            supported_output_modules.extend(entry.output_modules)
         return supported_output_modules
 
     def get_filter_module(self, operation: str, method: str):
-        if self.plugin_operations:
-            for key1 in self.plugin_operations.keys():
-                if key1.lower() == operation.lower() or operation.lower().endswith(
-                    key1.lower()
-                ):
-                    for key2 in self.plugin_operations[key1].keys():
-                        if key2.lower() == method.lower():
-                            if self.plugin_operations[key1][key2].filter:
-                                return self.plugin_operations[key1][key2].filter
+        for entry in self.get_operation_index().find_matching(operation, method):
+            if entry.filter:
+                return entry.filter
         return None
 
 
 class PluginBuilder:
     @staticmethod
-    def build_from_openapi_doc_url(openapi_doc_url: str):
-        openapi_doc_obj = requests.get(openapi_doc_url).json()
+    def build_from_openapi_doc_url(openapi_doc_url: str, streaming: bool = False):
+        """
+        With streaming, the response is decoded as it is received instead of
+        going through the manifest cache. Meant for very large specs.
+        """
+        if streaming:
+            with requests.get(
+                openapi_doc_url,
+                stream=True,
+                timeout=manifest_fetcher.timeout_seconds,
+            ) as response:
+                response.raise_for_status()
+                openapi_doc_obj = read_openapi_doc(
+                    response.iter_content(chunk_size=DEFAULT_CHUNK_SIZE)
+                )
+            return PluginBuilder.build_from_openapi_doc_obj(
+                openapi_doc_obj, resolve_per_operation=True
+            )
+        openapi_doc_obj = manifest_fetcher.fetch_json(openapi_doc_url)
         return PluginBuilder.build_from_openapi_doc_obj(openapi_doc_obj)
 
     @staticmethod
-    def build_from_openapi_doc_file(openapi_doc_file: str):
+    def build_from_openapi_doc_file(openapi_doc_file: str, streaming: bool = False):
+        if streaming:
+            return PluginBuilder.build_from_openapi_doc_obj(
+                read_openapi_doc_file(openapi_doc_file), resolve_per_operation=True
+            )
         with open(openapi_doc_file, "r") as file:
             data = file.read()
             openapi_doc_json = json.loads(data)
             return PluginBuilder.build_from_openapi_doc_obj(openapi_doc_json)
 
     @staticmethod
-    def build_from_openapi_doc_obj(openapi_doc_obj: dict):
+    def build_from_openapi_doc_obj(
+        openapi_doc_obj: dict,
+        previous: Optional[Plugin] = None,
+        changed_operations: Optional[Set[Tuple[str, str]]] = None,
+        resolve_per_operation: bool = False,
+    ):
+        """
+        With a previous version of the plugin and the operations changed since,
+        the parsed and resolved form of every other operation is reused.
+
+        resolve_per_operation resolves the refs of one operation at a time,
+        sharing resolved components, instead of copying the whole resolved doc.
+        """
+        reuse_previous = previous is not None and changed_operations is not None
+
+        def get_previous(mapping: Optional[Dict], path: str, method: str):
+            if changed_operations is None or (path, method) in changed_operations:
+                return None
+            return (mapping or {}).get(path, {}).get(method)
+
         if openapi_doc_obj and openapi_doc_obj.get("x-plugin-auth"):
             if (
                 openapi_doc_obj.get("x-plugin-auth", {}).get("type")
                 and openapi_doc_obj.get("x-plugin-auth", {}).get("type") == "none"
             ):
-                openapi_doc_obj["x-plugin-auth"] = None
+                # copy so the caller's doc (and its cache hash) stays untouched
+                openapi_doc_obj = {**openapi_doc_obj, "x-plugin-auth": None}
         try:
             x_openplugin = openapi_doc_obj.get("x-openplugin")
             if x_openplugin is None:
@@ -208,16 +281,23 @@ class PluginBuilder:
             for path, path_obj in openapi_doc_obj.get("paths", {}).items():
                 method_props = {}
                 for method, method_obj in path_obj.items():
-                    method_props[method] = PluginOperation(
-                        human_usage_examples=method_obj.get(
-                            "x-human-usage-examples", []
-                        ),
-                        plugin_signature_helpers=method_obj.get(
-                            "x-plugin-signature-helpers", []
-                        ),
-                        output_modules=method_obj.get("x-output-modules", []),
-                        filter=method_obj.get("x-filter"),
+                    plugin_operation = get_previous(
+                        previous.plugin_operations if previous else None,
+                        path,
+                        method,
                     )
+                    if plugin_operation is None:
+                        plugin_operation = PluginOperation(
+                            human_usage_examples=method_obj.get(
+                                "x-human-usage-examples", []
+                            ),
+                            plugin_signature_helpers=method_obj.get(
+                                "x-plugin-signature-helpers", []
+                            ),
+                            output_modules=method_obj.get("x-output-modules", []),
+                            filter=method_obj.get("x-filter"),
+                        )
+                    method_props[method] = plugin_operation
                 plugin_operations[path] = method_props
 
             api_endpoints: set = set()
@@ -226,16 +306,35 @@ class PluginBuilder:
                 api_endpoints.add(f"{server_url}{key}")
 
             plugin_op_property_map: Dict[str, Dict[str, Dict]] = {}
-            if openapi_doc_obj:
-                openapi_doc_json = to_plain_dict(
-                    jsonref.JsonRef.replace_refs(openapi_doc_obj)
-                )
+            if reuse_previous or resolve_per_operation:
+                resolver = RefResolver(openapi_doc_obj)
+                try:
+                    for path, path_obj in openapi_doc_obj.get("paths", {}).items():
+                        resolved_properties = {}
+                        for method, method_obj in path_obj.items():
+                            op_property = get_previous(
+                                previous.plugin_op_property_map if previous else None,
+                                path,
+                                method,
+                            )
+                            if op_property is None:
+                                op_property = resolver.resolve_node(method_obj)
+                            resolved_properties[method] = op_property
+                        plugin_op_property_map[path] = resolved_properties
+                except ExternalRefError:
+                    # remote refs are only resolved over the whole doc
+                    if reuse_previous:
+                        raise
+                    resolve_per_operation = False
+                    plugin_op_property_map = {}
+            if not (reuse_previous or resolve_per_operation) and openapi_doc_obj:
+                openapi_doc_json = resolve_refs(openapi_doc_obj)
                 for path in openapi_doc_json.get("paths", {}).keys():
                     path_obj = openapi_doc_json.get("paths", {}).get(path, {})
                     method_properties: Dict[str, Dict] = {}
                     for method in path_obj.keys():
                         method_obj = path_obj.get(method, {})
-                        method_props[method] = method_obj
+                        method_properties[method] = method_obj
                     plugin_op_property_map[path] = method_properties
 
             plugin = Plugin(
@@ -254,17 +353,19 @@ class PluginBuilder:
                 api_endpoints=api_endpoints,
                 plugin_operations=plugin_operations,
                 plugin_op_property_map=plugin_op_property_map,
+                operation_index=OperationIndex.build(
+                    plugin_operations,
+                    plugin_op_property_map,
+                    server_url,
+                    previous=(
+                        previous.operation_index
+                        if previous and reuse_previous
+                        else None
+                    ),
+                    changed_operations=changed_operations,
+                ),
             )
         except ValidationError as e:
             print(e.errors())
             raise Exception(f"Invalid openplugin openapi doc. {str(e)}")
         return plugin
-
-
-def to_plain_dict(data):
-    if isinstance(data, dict):
-        return {key: to_plain_dict(value) for key, value in data.items()}
-    elif isinstance(data, list):
-        return [to_plain_dict(item) for item in data]
-    else:
-        return data
@@ -0,0 +1,419 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+from pydantic import BaseModel, PrivateAttr
+
+from .function_response_cache import function_response_cache
+from .functions import Function, Functions, get_operation_key
+from .manifest_fetcher import FetchedManifest, manifest_fetcher
+from .openapi_stream import STREAMING_MIN_BYTES, iter_file_chunks
+from .plugin import Plugin, PluginBuilder, get_plugin_source_id
+from .plugin_fingerprint import DocFingerprint
+from .records import Record
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("OPENPLUGIN_PLUGIN_CACHE_MAX_ENTRIES", 64))
+DEFAULT_MAX_MEMORY_MB = int(
+    os.environ.get("OPENPLUGIN_PLUGIN_CACHE_MAX_MEMORY_MB", 512)
+)
+
+
+def compute_openapi_doc_hash(openapi_doc_obj: dict) -> str:
+    """
+    Stable content hash of an openapi doc, independent of key order.
+    """
+    data = json.dumps(
+        openapi_doc_obj, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def compute_url_etag_key(openapi_doc_url: str, etag: str) -> str:
+    return hashlib.sha256(f"{openapi_doc_url}\n{etag}".encode("utf-8")).hexdigest()
+
+
+def estimate_size_bytes(obj: Any) -> int:
+    """
+    Rough deep size of a compiled plugin, shared objects are counted once.
+    """
+    seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif isinstance(item, BaseModel):
+            stack.append(item.__dict__)
+        elif isinstance(item, Record):
+            stack.extend(item.__getstate__().values())
+    return size
+
+
+def estimate_operations_size_bytes(
+    compiled_plugin: "CompiledPlugin", operations: Set[Tuple[str, str]]
+) -> int:
+    plugin = compiled_plugin.plugin
+    functions = {(f.path, f.method): f for f in compiled_plugin.functions.functions}
+    objects: List[Any] = []
+    for path, method in operations:
+        objects.append((plugin.plugin_op_property_map or {}).get(path, {}).get(method))
+        objects.append((plugin.plugin_operations or {}).get(path, {}).get(method))
+        objects.append(functions.get((path, method)))
+        objects.append(plugin.get_operation_index().get(path, method))
+    return estimate_size_bytes(objects)
+
+
+class CompiledPlugin(BaseModel):
+    """
+    A plugin together with everything derived from its openapi doc.
+    """
+
+    key: str
+    plugin: Plugin
+    functions: Functions
+    compile_time_seconds: float
+    size_bytes: int = 0
+    fingerprint: Optional[DocFingerprint] = None
+    recompiled_operations: Optional[int] = None
+
+    _operation_functions: Optional[
+        Dict[Tuple[str, str], Tuple[int, Function]]
+    ] = PrivateAttr(default=None)
+
+    def get_plugin_op_property_map(self):
+        return self.plugin.plugin_op_property_map
+
+    def get_fingerprint(self) -> DocFingerprint:
+        if self.fingerprint is None:
+            self.fingerprint = DocFingerprint.build(self.plugin.openapi_doc_obj)
+        return self.fingerprint
+
+    def get_operation_functions(self) -> Dict[Tuple[str, str], Tuple[int, Function]]:
+        if self._operation_functions is None:
+            self._operation_functions = {
+                get_operation_key(func.path or "", func.method or ""): (
+                    index,
+                    func,
+                )
+                for index, func in enumerate(self.functions.functions)
+            }
+        return self._operation_functions
+
+    def get_functions(
+        self, selected_operations: Optional[Iterable[Tuple[str, str]]] = None
+    ) -> Functions:
+        """
+        Functions of the selected (path, method) operations, sharing the
+        compiled Function objects. Built with one lookup per operation, so
+        selecting one operation of a large plugin stays cheap.
+        """
+        if selected_operations is None:
+            selected = self.functions.functions
+        else:
+            operation_functions = self.get_operation_functions()
+            entries = {}
+            for path, method in selected_operations:
+                entry = operation_functions.get(get_operation_key(path, method))
+                if entry is not None:
+                    entries[entry[0]] = entry[1]
+            # same order as the whole plugin, so the tool json stays stable
+            selected = [entries[index] for index in sorted(entries)]
+        functions = Functions()
+        for func in selected:
+            functions.plugin_map[func.name] = self.plugin
+            functions.function_map[func.name] = func
+            functions.functions.append(func)
+        return functions
+
+
+class CompiledPluginCache:
+    """
+    Process-wide LRU cache of compiled plugins keyed by content hash.
+
+    The latest version of each plugin source is tracked, so a changed doc of a
+    cached plugin only recompiles the operations that changed.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_memory_bytes: int = DEFAULT_MAX_MEMORY_MB * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self._entries: OrderedDict[str, CompiledPlugin] = OrderedDict()
+        self._compile_locks: Dict[str, threading.Lock] = {}
+        self._latest_keys: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.memory_bytes = 0
+
+    def get(self, key: Optional[str]) -> Optional[CompiledPlugin]:
+        if key is None:
+            return None
+        with self._lock:
+            compiled_plugin = self._entries.get(key)
+            if compiled_plugin is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return compiled_plugin
+
+    def peek(self, key: Optional[str]) -> Optional[CompiledPlugin]:
+        if key is None:
+            return None
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, compiled_plugin: CompiledPlugin):
+        with self._lock:
+            old = self._entries.pop(compiled_plugin.key, None)
+            if old is not None:
+                self.memory_bytes -= old.size_bytes
+            self._entries[compiled_plugin.key] = compiled_plugin
+            self.memory_bytes += compiled_plugin.size_bytes
+            source_id = compiled_plugin.plugin.get_source_id()
+            previous_key = self._latest_keys.get(source_id)
+            self._latest_keys[source_id] = compiled_plugin.key
+            self._evict()
+        if previous_key is not None and previous_key != compiled_plugin.key:
+            # responses cached for the previous version of the plugin
+            function_response_cache.invalidate_plugin(source_id)
+
+    def _evict(self):
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries
+            or self.memory_bytes > self.max_memory_bytes
+        ):
+            key, compiled_plugin = self._entries.popitem(last=False)
+            self.memory_bytes -= compiled_plugin.size_bytes
+            source_id = compiled_plugin.plugin.get_source_id()
+            if self._latest_keys.get(source_id) == key:
+                del self._latest_keys[source_id]
+            self.evictions += 1
+            logger.info(f"[PLUGIN-CACHE-EVICTED] name={compiled_plugin.plugin.name}")
+
+    def _get_or_build(
+        self, key: str, build: Callable[[], CompiledPlugin]
+    ) -> CompiledPlugin:
+        compiled_plugin = self.get(key)
+        if compiled_plugin is not None:
+            return compiled_plugin
+        with self._lock:
+            compile_lock = self._compile_locks.setdefault(key, threading.Lock())
+        with compile_lock:
+            # another thread may have compiled it while we were waiting
+            compiled_plugin = self.peek(key)
+            if compiled_plugin is not None:
+                return compiled_plugin
+            try:
+                compiled_plugin = build()
+                self.put(compiled_plugin)
+            finally:
+                with self._lock:
+                    self._compile_locks.pop(key, None)
+        return compiled_plugin
+
+    def _compile(
+        self, key: str, openapi_doc_obj: dict, source: Optional[str] = None
+    ) -> CompiledPlugin:
+        source_id = get_plugin_source_id(openapi_doc_obj, source)
+        with self._lock:
+            previous = self._entries.get(self._latest_keys.get(source_id, ""))
+        if previous is not None:
+            compiled_plugin = recompile_plugin(key, openapi_doc_obj, previous)
+        else:
+            compiled_plugin = compile_plugin(
+                key, lambda: PluginBuilder.build_from_openapi_doc_obj(openapi_doc_obj)
+            )
+        compiled_plugin.plugin.source_id = source_id
+        return compiled_plugin
+
+    def get_or_compile(
+        self, openapi_doc_obj: dict, source: Optional[str] = None
+    ) -> CompiledPlugin:
+        key = compute_openapi_doc_hash(openapi_doc_obj)
+        return self._get_or_build(
+            key, lambda: self._compile(key, openapi_doc_obj, source)
+        )
+
+    def get_or_compile_from_file(self, openapi_doc_file: str) -> CompiledPlugin:
+        if os.path.getsize(openapi_doc_file) >= STREAMING_MIN_BYTES:
+            return self._get_or_compile_stream(openapi_doc_file)
+        with open(openapi_doc_file, "rb") as file:
+            data = file.read()
+        key = hashlib.sha256(data).hexdigest()
+        return self._get_or_build(
+            key, lambda: self._compile(key, json.loads(data), openapi_doc_file)
+        )
+
+    def _get_or_compile_stream(self, openapi_doc_file: str) -> CompiledPlugin:
+        # large specs are hashed and decoded in chunks, never read whole
+        digest = hashlib.sha256()
+        with open(openapi_doc_file, "rb") as file:
+            for chunk in iter_file_chunks(file):
+                digest.update(chunk)
+        key = digest.hexdigest()
+
+        def build() -> CompiledPlugin:
+            compiled_plugin = compile_plugin(
+                key,
+                lambda: PluginBuilder.build_from_openapi_doc_file(
+                    openapi_doc_file, streaming=True
+                ),
+                resolve_per_operation=True,
+            )
+            compiled_plugin.plugin.source_id = openapi_doc_file
+            return compiled_plugin
+
+        return self._get_or_build(key, build)
+
+    def get_or_compile_from_url(self, openapi_doc_url: str) -> CompiledPlugin:
+        return self.get_or_compile_from_manifest(
+            manifest_fetcher.fetch(openapi_doc_url)
+        )
+
+    def get_or_compile_from_manifest(self, manifest: FetchedManifest) -> CompiledPlugin:
+        if manifest.etag:
+            key = compute_url_etag_key(manifest.url, manifest.etag)
+        else:
+            key = manifest.get_content_hash()
+        return self._get_or_build(
+            key, lambda: self._compile(key, manifest.get_json(), manifest.url)
+        )
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory_bytes": self.memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._latest_keys.clear()
+            self.memory_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+def compile_plugin(
+    key: str, build: Callable[[], Plugin], resolve_per_operation: bool = False
+) -> CompiledPlugin:
+    """
+    With resolve_per_operation, the functions are built from the resolved
+    operations of the plugin instead of resolving the whole doc again.
+    """
+    start_time = time.time()
+    plugin = build()
+    functions = Functions()
+    if resolve_per_operation:
+        functions.add_from_plugin_operations(plugin)
+    else:
+        functions.add_from_plugin(plugin)
+    functions.precompute_json()
+    plugin.content_hash = key
+    compile_time_seconds = time.time() - start_time
+    compiled_plugin = CompiledPlugin(
+        key=key,
+        plugin=plugin,
+        functions=functions,
+        compile_time_seconds=compile_time_seconds,
+    )
+    compiled_plugin.size_bytes = estimate_size_bytes(compiled_plugin)
+    logger.info(
+        f"[PLUGIN-COMPILED] name={plugin.name}, time_taken={round(compile_time_seconds, 4)} seconds"  # noqa: E501
+    )
+    return compiled_plugin
+
+
+def recompile_plugin(
+    key: str, openapi_doc_obj: dict, previous: CompiledPlugin
+) -> CompiledPlugin:
+    """
+    Compiles a new version of a plugin, reusing everything previous compiled
+    for the operations whose resolved subtree did not change.
+    """
+    start_time = time.time()
+    fingerprint = DocFingerprint.build(openapi_doc_obj)
+    changed_operations = fingerprint.get_changed_operations(previous.get_fingerprint())
+    if changed_operations is None:
+        compiled_plugin = compile_plugin(
+            key, lambda: PluginBuilder.build_from_openapi_doc_obj(openapi_doc_obj)
+        )
+        compiled_plugin.fingerprint = fingerprint
+        return compiled_plugin
+
+    plugin = PluginBuilder.build_from_openapi_doc_obj(
+        openapi_doc_obj,
+        previous=previous.plugin,
+        changed_operations=changed_operations,
+    )
+    functions = Functions()
+    functions.add_from_plugin_operations(
+        plugin, previous=previous.functions, changed_operations=changed_operations
+    )
+    functions.precompute_json()
+    plugin.content_hash = key
+    compile_time_seconds = time.time() - start_time
+    compiled_plugin = CompiledPlugin(
+        key=key,
+        plugin=plugin,
+        functions=functions,
+        compile_time_seconds=compile_time_seconds,
+        fingerprint=fingerprint,
+        recompiled_operations=len(changed_operations),
+    )
+    # walking the whole plugin again would cost more than the recompile, so
+    # only the size of the replaced operations is estimated
+    previous_operations = {
+        (path, method)
+        for path, methods in previous.get_fingerprint().operation_hashes.items()
+        for method in methods
+    }
+    removed_operations = previous_operations - {
+        (path, method)
+        for path, methods in fingerprint.operation_hashes.items()
+        for method in methods
+    }
+    compiled_plugin.size_bytes = max(
+        0,
+        previous.size_bytes
+        - estimate_operations_size_bytes(
+            previous, changed_operations | removed_operations
+        )
+        + estimate_operations_size_bytes(compiled_plugin, changed_operations),
+    )
+    logger.info(
+        f"[PLUGIN-RECOMPILED] name={plugin.name}, operations={len(changed_operations)}, time_taken={round(compile_time_seconds, 4)} seconds"  # noqa: E501
+    )
+    return compiled_plugin
+
+
+compiled_plugin_cache = CompiledPluginCache()
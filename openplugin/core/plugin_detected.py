@@ -50,6 +50,12 @@ class SelectedApiSignatureResponse(BaseModel):
     function_request_json: Optional[Union[Dict, List]] = None
     function_response_json: Optional[Union[Dict, List]] = None
     x_dep_tracing: Optional[List] = None
+    tool_compaction: Optional[Dict] = None
+    operation_shortlist: Optional[Dict] = None
+    few_shot_selection: Optional[Dict] = None
+    function_response_cache: Optional[Dict] = None
+    hedging: Optional[Dict] = None
+    streaming: Optional[Dict] = None
     response_obj_200: Optional[Dict] = None
     system_prompt: Optional[str] = None
     conversations: Optional[List] = None
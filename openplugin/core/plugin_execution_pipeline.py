@@ -1,7 +1,9 @@
 import asyncio
+import copy
 import json
+import os
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from loguru import logger
 from pydantic import BaseModel
@@ -12,6 +14,7 @@ from .execution.implementations.operation_execution_with_imprompt import (
     OperationExecutionWithImprompt,
 )
 from .function_providers import FunctionProvider
+from .functions import Function
 from .helper import time_taken
 from .messages import Message, MessageType
 from .operations.implementations.operation_signature_builder_custom import (
@@ -20,6 +23,43 @@ from .operations.implementations.operation_signature_builder_custom import (
 from .plugin import Plugin
 from .port import Port, PortMetadata, PortType, PortValueError
 
+# methods whose api call may start from a streamed tool call, before the
+# signature step finished. A changed signature would call these apis twice.
+STREAM_DISPATCH_METHODS = [
+    method.strip().lower()
+    for method in os.environ.get(
+        "OPENPLUGIN_STREAM_DISPATCH_METHODS", "get,head"
+    ).split(",")
+    if method.strip()
+]
+
+
+def get_execution_key(signature: dict) -> str:
+    return json.dumps(
+        [
+            signature.get("api_called"),
+            signature.get("method"),
+            signature.get("mapped_operation_parameters"),
+        ],
+        sort_keys=True,
+        default=str,
+    )
+
+
+def fill_path_parameters(api_called: str, query_params: dict) -> str:
+    """
+    Puts path parameter values in the endpoint and removes them from
+    query_params: "example.com/path/{id}" >> "example.com/path/1"
+    """
+    pattern = re.compile(r"\{([^}]+)\}")
+    for param_name in pattern.findall(api_called):
+        if param_name in query_params:
+            parameter_key = f"{{{param_name}}}"
+            parameter_value = str(query_params[param_name])
+            api_called = api_called.replace(parameter_key, parameter_value)
+            del query_params[param_name]
+    return api_called
+
 
 async def run_module(output_module, flow_port, config: Config):
     try:
@@ -106,24 +146,49 @@ class PluginExecutionPipeline(BaseModel):
             )
 
         # API SIGNATURE DETECTION
-        api_signature_port = self._run_plugin_signature_selector(
+        early_execution: Dict[str, Any] = {}
+        on_tool_call = None
+        if config.stream_function_call:
+
+            def on_tool_call(function: Function, arguments: dict) -> bool:
+                return self._dispatch_plugin_execution(
+                    function,
+                    arguments,
+                    early_execution,
+                    config=config,
+                    header=header,
+                    auth_query_param=auth_query_param,
+                    function_provider=function_provider,
+                    enable_ui_form_controls=enable_ui_form_controls,
+                )
+
+        api_signature_port = await self._run_plugin_signature_selector(
             input=flow_port,
             config=config,
             function_provider=function_provider,
             conversation=conversation,
             selected_operations=selected_operations,
             header=header,
+            on_tool_call=on_tool_call,
         )
         self.add_tokens(api_signature_port)
         # API EXECUTION
-        api_execution_step = self._run_plugin_execution(
-            input=api_signature_port,
-            config=config,
-            header=header,
-            auth_query_param=auth_query_param,
-            function_provider=function_provider,
-            enable_ui_form_controls=enable_ui_form_controls,
+        dispatched_step = await self._get_dispatched_plugin_execution(
+            api_signature_port, early_execution
         )
+        if dispatched_step is not None:
+            api_execution_step = dispatched_step
+        else:
+            # the api call is blocking, run it off the event loop
+            api_execution_step = await asyncio.to_thread(
+                self._run_plugin_execution,
+                input=api_signature_port,
+                config=config,
+                header=header,
+                auth_query_param=auth_query_param,
+                function_provider=function_provider,
+                enable_ui_form_controls=enable_ui_form_controls,
+            )
 
         if not api_execution_step.clarifying_response:
             # filter response
@@ -397,6 +462,20 @@ class PluginExecutionPipeline(BaseModel):
                     "x_dep_tracing": signature_port.get("metadata", {}).get(
                         "x_dep_tracing"
                     ),
+                    "tool_compaction": signature_port.get("metadata", {}).get(
+                        "tool_compaction"
+                    ),
+                    "operation_shortlist": signature_port.get("metadata", {}).get(
+                        "operation_shortlist"
+                    ),
+                    "few_shot_selection": signature_port.get("metadata", {}).get(
+                        "few_shot_selection"
+                    ),
+                    "function_response_cache": signature_port.get(
+                        "metadata", {}
+                    ).get("function_response_cache"),
+                    "hedging": signature_port.get("metadata", {}).get("hedging"),
+                    "streaming": signature_port.get("metadata", {}).get("streaming"),
                     "output_text": signature_port.get("metadata", {}).get(
                         "output_text"
                     ),
@@ -405,7 +484,7 @@ class PluginExecutionPipeline(BaseModel):
         except Exception as e:
             print(e)
 
-    def add_api_execution_trace(self, api_execution_step):
+    def add_api_execution_trace(self, api_execution_step, early_dispatch=False):
         try:
             self.tracing_steps.append(
                 {
@@ -429,6 +508,7 @@ class PluginExecutionPipeline(BaseModel):
                     "missing_required_params": api_execution_step.original_response.get_metadata(
                         PortMetadata.MISSING_REQUIRED_PARAMS
                     ),
+                    "early_dispatch": early_dispatch,
                 }
             )
         except Exception as e:
@@ -461,7 +541,7 @@ class PluginExecutionPipeline(BaseModel):
         )
 
     @time_taken
-    def _run_plugin_signature_selector(
+    async def _run_plugin_signature_selector(
         self,
         input: Port,
         config: Config,
@@ -469,6 +549,7 @@ class PluginExecutionPipeline(BaseModel):
         conversation: Optional[List] = [],
         selected_operations: Optional[List[str]] = None,
         header: Optional[dict] = None,
+        on_tool_call: Optional[Callable[[Function, dict], Any]] = None,
     ) -> Port:
         if input.data_type != PortType.TEXT:
             raise Exception("Input data type to plugin must be text.")
@@ -486,7 +567,9 @@ class PluginExecutionPipeline(BaseModel):
             selected_operations=selected_operations,
             header=header,
         )
-        response = oai_selector.run(messages, conversation=conversation)
+        response = await oai_selector.arun(
+            messages, conversation=conversation, on_tool_call=on_tool_call
+        )
 
         ops = response.detected_plugin_operations
         if ops and len(ops) > 0:
@@ -512,6 +595,12 @@ class PluginExecutionPipeline(BaseModel):
                     "intermediate_fc_request": response.function_request_json,
                     "intermediate_fc_response": response.function_response_json,
                     "x_dep_tracing": response.x_dep_tracing,
+                    "tool_compaction": response.tool_compaction,
+                    "operation_shortlist": response.operation_shortlist,
+                    "few_shot_selection": response.few_shot_selection,
+                    "function_response_cache": response.function_response_cache,
+                    "hedging": response.hedging,
+                    "streaming": response.streaming,
                     "system_prompt": response.system_prompt,
                     "conversations": response.conversations,
                     "examples": response.examples,
@@ -536,6 +625,12 @@ class PluginExecutionPipeline(BaseModel):
                     "intermediate_fc_request": response.function_request_json,
                     "intermediate_fc_response": response.function_response_json,
                     "x_dep_tracing": response.x_dep_tracing,
+                    "tool_compaction": response.tool_compaction,
+                    "operation_shortlist": response.operation_shortlist,
+                    "few_shot_selection": response.few_shot_selection,
+                    "function_response_cache": response.function_response_cache,
+                    "hedging": response.hedging,
+                    "streaming": response.streaming,
                     "system_prompt": response.system_prompt,
                     "conversations": response.conversations,
                     "examples": response.examples,
@@ -558,6 +653,7 @@ class PluginExecutionPipeline(BaseModel):
         auth_query_param: Optional[dict],
         function_provider: FunctionProvider,
         enable_ui_form_controls: bool = True,
+        deferred_traces: Optional[List] = None,
     ) -> APIExecutionStepResponse:
         if input.data_type != PortType.JSON:
             raise Exception("Input data type to plugin must be JSON.")
@@ -568,19 +664,7 @@ class PluginExecutionPipeline(BaseModel):
             method = input.value.get("method")
             query_params = input.value.get("mapped_operation_parameters")
             response_obj_200 = input.value.get("response_obj_200")
-            # identify path parameters
-            pattern = re.compile(r"\{([^}]+)\}")
-            path_params = pattern.findall(api_called)
-
-            # use path parameter values instead of names in endpoint
-            # "example.com/path/{id}" >> "example.com/path/1"
-            for param_name in path_params:
-                if param_name in query_params:
-                    parameter_key = f"{{{param_name}}}"
-                    parameter_value = str(query_params[param_name])
-                    api_called = api_called.replace(parameter_key, parameter_value)
-                    # remove matched path parameters from query_params
-                    del query_params[param_name]
+            api_called = fill_path_parameters(api_called, query_params)
 
             input_port_json = {
                 "api_called": api_called,
@@ -603,6 +687,7 @@ class PluginExecutionPipeline(BaseModel):
                 response_obj_200=response_obj_200,
                 function_provider=function_provider,
                 plugin_op_property_map=self.plugin.plugin_op_property_map,
+                operation_index=self.plugin.get_operation_index(),
                 enable_ui_form_controls=enable_ui_form_controls,
             )
             ex = OperationExecutionWithImprompt(params)
@@ -647,7 +732,10 @@ class PluginExecutionPipeline(BaseModel):
                 original_response=original_port,
                 clarifying_response=clarifying_port,
             )
-            self.add_api_execution_trace(api_execution_step)
+            if deferred_traces is None:
+                self.add_api_execution_trace(api_execution_step)
+            else:
+                deferred_traces.append(api_execution_step)
             return api_execution_step
         except Exception as e:
             api_execution_step = APIExecutionStepResponse(
@@ -664,9 +752,76 @@ class PluginExecutionPipeline(BaseModel):
                 ),
                 clarifying_response=None,
             )
-            self.add_api_execution_trace(api_execution_step)
+            if deferred_traces is None:
+                self.add_api_execution_trace(api_execution_step)
+            else:
+                deferred_traces.append(api_execution_step)
             raise PluginExecutionPipelineError(message=f"API Execution Error: {e}")
 
+    def _dispatch_plugin_execution(
+        self,
+        function: Function,
+        arguments: dict,
+        early_execution: Dict[str, Any],
+        **execution_kwargs,
+    ) -> bool:
+        """
+        Starts the api call of a tool call streamed by the signature step, so
+        it runs while the rest of the llm response is generated.
+        """
+        if function.get_api_method().lower() not in STREAM_DISPATCH_METHODS:
+            return False
+        signature = {
+            "api_called": function.get_api_url(),
+            "method": function.get_api_method(),
+            "path": function.get_path(),
+            # the execution removes path parameters from its input
+            "mapped_operation_parameters": copy.deepcopy(arguments),
+            "response_obj_200": function.response_obj_200,
+        }
+        early_execution["key"] = get_execution_key(signature)
+        early_execution["traces"] = []
+        task = asyncio.ensure_future(
+            asyncio.to_thread(
+                self._run_plugin_execution,
+                input=Port(data_type=PortType.JSON, value=signature),
+                deferred_traces=early_execution["traces"],
+                **execution_kwargs,
+            )
+        )
+        # discarded dispatches are never awaited
+        task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        early_execution["task"] = task
+        logger.info(
+            f"\n[EARLY_PLUGIN_EXECUTION] url={signature['api_called']}, method={signature['method']}"  # noqa: E501
+        )
+        return True
+
+    async def _get_dispatched_plugin_execution(
+        self, api_signature_port: Port, early_execution: Dict[str, Any]
+    ) -> Optional[APIExecutionStepResponse]:
+        """
+        Result of the api call started from the streamed tool call, when it
+        matches the final signature.
+        """
+        task = early_execution.get("task")
+        if task is None or api_signature_port.value is None:
+            return None
+        if early_execution["key"] != get_execution_key(api_signature_port.value):
+            logger.warning("[EARLY_PLUGIN_EXECUTION_DISCARDED] signature changed")
+            return None
+        # the execution ran on a copy of the parameters, strip the path
+        # parameters here too so the session variables match a normal run
+        fill_path_parameters(
+            api_signature_port.value.get("api_called") or "",
+            api_signature_port.value.get("mapped_operation_parameters") or {},
+        )
+        try:
+            return await task
+        finally:
+            for api_execution_step in early_execution["traces"]:
+                self.add_api_execution_trace(api_execution_step, early_dispatch=True)
+
     def add_tokens(self, port: Port):
         if port:
             token = port.get_total_tokens_used()
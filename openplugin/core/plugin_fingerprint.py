@@ -0,0 +1,197 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote
+
+from pydantic import BaseModel
+
+COMPONENTS_PREFIX = "#/components/"
+
+
+def hash_json(obj: Any) -> str:
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def get_component_ref(section: str, name: str) -> str:
+    name = name.replace("~", "~0").replace("/", "~1")
+    return f"{COMPONENTS_PREFIX}{section}/{name}"
+
+
+def normalize_component_ref(ref: str) -> Optional[str]:
+    """
+    The component a local $ref points into, or None when it points anywhere
+    else, e.g. into another path or another file.
+    """
+    if not ref.startswith(COMPONENTS_PREFIX):
+        return None
+    parts = unquote(ref[len(COMPONENTS_PREFIX) :]).split("/")
+    if len(parts) < 2:
+        return None
+    return f"{COMPONENTS_PREFIX}{parts[0]}/{parts[1]}"
+
+
+def collect_refs(node: Any, refs: Set[str]):
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            ref = item.get("$ref")
+            if isinstance(ref, str):
+                refs.add(ref)
+                continue
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+
+
+class DocFingerprint(BaseModel):
+    """
+    Hashes of an openapi doc split by operation and by component, with the
+    components each of them references. Used to find the operations whose
+    resolved subtree changed between two versions of a plugin.
+    """
+
+    global_hash: str
+    component_hashes: Dict[str, str] = {}
+    component_refs: Dict[str, List[str]] = {}
+    operation_hashes: Dict[str, Dict[str, str]] = {}
+    operation_refs: Dict[str, Dict[str, List[str]]] = {}
+    # False for refs outside components, external refs and cycles, which are
+    # always compiled in full
+    incremental: bool = True
+
+    @staticmethod
+    def build(openapi_doc_obj: dict) -> "DocFingerprint":
+        incremental = True
+
+        def to_component_refs(refs: Set[str]) -> List[str]:
+            nonlocal incremental
+            component_refs = set()
+            for ref in refs:
+                component_ref = normalize_component_ref(ref)
+                if component_ref is None:
+                    incremental = False
+                else:
+                    component_refs.add(component_ref)
+            return sorted(component_refs)
+
+        global_part = {
+            key: value
+            for key, value in openapi_doc_obj.items()
+            if key not in ("paths", "components")
+        }
+        auth = global_part.get("x-plugin-auth")
+        if isinstance(auth, dict) and auth.get("type") == "none":
+            # PluginBuilder drops a "none" auth, keep both forms equal
+            global_part["x-plugin-auth"] = None
+
+        component_hashes: Dict[str, str] = {}
+        component_refs: Dict[str, List[str]] = {}
+        for section, section_obj in (openapi_doc_obj.get("components") or {}).items():
+            if not isinstance(section_obj, dict):
+                global_part[f"components/{section}"] = section_obj
+                continue
+            for name, component in section_obj.items():
+                component_ref = get_component_ref(section, name)
+                component_hashes[component_ref] = hash_json(component)
+                refs: Set[str] = set()
+                collect_refs(component, refs)
+                component_refs[component_ref] = to_component_refs(refs)
+
+        global_refs: Set[str] = set()
+        collect_refs(global_part, global_refs)
+        if global_refs:
+            incremental = False
+
+        operation_hashes: Dict[str, Dict[str, str]] = {}
+        operation_refs: Dict[str, Dict[str, List[str]]] = {}
+        for path, path_obj in (openapi_doc_obj.get("paths") or {}).items():
+            if not isinstance(path_obj, dict):
+                incremental = False
+                continue
+            operation_hashes[path] = {}
+            operation_refs[path] = {}
+            for method, method_obj in path_obj.items():
+                operation_hashes[path][method] = hash_json(method_obj)
+                refs = set()
+                collect_refs(method_obj, refs)
+                operation_refs[path][method] = to_component_refs(refs)
+
+        fingerprint = DocFingerprint(
+            global_hash=hash_json(global_part),
+            component_hashes=component_hashes,
+            component_refs=component_refs,
+            operation_hashes=operation_hashes,
+            operation_refs=operation_refs,
+            incremental=incremental,
+        )
+        if fingerprint.incremental and fingerprint.has_cycles():
+            fingerprint.incremental = False
+        return fingerprint
+
+    def has_cycles(self) -> bool:
+        # resolved cycles depend on the order refs are first visited in, so
+        # they can't be resolved one operation at a time
+        visiting: Set[str] = set()
+        visited: Set[str] = set()
+        for start in self.component_refs:
+            if start in visited:
+                continue
+            stack: List[Tuple[str, int]] = [(start, 0)]
+            visiting.add(start)
+            while stack:
+                node, index = stack.pop()
+                children = self.component_refs.get(node, [])
+                if index < len(children):
+                    stack.append((node, index + 1))
+                    child = children[index]
+                    if child in visiting:
+                        return True
+                    if child not in visited:
+                        visiting.add(child)
+                        stack.append((child, 0))
+                else:
+                    visiting.discard(node)
+                    visited.add(node)
+        return False
+
+    def get_changed_operations(
+        self, previous: "DocFingerprint"
+    ) -> Optional[Set[Tuple[str, str]]]:
+        """
+        (path, method) of the operations that must be recompiled, or None when
+        the whole plugin must be.
+        """
+        if not (self.incremental and previous.incremental):
+            return None
+        if self.global_hash != previous.global_hash:
+            return None
+
+        changed_components = {
+            ref
+            for ref in self.component_hashes.keys() | previous.component_hashes.keys()
+            if self.component_hashes.get(ref) != previous.component_hashes.get(ref)
+        }
+        # every component that reaches a changed one resolves differently too
+        referenced_by: Dict[str, List[str]] = {}
+        for component_ref, refs in self.component_refs.items():
+            for ref in refs:
+                referenced_by.setdefault(ref, []).append(component_ref)
+        affected = set(changed_components)
+        stack = list(changed_components)
+        while stack:
+            for parent in referenced_by.get(stack.pop(), []):
+                if parent not in affected:
+                    affected.add(parent)
+                    stack.append(parent)
+
+        changed_operations: Set[Tuple[str, str]] = set()
+        for path, method_hashes in self.operation_hashes.items():
+            previous_hashes = previous.operation_hashes.get(path, {})
+            for method, operation_hash in method_hashes.items():
+                if previous_hashes.get(method) != operation_hash or any(
+                    ref in affected for ref in self.operation_refs[path][method]
+                ):
+                    changed_operations.add((path, method))
+        return changed_operations
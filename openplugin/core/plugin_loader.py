@@ -0,0 +1,98 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from loguru import logger
+
+from .functions import Functions, parse_selected_operations
+from .manifest_fetcher import manifest_fetcher
+from .plugin_cache import CompiledPlugin, compiled_plugin_cache
+
+DEFAULT_COMPILE_WORKERS = int(os.environ.get("OPENPLUGIN_COMPILE_WORKERS", 4))
+
+
+class FunctionNameCollisionError(Exception):
+    def __init__(
+        self,
+        collisions: Dict[Optional[str], List[str]],
+        message="Function names collide across plugins",
+    ):
+        self.collisions = collisions
+        details = "; ".join(
+            f"{name}: {', '.join(urls)}" for name, urls in collisions.items()
+        )
+        self.message = f"{message}: {details}"
+        super().__init__(self.message)
+
+
+async def acompile_plugins(
+    openapi_doc_urls: Sequence[str], max_workers: int = DEFAULT_COMPILE_WORKERS
+) -> List[CompiledPlugin]:
+    """
+    Fetches the openapi docs concurrently and compiles each one in a worker
+    pool as soon as it arrives, so compiling overlaps the other downloads.
+    Compiled plugins are returned in the order of openapi_doc_urls.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, max_workers), thread_name_prefix="plugin-compile"
+    )
+
+    async def load(openapi_doc_url: str) -> CompiledPlugin:
+        manifest = await manifest_fetcher.afetch(openapi_doc_url)
+        return await loop.run_in_executor(
+            executor, compiled_plugin_cache.get_or_compile_from_manifest, manifest
+        )
+
+    try:
+        return list(await asyncio.gather(*[load(url) for url in openapi_doc_urls]))
+    finally:
+        executor.shutdown(wait=False)
+
+
+def merge_compiled_plugins(
+    openapi_doc_urls: Sequence[str],
+    compiled_plugins: Sequence[CompiledPlugin],
+    selected_operations: Optional[Dict[str, List[str]]] = None,
+) -> Functions:
+    """
+    Functions of all plugins merged in the order of openapi_doc_urls. Function
+    names are global, so a name defined by two plugins raises a
+    FunctionNameCollisionError listing every colliding name.
+    """
+    functions = Functions()
+    owners: Dict[Optional[str], str] = {}
+    collisions: Dict[Optional[str], List[str]] = {}
+    for url, compiled_plugin in zip(openapi_doc_urls, compiled_plugins):
+        selected = (selected_operations or {}).get(url)
+        view = compiled_plugin.get_functions(parse_selected_operations(selected))
+        for func in view.functions:
+            existing = functions.function_map.get(func.name)
+            if existing is func:
+                # same plugin listed twice
+                continue
+            if existing is not None:
+                collisions.setdefault(func.name, [owners[func.name]]).append(url)
+                continue
+            owners[func.name] = url
+            functions.plugin_map[func.name] = compiled_plugin.plugin
+            functions.function_map[func.name] = func
+            functions.functions.append(func)
+    if collisions:
+        raise FunctionNameCollisionError(collisions)
+    logger.info(
+        f"[PLUGINS-MERGED] plugins={len(compiled_plugins)}, functions={len(functions.functions)}"  # noqa: E501
+    )
+    return functions
+
+
+async def afrom_plugins(
+    openapi_doc_urls: Sequence[str],
+    selected_operations: Optional[Dict[str, List[str]]] = None,
+    max_workers: int = DEFAULT_COMPILE_WORKERS,
+) -> Functions:
+    compiled_plugins = await acompile_plugins(openapi_doc_urls, max_workers)
+    return merge_compiled_plugins(
+        openapi_doc_urls, compiled_plugins, selected_operations
+    )
@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from .manifest_fetcher import manifest_fetcher
+from .plugin_cache import (
+    CompiledPlugin,
+    CompiledPluginCache,
+    compiled_plugin_cache,
+    compute_openapi_doc_hash,
+)
+
+DEFAULT_MAX_PLUGINS = int(
+    os.environ.get("OPENPLUGIN_PLUGIN_REGISTRY_MAX_PLUGINS", 1024)
+)
+
+
+class PluginRegistryError(Exception):
+    """Raised when a plugin cannot be registered or is not in the registry."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(self.message)
+
+
+class RegisteredPlugin(BaseModel):
+    plugin_id: str
+    name: str
+    source: Optional[str] = None
+    registered_at: datetime = Field(default_factory=datetime.now)
+    compile_time_seconds: float
+    size_bytes: int
+    operation_count: int
+
+
+class PluginRegistry:
+    """
+    Plugins registered once and executed later by id. The id is the content
+    hash of the openapi doc, so registering the same doc twice is a no-op.
+    Registered plugins are pinned here and never evicted by the plugin cache.
+    """
+
+    def __init__(
+        self,
+        plugin_cache: CompiledPluginCache = compiled_plugin_cache,
+        max_plugins: int = DEFAULT_MAX_PLUGINS,
+    ):
+        self.plugin_cache = plugin_cache
+        self.max_plugins = max_plugins
+        self._plugins: Dict[str, CompiledPlugin] = {}
+        self._registrations: Dict[str, RegisteredPlugin] = {}
+        self._lock = threading.RLock()
+
+    def register(
+        self, openapi_doc_obj: dict, source: Optional[str] = None
+    ) -> RegisteredPlugin:
+        plugin_id = compute_openapi_doc_hash(openapi_doc_obj)
+        with self._lock:
+            registration = self._registrations.get(plugin_id)
+            if registration is not None:
+                return registration
+            if len(self._plugins) >= self.max_plugins:
+                raise PluginRegistryError(
+                    f"Plugin registry is full, max_plugins={self.max_plugins}"
+                )
+        compiled_plugin = self.plugin_cache.get_or_compile(openapi_doc_obj, source)
+        return self.add(compiled_plugin, source=source)
+
+    def add(
+        self, compiled_plugin: CompiledPlugin, source: Optional[str] = None
+    ) -> RegisteredPlugin:
+        """
+        Pins an already compiled plugin, its cache key is the plugin_id.
+        """
+        plugin_id = compiled_plugin.key
+        registration = RegisteredPlugin(
+            plugin_id=plugin_id,
+            name=compiled_plugin.plugin.name,
+            source=source,
+            compile_time_seconds=compiled_plugin.compile_time_seconds,
+            size_bytes=compiled_plugin.size_bytes,
+            operation_count=sum(
+                len(methods)
+                for methods in (compiled_plugin.plugin.plugin_operations or {}).values()
+            ),
+        )
+        with self._lock:
+            self._plugins.setdefault(plugin_id, compiled_plugin)
+            registration = self._registrations.setdefault(plugin_id, registration)
+        logger.info(
+            f"[PLUGIN-REGISTERED] name={registration.name}, plugin_id={plugin_id}"
+        )
+        return registration
+
+    def register_from_file(self, openapi_doc_file: str) -> RegisteredPlugin:
+        with open(openapi_doc_file, "r") as file:
+            openapi_doc_obj = json.load(file)
+        return self.register(openapi_doc_obj, source=openapi_doc_file)
+
+    def register_from_url(self, openapi_doc_url: str) -> RegisteredPlugin:
+        manifest = manifest_fetcher.fetch(openapi_doc_url)
+        return self.register(manifest.get_json(), source=openapi_doc_url)
+
+    def get(self, plugin_id: str) -> CompiledPlugin:
+        with self._lock:
+            compiled_plugin = self._plugins.get(plugin_id)
+        if compiled_plugin is None:
+            raise PluginRegistryError(
+                f"Plugin not found, plugin_id={plugin_id}", status_code=404
+            )
+        return compiled_plugin
+
+    def peek(self, plugin_id: Optional[str]) -> Optional[CompiledPlugin]:
+        if plugin_id is None:
+            return None
+        with self._lock:
+            return self._plugins.get(plugin_id)
+
+    def get_registration(self, plugin_id: str) -> RegisteredPlugin:
+        with self._lock:
+            registration = self._registrations.get(plugin_id)
+        if registration is None:
+            raise PluginRegistryError(
+                f"Plugin not found, plugin_id={plugin_id}", status_code=404
+            )
+        return registration
+
+    def list(self) -> List[RegisteredPlugin]:
+        with self._lock:
+            return list(self._registrations.values())
+
+    def unregister(self, plugin_id: str) -> RegisteredPlugin:
+        with self._lock:
+            registration = self._registrations.pop(plugin_id, None)
+            self._plugins.pop(plugin_id, None)
+        if registration is None:
+            raise PluginRegistryError(
+                f"Plugin not found, plugin_id={plugin_id}", status_code=404
+            )
+        return registration
+
+    def preload_dir(self, directory: str) -> List[RegisteredPlugin]:
+        """
+        Registers every *.json manifest in a directory. Invalid manifests are
+        logged and skipped so one bad file does not stop the server.
+        """
+        registrations = []
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith(".json"):
+                continue
+            file_path = os.path.join(directory, file_name)
+            try:
+                registrations.append(self.register_from_file(file_path))
+            except Exception as e:
+                logger.error(f"[PLUGIN-PRELOAD-FAILED] file={file_path}, error={e}")
+        return registrations
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            registrations = list(self._registrations.values())
+        return {
+            "plugins": len(registrations),
+            "max_plugins": self.max_plugins,
+            "memory_bytes": sum(r.size_bytes for r in registrations),
+            "compile_time_seconds": round(
+                sum(r.compile_time_seconds for r in registrations), 4
+            ),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._plugins.clear()
+            self._registrations.clear()
+
+
+plugin_registry = PluginRegistry()
+
+
+def preload_plugin_registry():
+    preload_dir = os.environ.get("OPENPLUGIN_PLUGIN_REGISTRY_PRELOAD_DIR")
+    if preload_dir:
+        registrations = plugin_registry.preload_dir(preload_dir)
+        logger.info(
+            f"[PLUGIN-REGISTRY-PRELOADED] dir={preload_dir}, plugins={len(registrations)}"  # noqa: E501
+        )
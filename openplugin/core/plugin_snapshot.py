@@ -0,0 +1,183 @@
+import gc
+import json
+import mmap
+import os
+import pickle
+import platform
+import time
+from typing import List, Optional
+
+import pydantic
+from loguru import logger
+from pydantic import BaseModel
+
+from .manifest_fetcher import manifest_fetcher
+from .plugin import PluginBuilder
+from .plugin_cache import (
+    CompiledPlugin,
+    CompiledPluginCache,
+    compile_plugin,
+    compiled_plugin_cache,
+    compute_openapi_doc_hash,
+)
+from .plugin_registry import PluginRegistry, plugin_registry
+
+SNAPSHOT_MAGIC = b"OPENPLUGIN-SNAPSHOT\n"
+# 2: compiled functions are slotted records instead of pydantic models
+# 3: functions no longer keep their tool json as bytes
+# 4: plugins keep the source they were loaded from
+SNAPSHOT_FORMAT_VERSION = 5
+
+
+class PluginSnapshotError(Exception):
+    """Raised when a snapshot cannot be written or is not loadable here."""
+
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
+class SnapshotHeader(BaseModel):
+    format_version: int = SNAPSHOT_FORMAT_VERSION
+    python_version: str = platform.python_version()
+    pydantic_version: str = pydantic.VERSION
+    plugin_count: int = 0
+    plugin_ids: List[str] = []
+    created_at: float = 0
+
+
+def get_runtime_header() -> SnapshotHeader:
+    return SnapshotHeader()
+
+
+def is_compatible(header: SnapshotHeader) -> bool:
+    """
+    Pickled pydantic models are only safe to load with the same format,
+    python minor version and pydantic version that wrote them.
+    """
+    runtime = get_runtime_header()
+    return (
+        header.format_version == runtime.format_version
+        and header.python_version.rsplit(".", 1)[0]
+        == runtime.python_version.rsplit(".", 1)[0]
+        and header.pydantic_version == runtime.pydantic_version
+    )
+
+
+def compile_sources(sources: List[str]) -> List[CompiledPlugin]:
+    """
+    Compiles manifests from files, directories of *.json files or urls.
+    """
+    openapi_doc_objs = []
+    for source in sources:
+        if source.startswith("http"):
+            openapi_doc_objs.append(manifest_fetcher.fetch(source).get_json())
+        elif os.path.isdir(source):
+            for file_name in sorted(os.listdir(source)):
+                if file_name.endswith(".json"):
+                    with open(os.path.join(source, file_name), "r") as file:
+                        openapi_doc_objs.append(json.load(file))
+        else:
+            with open(source, "r") as file:
+                openapi_doc_objs.append(json.load(file))
+
+    compiled_plugins = []
+    for openapi_doc_obj in openapi_doc_objs:
+        compiled_plugins.append(
+            compile_plugin(
+                compute_openapi_doc_hash(openapi_doc_obj),
+                lambda: PluginBuilder.build_from_openapi_doc_obj(openapi_doc_obj),
+            )
+        )
+    return compiled_plugins
+
+
+def write_snapshot(compiled_plugins: List[CompiledPlugin], snapshot_file: str):
+    header = get_runtime_header()
+    header.plugin_count = len(compiled_plugins)
+    header.plugin_ids = [c.key for c in compiled_plugins]
+    header.created_at = time.time()
+    try:
+        payload = pickle.dumps(compiled_plugins, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        raise PluginSnapshotError(f"Failed to serialize compiled plugins. {e}")
+
+    tmp_file = f"{snapshot_file}.tmp"
+    with open(tmp_file, "wb") as file:
+        file.write(SNAPSHOT_MAGIC)
+        file.write(header.model_dump_json().encode("utf-8"))
+        file.write(b"\n")
+        file.write(payload)
+    os.replace(tmp_file, snapshot_file)
+    return header
+
+
+def read_snapshot(snapshot_file: str) -> List[CompiledPlugin]:
+    with open(snapshot_file, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                raise PluginSnapshotError(f"Not a plugin snapshot: {snapshot_file}")
+            header_end = data.find(b"\n", len(SNAPSHOT_MAGIC))
+            header = SnapshotHeader.model_validate_json(
+                data[len(SNAPSHOT_MAGIC) : header_end]
+            )
+            if not is_compatible(header):
+                raise PluginSnapshotError(
+                    "Snapshot was built with format={}, python={}, pydantic={} "
+                    "and cannot be loaded by this runtime".format(
+                        header.format_version,
+                        header.python_version,
+                        header.pydantic_version,
+                    )
+                )
+            # unpickling allocates many long lived objects, and the collector
+            # passes it would trigger cost several times the load itself
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                with memoryview(data) as view:
+                    return pickle.loads(view[header_end + 1 :])
+            finally:
+                if gc_enabled:
+                    gc.enable()
+
+
+def load_snapshot(
+    snapshot_file: str,
+    registry: PluginRegistry = plugin_registry,
+    plugin_cache: CompiledPluginCache = compiled_plugin_cache,
+) -> List[CompiledPlugin]:
+    """
+    Loads a snapshot and registers its plugins, so they can be run by
+    plugin_id or by openapi doc without compiling them again.
+    """
+    compiled_plugins = read_snapshot(snapshot_file)
+    for compiled_plugin in compiled_plugins:
+        plugin_cache.put(compiled_plugin)
+        registry.add(compiled_plugin, source=snapshot_file)
+    return compiled_plugins
+
+
+_loaded_snapshot_file: Optional[str] = None
+
+
+def load_snapshot_from_env():
+    """
+    Loads OPENPLUGIN_PLUGIN_SNAPSHOT once per process. A snapshot that can't be
+    loaded is logged and skipped, the plugins then compile on first use.
+    Snapshots are pickles, only point this at files you built yourself.
+    """
+    global _loaded_snapshot_file
+    snapshot_file = os.environ.get("OPENPLUGIN_PLUGIN_SNAPSHOT")
+    if not snapshot_file or snapshot_file == _loaded_snapshot_file:
+        return
+    start_time = time.time()
+    try:
+        compiled_plugins = load_snapshot(snapshot_file)
+    except Exception as e:
+        logger.error(f"[PLUGIN-SNAPSHOT-FAILED] file={snapshot_file}, error={e}")
+        return
+    _loaded_snapshot_file = snapshot_file
+    logger.info(
+        f"[PLUGIN-SNAPSHOT-LOADED] file={snapshot_file}, plugins={len(compiled_plugins)}, time_taken={round(time.time() - start_time, 4)} seconds"  # noqa: E501
+    )
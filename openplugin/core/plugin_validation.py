@@ -0,0 +1,203 @@
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from urllib.parse import urlparse
+
+import litellm
+from pydantic import BaseModel
+
+from .functions import Functions
+from .manifest_fetcher import manifest_fetcher
+from .plugin import PluginBuilder
+
+DEFAULT_MAX_WORKERS = int(
+    os.environ.get("OPENPLUGIN_VALIDATION_MAX_WORKERS", os.cpu_count() or 1)
+)
+DEFAULT_TOKEN_MODEL = "gpt-4"
+# workers are not forked from the server, which holds locks and threads
+DEFAULT_START_METHOD = os.environ.get(
+    "OPENPLUGIN_VALIDATION_START_METHOD",
+    "forkserver"
+    if "forkserver" in multiprocessing.get_all_start_methods()
+    else "spawn",
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class PluginValidationResult(BaseModel):
+    source: str
+    valid: bool
+    plugin_name: Optional[str] = None
+    error: Optional[str] = None
+    compile_time_seconds: float = 0
+    function_count: int = 0
+    tool_json_bytes: int = 0
+    tool_json_tokens: int = 0
+
+
+def is_http_url(source: str) -> bool:
+    return urlparse(source).scheme in ("http", "https")
+
+
+def load_openapi_doc(source: str, allow_files: bool = True) -> dict:
+    if is_http_url(source):
+        return manifest_fetcher.fetch_json(source)
+    if not allow_files:
+        raise ValueError("Only http(s) urls are supported")
+    with open(source, "r") as file:
+        return json.load(file)
+
+
+def validate_plugin(
+    source: str,
+    openapi_doc_obj: Optional[dict] = None,
+    token_model: str = DEFAULT_TOKEN_MODEL,
+    allow_files: bool = True,
+) -> PluginValidationResult:
+    """
+    Builds the plugin and its functions, the same work as serving it. Errors
+    are returned in the result and never raised. Sources that are not http(s)
+    urls are read as local files only when allow_files is set.
+    """
+    start_time = time.time()
+    plugin_name = None
+    try:
+        if openapi_doc_obj is None:
+            openapi_doc_obj = load_openapi_doc(source, allow_files)
+        plugin = PluginBuilder.build_from_openapi_doc_obj(openapi_doc_obj)
+        plugin_name = plugin.name
+        functions = Functions()
+        functions.add_from_openapi_spec(
+            plugin.openapi_doc_obj,
+            plugin=plugin,
+            plugin_operations_map=plugin.plugin_operations,
+        )
+        compile_time_seconds = time.time() - start_time
+        tool_json = json.dumps(functions.get_litellm_json())
+        return PluginValidationResult(
+            source=source,
+            valid=True,
+            plugin_name=plugin_name,
+            compile_time_seconds=compile_time_seconds,
+            function_count=len(functions.functions),
+            tool_json_bytes=len(tool_json.encode("utf-8")),
+            tool_json_tokens=litellm.token_counter(model=token_model, text=tool_json),
+        )
+    except Exception as e:
+        return PluginValidationResult(
+            source=source,
+            valid=False,
+            plugin_name=plugin_name,
+            error=str(e),
+            compile_time_seconds=time.time() - start_time,
+        )
+
+
+def _init_worker():
+    # the parser prints its errors, keep stdout of the caller free
+    sys.stdout = sys.stderr
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Process pool shared by every validation, created on first use.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=DEFAULT_MAX_WORKERS,
+                mp_context=multiprocessing.get_context(DEFAULT_START_METHOD),
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor):
+    # a worker died and broke the pool, the next validation starts a new one
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+
+
+def validate_plugins(
+    sources: Iterable[Union[str, dict]],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    token_model: str = DEFAULT_TOKEN_MODEL,
+    allow_files: bool = True,
+) -> Iterator[PluginValidationResult]:
+    """
+    Validates manifest files, urls or openapi doc objects in the shared process
+    pool and yields the results as they finish, with at most max_workers of
+    them in the pool at a time. Files and urls are loaded by the worker, so
+    only their names are sent across processes.
+    """
+    items: List[Any] = []
+    for index, source in enumerate(sources):
+        if isinstance(source, dict):
+            name = (source.get("x-openplugin") or {}).get("name") or ""
+            items.append((f"openapi_doc_objs[{index}] {name}".strip(), source))
+        else:
+            items.append((source, None))
+    if not items:
+        return
+
+    if max_workers <= 1 or len(items) == 1:
+        for source, openapi_doc_obj in items:
+            yield validate_plugin(source, openapi_doc_obj, token_model, allow_files)
+        return
+
+    executor = get_executor()
+    pending = iter(items)
+    futures: Dict[Future, str] = {}
+    try:
+        while True:
+            for source, openapi_doc_obj in pending:
+                future = executor.submit(
+                    validate_plugin, source, openapi_doc_obj, token_model, allow_files
+                )
+                futures[future] = source
+                if len(futures) >= max_workers:
+                    break
+            if not futures:
+                return
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                source = futures.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # the worker itself died, e.g. killed for memory
+                    if isinstance(e, BrokenProcessPool):
+                        _discard_executor(executor)
+                        executor = get_executor()
+                    yield PluginValidationResult(
+                        source=source, valid=False, error=str(e)
+                    )
+    finally:
+        # the caller stopped reading, e.g. the client disconnected
+        for future in futures:
+            future.cancel()
+
+
+def expand_sources(sources: Iterable[str]) -> List[str]:
+    expanded: List[str] = []
+    for source in sources:
+        if not is_http_url(source) and os.path.isdir(source):
+            expanded.extend(
+                os.path.join(source, file_name)
+                for file_name in sorted(os.listdir(source))
+                if file_name.endswith(".json")
+            )
+        else:
+            expanded.append(source)
+    return expanded
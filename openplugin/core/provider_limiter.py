@@ -0,0 +1,329 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from loguru import logger
+
+from .llm_client_pool import hash_api_key
+
+DEFAULT_MAX_IN_FLIGHT = int(os.environ.get("OPENPLUGIN_PROVIDER_MAX_IN_FLIGHT", 32))
+# 0 leaves requests or tokens per minute unlimited
+DEFAULT_REQUESTS_PER_MINUTE = float(
+    os.environ.get("OPENPLUGIN_PROVIDER_REQUESTS_PER_MINUTE", 0)
+)
+DEFAULT_TOKENS_PER_MINUTE = float(
+    os.environ.get("OPENPLUGIN_PROVIDER_TOKENS_PER_MINUTE", 0)
+)
+DEFAULT_QUEUE_TIMEOUT_SECONDS = float(
+    os.environ.get("OPENPLUGIN_PROVIDER_QUEUE_TIMEOUT_SECONDS", 30)
+)
+# per provider overrides, e.g. {"openai": {"requests_per_minute": 500}}
+PROVIDER_LIMITS: Dict[str, dict] = json.loads(
+    os.environ.get("OPENPLUGIN_PROVIDER_LIMITS", "{}")
+)
+
+
+class ProviderQueueTimeoutError(Exception):
+    def __init__(
+        self,
+        provider: str,
+        wait_seconds: float,
+        message="Timed out waiting for a provider rate limit slot",
+    ):
+        self.provider = provider
+        self.wait_seconds = wait_seconds
+        self.message = f"{message}: {provider} after {round(wait_seconds, 2)} seconds"
+        super().__init__(self.message)
+
+
+def estimate_tokens(*parts: Any) -> int:
+    """Rough token count of prompt parts, about 4 characters per token."""
+    size = 0
+    for part in parts:
+        if part is None:
+            continue
+        if not isinstance(part, str):
+            part = json.dumps(part, default=str)
+        size += len(part)
+    return size // 4 + 1
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def get_wait_seconds(self, amount: float) -> float:
+        # requests above the capacity only wait for a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0
+        return (amount - self.tokens) / self.rate
+
+
+class _Ticket:
+    def __init__(self, tokens: int, loop: Optional[asyncio.AbstractEventLoop]):
+        self.tokens = tokens
+        self.granted = False
+        self.loop = loop
+        self.event: Any = asyncio.Event() if loop else threading.Event()
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self.event.set)
+
+
+class Lease:
+    """A granted slot, set tokens_used to correct the token estimate."""
+
+    def __init__(self, tokens: int, wait_seconds: float):
+        self.tokens = tokens
+        self.tokens_used: Optional[int] = None
+        self.wait_seconds = wait_seconds
+
+
+class ProviderLimit:
+    """
+    Max in-flight requests and requests and tokens per minute of one provider
+    and api key. Waiters are served in arrival order, so a large request at
+    the head of the queue is not starved by smaller ones behind it.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE,
+        queue_timeout_seconds: float = DEFAULT_QUEUE_TIMEOUT_SECONDS,
+    ):
+        self.provider = provider
+        self.max_in_flight = max_in_flight
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._queue: Deque[_Ticket] = deque()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.granted = 0
+        self.timeouts = 0
+        # waiters whose caller went away, e.g. a hedge attempt that lost
+        self.cancellations = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _grant(self, wake_head: bool = False) -> Optional[float]:
+        """
+        Grants queued tickets in order while there is room, returns how long
+        until the head of the queue could be granted when a bucket is empty.
+        """
+        now = time.monotonic()
+        while self._queue:
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                return None
+            ticket = self._queue[0]
+            wait_seconds = 0.0
+            for bucket, amount in [(self.requests, 1), (self.tokens, ticket.tokens)]:
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait_seconds = max(wait_seconds, bucket.get_wait_seconds(amount))
+            if wait_seconds > 0:
+                if wake_head:
+                    # the head may have queued behind max_in_flight without a
+                    # refill time to wait for
+                    ticket.wake()
+                return wait_seconds
+            if self.requests is not None:
+                self.requests.tokens -= 1
+            if self.tokens is not None:
+                self.tokens.tokens -= min(ticket.tokens, self.tokens.capacity)
+            self._queue.popleft()
+            self.in_flight += 1
+            ticket.granted = True
+            ticket.wake()
+        return None
+
+    def _enqueue(self, ticket: _Ticket) -> Optional[float]:
+        with self._lock:
+            self._queue.append(ticket)
+            return self._grant()
+
+    def _poll(self, ticket: _Ticket) -> Optional[float]:
+        with self._lock:
+            if ticket.event.is_set():
+                ticket.event.clear()
+            return None if ticket.granted else self._grant()
+
+    def _give_up(
+        self, ticket: _Ticket, wait_seconds: float, cancelled: bool = False
+    ) -> bool:
+        with self._lock:
+            if ticket.granted:
+                return False
+            self._queue.remove(ticket)
+            if cancelled:
+                self.cancellations += 1
+            else:
+                self.timeouts += 1
+            self._grant(wake_head=True)
+        if not cancelled:
+            logger.warning(
+                f"[PROVIDER-QUEUE-TIMEOUT] provider={self.provider}, wait={round(wait_seconds, 4)} seconds"  # noqa: E501
+            )
+        return True
+
+    def _get_timeout(self, retry_seconds: Optional[float], waited: float) -> float:
+        remaining = self.queue_timeout_seconds - waited
+        if retry_seconds is None:
+            return max(0.0, remaining)
+        return max(0.0, min(retry_seconds, remaining))
+
+    def _granted(self, ticket: _Ticket, wait_seconds: float) -> Lease:
+        with self._lock:
+            self.granted += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+        return Lease(ticket.tokens, wait_seconds)
+
+    def acquire(self, tokens: int = 0) -> Lease:
+        start_time = time.monotonic()
+        ticket = _Ticket(tokens, None)
+        retry_seconds = self._enqueue(ticket)
+        while not ticket.granted:
+            waited = time.monotonic() - start_time
+            if waited >= self.queue_timeout_seconds:
+                if self._give_up(ticket, waited):
+                    raise ProviderQueueTimeoutError(self.provider, waited)
+                break
+            ticket.event.wait(self._get_timeout(retry_seconds, waited))
+            retry_seconds = self._poll(ticket)
+        return self._granted(ticket, time.monotonic() - start_time)
+
+    async def aacquire(self, tokens: int = 0) -> Lease:
+        start_time = time.monotonic()
+        ticket = _Ticket(tokens, asyncio.get_running_loop())
+        retry_seconds = self._enqueue(ticket)
+        while not ticket.granted:
+            waited = time.monotonic() - start_time
+            if waited >= self.queue_timeout_seconds:
+                if self._give_up(ticket, waited):
+                    raise ProviderQueueTimeoutError(self.provider, waited)
+                break
+            try:
+                await asyncio.wait_for(
+                    ticket.event.wait(), self._get_timeout(retry_seconds, waited)
+                )
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                if not self._give_up(
+                    ticket, time.monotonic() - start_time, cancelled=True
+                ):
+                    self.release(Lease(ticket.tokens, 0))
+                raise
+            retry_seconds = self._poll(ticket)
+        return self._granted(ticket, time.monotonic() - start_time)
+
+    def release(self, lease: Lease):
+        with self._lock:
+            self.in_flight -= 1
+            if self.tokens is not None and lease.tokens_used is not None:
+                # settle the estimate against what the request really used
+                estimate = min(lease.tokens, self.tokens.capacity)
+                self.tokens.tokens -= lease.tokens_used - estimate
+            self._grant(wake_head=True)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": len(self._queue),
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "requests_per_minute": self.requests.capacity if self.requests else 0,
+                "tokens_per_minute": self.tokens.capacity if self.tokens else 0,
+                "granted": self.granted,
+                "timeouts": self.timeouts,
+                "cancellations": self.cancellations,
+                "avg_wait_seconds": (
+                    round(self.total_wait_seconds / self.granted, 4)
+                    if self.granted
+                    else 0.0
+                ),
+                "max_wait_seconds": round(self.max_wait_seconds, 4),
+            }
+
+
+class ProviderLimiter:
+    """
+    Provider limits per provider and api key. Requests wait in the queue of
+    their limit for up to queue_timeout_seconds instead of being sent past the
+    provider's rate limits and retried.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, dict]] = None):
+        self.limits = PROVIDER_LIMITS if limits is None else limits
+        self._provider_limits: Dict[Tuple[str, str], ProviderLimit] = {}
+        self._lock = threading.Lock()
+
+    def get_limit(self, provider: str, api_key: Optional[str]) -> ProviderLimit:
+        provider = provider.lower()
+        key = (provider, hash_api_key(api_key))
+        with self._lock:
+            provider_limit = self._provider_limits.get(key)
+            if provider_limit is None:
+                provider_limit = ProviderLimit(
+                    provider, **self.limits.get(provider, {})
+                )
+                self._provider_limits[key] = provider_limit
+            return provider_limit
+
+    @contextmanager
+    def limit(self, provider: str, api_key: Optional[str], tokens: int = 0):
+        provider_limit = self.get_limit(provider, api_key)
+        lease = provider_limit.acquire(tokens)
+        try:
+            yield lease
+        finally:
+            provider_limit.release(lease)
+
+    @asynccontextmanager
+    async def alimit(self, provider: str, api_key: Optional[str], tokens: int = 0):
+        provider_limit = self.get_limit(provider, api_key)
+        lease = await provider_limit.aacquire(tokens)
+        try:
+            yield lease
+        finally:
+            provider_limit.release(lease)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            provider_limits = dict(self._provider_limits)
+        # api keys only show up as their hash
+        return {
+            f"{provider}:{key_hash}": provider_limit.get_stats()
+            for (provider, key_hash), provider_limit in provider_limits.items()
+        }
+
+    def clear(self):
+        with self._lock:
+            self._provider_limits.clear()
+
+
+provider_limiter = ProviderLimiter()
@@ -0,0 +1,72 @@
+from typing import Any, ClassVar, Dict, Iterator, Tuple
+
+REQUIRED: Any = object()
+
+
+class Record:
+    """
+    Frozen __slots__ record for the objects a compiled plugin keeps, without
+    the per-instance dict and validation of a pydantic model. Subclasses map
+    their fields to defaults in _fields and list them in __slots__, other
+    slots hold lazily built caches. Fields are set once by __init__, empty
+    list and dict defaults are copied per instance.
+    """
+
+    __slots__ = ()
+    _fields: ClassVar[Dict[str, Any]] = {}
+
+    def __init__(self, **values):
+        for name, default in self._fields.items():
+            if name in values:
+                value = values.pop(name)
+            elif default is REQUIRED:
+                raise TypeError(f"{type(self).__name__} missing field: {name}")
+            elif isinstance(default, (list, dict)):
+                value = type(default)()
+            else:
+                value = default
+            object.__setattr__(self, name, value)
+        if values:
+            raise TypeError(
+                f"{type(self).__name__} got unknown fields: {', '.join(values)}"
+            )
+
+    def __setattr__(self, name: str, value: Any):
+        if name in self._fields:
+            raise AttributeError(f"{type(self).__name__} is frozen")
+        object.__setattr__(self, name, value)
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={value!r}" for name, value in self.iter_fields())
+        return f"{type(self).__name__}({values})"
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # caches are kept too, so a snapshot doesn't have to rebuild them
+        return {
+            name: getattr(self, name)
+            for name in self.get_slots()
+            if hasattr(self, name)
+        }
+
+    def __setstate__(self, state: Dict[str, Any]):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def get_slots(cls) -> Iterator[str]:
+        for klass in cls.__mro__:
+            yield from getattr(klass, "__slots__", ())
+
+    def iter_fields(self) -> Iterator[Tuple[str, Any]]:
+        for name in self._fields:
+            yield name, getattr(self, name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.iter_fields())
@@ -0,0 +1,139 @@
+from typing import Any, Dict, Iterator, Mapping, Set
+from urllib.parse import unquote
+
+import jsonref
+
+
+class RefResolutionError(Exception):
+    def __init__(self, message="Failed to resolve $ref"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class ExternalRefError(RefResolutionError):
+    pass
+
+
+class RefResolver:
+    """
+    Resolves local "#/..." $refs of a document in a single pass.
+
+    Every ref target is resolved once and the resolved subtree is shared by all
+    the places that point to it, so callers must copy before modifying. Like
+    jsonref, keys next to a $ref are ignored. A $ref that points back into one
+    of its own ancestors is left in place as {"$ref": ...} to break the cycle.
+    The input document is never modified or aliased.
+    """
+
+    def __init__(self, document: Any):
+        self.document = document
+        self._resolved: Dict[str, Any] = {}
+        self._resolving: Set[str] = set()
+
+    def resolve(self) -> Any:
+        return self._resolve_node(self.document)
+
+    def resolve_node(self, node: Any) -> Any:
+        """
+        Resolves a subtree of the document, sharing resolved refs with other
+        calls on this resolver.
+        """
+        return self._resolve_node(node)
+
+    def resolve_ref(self, ref: str) -> Any:
+        return self._resolve_ref(ref)
+
+    def _resolve_node(self, node: Any) -> Any:
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str):
+                return self._resolve_ref(ref)
+            return {key: self._resolve_node(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [self._resolve_node(item) for item in node]
+        return node
+
+    def _resolve_ref(self, ref: str) -> Any:
+        if ref in self._resolved:
+            return self._resolved[ref]
+        if not ref.startswith("#"):
+            raise ExternalRefError(f"External $ref is not supported: {ref}")
+        if ref in self._resolving:
+            return {"$ref": ref}
+        self._resolving.add(ref)
+        try:
+            resolved = self._resolve_node(self._get_target(ref))
+        finally:
+            self._resolving.discard(ref)
+        self._resolved[ref] = resolved
+        return resolved
+
+    def _get_target(self, ref: str) -> Any:
+        target = self.document
+        pointer = unquote(ref[1:])
+        if not pointer:
+            return target
+        for part in pointer.lstrip("/").split("/"):
+            part = part.replace("~1", "/").replace("~0", "~")
+            try:
+                if isinstance(target, list):
+                    target = target[int(part)]
+                else:
+                    target = target[part]
+            except (KeyError, IndexError, ValueError, TypeError):
+                raise RefResolutionError(f"Reference not found: {ref}")
+        return target
+
+
+class ResolvedComponents(Mapping):
+    """
+    "#/components/<section>/<name>" refs of a document, each resolved on first
+    access. Lazy form of the reference map the function builder looks up the
+    refs a cycle left in place in.
+    """
+
+    def __init__(self, resolver: RefResolver):
+        self.resolver = resolver
+
+    def _get_components(self) -> dict:
+        document = self.resolver.document
+        components = document.get("components") if isinstance(document, dict) else None
+        return components if isinstance(components, dict) else {}
+
+    def __getitem__(self, ref: str) -> Any:
+        parts = ref.split("/") if isinstance(ref, str) else []
+        if len(parts) != 4 or parts[:2] != ["#", "components"]:
+            raise KeyError(ref)
+        section = self._get_components().get(parts[2])
+        if not isinstance(section, dict) or parts[3] not in section:
+            raise KeyError(ref)
+        return self.resolver.resolve_ref(ref)
+
+    def __iter__(self) -> Iterator[str]:
+        for section, section_obj in self._get_components().items():
+            if isinstance(section_obj, dict):
+                for name in section_obj:
+                    yield f"#/components/{section}/{name}"
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+def resolve_refs(document: Any) -> Any:
+    """
+    Returns a plain copy of the document with all $refs resolved.
+    """
+    try:
+        return RefResolver(document).resolve()
+    except ExternalRefError:
+        # remote refs need a loader, keep the previous behaviour for them
+        return to_plain_dict(jsonref.JsonRef.replace_refs(document))
+
+
+def to_plain_dict(data):
+    if isinstance(data, dict):
+        return {key: to_plain_dict(value) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [to_plain_dict(item) for item in data]
+    else:
+        return data
@@ -4,14 +4,16 @@ from typing import Optional
 from openplugin.core import Config, Port, PortType, PortValueError
 
 from ..processor import (
+    PROCESSOR_NAME_MAP,
     InvalidInputPortError,
     InvalidOutputPortError,
     Processor,
+    ProcessorType,
 )
 
 
 class AudioToText(Processor):
-    name: str = "Audio to Text"
+    name: str = PROCESSOR_NAME_MAP[ProcessorType.AUDIO_TO_TEXT]
     description: str = "Converts audio to text"
 
     async def validate_input_port(self, input: Port) -> bool:
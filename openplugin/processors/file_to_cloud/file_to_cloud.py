@@ -4,14 +4,16 @@ from typing import Optional
 from openplugin.core import Config, Port, PortType, PortValueError
 
 from ..processor import (
+    PROCESSOR_NAME_MAP,
     InvalidInputPortError,
     InvalidOutputPortError,
     Processor,
+    ProcessorType,
 )
 
 
 class FileToCloud(Processor):
-    name: str = "File to Cloud Storage"
+    name: str = PROCESSOR_NAME_MAP[ProcessorType.FILE_TO_CLOUD]
     description: str = "Uploads file to cloud storage"
 
     async def validate_input_port(self, input: Port) -> bool:
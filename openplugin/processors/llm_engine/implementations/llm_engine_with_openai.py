@@ -1,9 +1,10 @@
 import os
 from typing import Optional
 
-from litellm import completion
+from litellm import acompletion
 
 from openplugin.core import Config, Port, PortType, PortValueError
+from openplugin.core.provider_limiter import estimate_tokens, provider_limiter
 
 from ..llm_engine import LLMEngine
 
@@ -29,9 +30,13 @@ class LLMEngineWithOpenAI(LLMEngine):
         else:
             raise Exception("LLM Engine with OpenAI: OpenAI API Key not found")
         try:
-            response = completion(
-                model="gpt-3.5-turbo", messages=messages, api_key=openai_api_key
-            )
+            async with provider_limiter.alimit(
+                "openai", openai_api_key, estimate_tokens(messages)
+            ) as lease:
+                response = await acompletion(
+                    model="gpt-3.5-turbo", messages=messages, api_key=openai_api_key
+                )
+                lease.tokens_used = response["usage"]["total_tokens"]
             content = response["choices"][0]["message"]["content"]
         except Exception as e:
             raise Exception(f"Context Limit Error: Failed to run completion. {e}")
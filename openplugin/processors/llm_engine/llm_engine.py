@@ -4,14 +4,16 @@ from typing import Optional
 from openplugin.core import Config, Port, PortType, PortValueError
 
 from ..processor import (
+    PROCESSOR_NAME_MAP,
     InvalidInputPortError,
     InvalidOutputPortError,
     Processor,
+    ProcessorType,
 )
 
 
 class LLMEngine(Processor):
-    name: str = "LLM transformation"
+    name: str = PROCESSOR_NAME_MAP[ProcessorType.LLM_ENGINE]
     description: str = "Converts using LLM"
 
     async def validate_input_port(self, input: Port) -> bool:
@@ -47,6 +47,19 @@ PROCESSOR_IMPLEMENTATION_MAP = {
     ProcessorImplementationType.LLM_ENGINE_WITH_OPENAI: ProcessorType.LLM_ENGINE,
 }
 
+# names are known without importing the implementations and their dependencies
+PROCESSOR_NAME_MAP = {
+    ProcessorType.TEXT_TO_AUDIO: "Text To Audio",
+    ProcessorType.AUDIO_TO_TEXT: "Audio to Text",
+    ProcessorType.TEMPLATE_ENGINE: "Template Engine",
+    ProcessorType.TEXT_TO_FILE: "Text To File",
+    ProcessorType.FILE_TO_TEXT: "File To Text",
+    ProcessorType.FILE_TO_CLOUD: "File to Cloud Storage",
+    ProcessorType.URL_TO_HTML: "Url to html",
+    ProcessorType.HTML_TO_TEXT: "HTML To Text",
+    ProcessorType.LLM_ENGINE: "LLM transformation",
+}
+
 
 class InvalidInputPortError(Exception):
     """Raised when the input port is invalid"""
@@ -4,14 +4,16 @@ from typing import Optional
 from openplugin.core import Config, Port, PortType, PortValueError
 
 from ..processor import (
+    PROCESSOR_NAME_MAP,
     InvalidInputPortError,
     InvalidOutputPortError,
     Processor,
+    ProcessorType,
 )
 
 
 class TemplateEngine(Processor):
-    name: str = "Template Engine"
+    name: str = PROCESSOR_NAME_MAP[ProcessorType.TEMPLATE_ENGINE]
     description: str = "Converts"
 
     async def validate_input_port(self, input: Port) -> bool:
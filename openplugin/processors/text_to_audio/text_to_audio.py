@@ -4,14 +4,16 @@ from typing import Optional
 from openplugin.core import Config, Port, PortType, PortValueError
 
 from ..processor import (
+    PROCESSOR_NAME_MAP,
     InvalidInputPortError,
     InvalidOutputPortError,
     Processor,
+    ProcessorType,
 )
 
 
 class TextToAudio(Processor):
-    name: str = "Text To Audio"
+    name: str = PROCESSOR_NAME_MAP[ProcessorType.TEXT_TO_AUDIO]
     description: str = "Converts text to audio"
 
     async def validate_input_port(self, input: Port) -> bool:
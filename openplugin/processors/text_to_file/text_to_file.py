@@ -4,14 +4,16 @@ from typing import Optional
 from openplugin.core import Config, Port, PortType, PortValueError
 
 from ..processor import (
+    PROCESSOR_NAME_MAP,
     InvalidInputPortError,
     InvalidOutputPortError,
     Processor,
+    ProcessorType,
 )
 
 
 class TextToFile(Processor):
-    name: str = "Text To File"
+    name: str = PROCESSOR_NAME_MAP[ProcessorType.TEXT_TO_FILE]
     description: str = "Converts text to file"
 
     async def validate_input_port(self, input: Port) -> bool:
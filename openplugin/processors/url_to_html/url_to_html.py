@@ -4,14 +4,16 @@ from typing import Optional
 from openplugin.core import Config, Port, PortType, PortValueError
 
 from ..processor import (
+    PROCESSOR_NAME_MAP,
     InvalidInputPortError,
     InvalidOutputPortError,
     Processor,
+    ProcessorType,
 )
 
 
 class UrlToHtml(Processor):
-    name: str = "Url to html"
+    name: str = PROCESSOR_NAME_MAP[ProcessorType.URL_TO_HTML]
     description: str = "Converts a URL to HTML."
 
     async def validate_input_port(self, input: Port) -> bool:
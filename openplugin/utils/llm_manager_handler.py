@@ -16,6 +16,13 @@ AWS_MODELS = [
 ]
 
 
+def get_llm_provider_name(model: str) -> str:
+    try:
+        return litellm.get_llm_provider(model)[1]
+    except Exception:
+        return "litellm"
+
+
 def get_llm_response_from_messages(
     msgs,
     model,
@@ -28,6 +35,9 @@ def get_llm_response_from_messages(
     aws_access_key_id=None,
     aws_region_name=None,
 ):
+    # openplugin.core imports this module, so the limiter is imported lazily
+    from openplugin.core.provider_limiter import estimate_tokens, provider_limiter
+
     request_prompt = ""
     for msg in msgs:
         request_prompt = request_prompt + " " + msg.get("content", "")
@@ -38,15 +48,19 @@ def get_llm_response_from_messages(
             aws_access_key_id=aws_access_key_id,
             aws_secret_access_key=llm_api_key,
         )
-        start_time = time.time()
-        response = litellm.completion(
-            messages=msgs,
-            aws_bedrock_client=bedrock,
-            model=model,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            top_p=top_p,
-        )
+        with provider_limiter.limit(
+            "bedrock", aws_access_key_id, estimate_tokens(msgs) + max_tokens
+        ) as lease:
+            start_time = time.time()
+            response = litellm.completion(
+                messages=msgs,
+                aws_bedrock_client=bedrock,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                top_p=top_p,
+            )
+            lease.tokens_used = response.get("usage").get("total_tokens")
         cost = litellm.completion_cost(completion_response=response)
 
         choices = response.get("choices")
@@ -74,6 +88,7 @@ def get_llm_response_from_messages(
                 "llm_latency_seconds": llm_latency_seconds,
                 "frequency_penalty": frequency_penalty,
                 "presence_penalty": presence_penalty,
+                "queue_wait_seconds": lease.wait_seconds,
             },
         }
 
@@ -91,16 +106,23 @@ def get_llm_response_from_messages(
     else:
         litellm.api_key = llm_api_key
     litellm.drop_params = True
-    start_time = time.time()
-    response = litellm.completion(
-        model=model,
-        messages=msgs,
-        temperature=temperature,
-        max_tokens=max_tokens,
-        top_p=top_p,
-        frequency_penalty=frequency_penalty,
-        presence_penalty=presence_penalty,
-    )
+    with provider_limiter.limit(
+        "google" if "bison" in model else get_llm_provider_name(model),
+        # google service account keys can come as dicts
+        llm_api_key if llm_api_key is None else str(llm_api_key),
+        estimate_tokens(msgs) + max_tokens,
+    ) as lease:
+        start_time = time.time()
+        response = litellm.completion(
+            model=model,
+            messages=msgs,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+            frequency_penalty=frequency_penalty,
+            presence_penalty=presence_penalty,
+        )
+        lease.tokens_used = response.get("usage").get("total_tokens")
     choices = response.get("choices")
     response_prompt = ""
     if choices and len(choices) > 0:
@@ -128,5 +150,6 @@ def get_llm_response_from_messages(
             "status_code": "200",
             "frequency_penalty": frequency_penalty,
             "presence_penalty": presence_penalty,
+            "queue_wait_seconds": lease.wait_seconds,
         },
     }
@@ -8,7 +8,7 @@ from fastapi.responses import JSONResponse
 
 from openplugin.core.config import Config
 from openplugin.core.function_providers import FunctionProviders
-from openplugin.core.plugin import PluginBuilder
+from openplugin.core.plugin_cache import compiled_plugin_cache
 from openplugin.core.plugin_execution_pipeline import (
     PluginExecutionPipeline,
     PluginExecutionPipelineError,
@@ -38,16 +38,16 @@ async def run_pipeline(
         pipeline = None
         input = Port(data_type=PortType.TEXT, value=prompt)
         if openapi_doc_obj is not None:
-            plugin_obj = PluginBuilder.build_from_openapi_doc_obj(openapi_doc_obj)
+            plugin_obj = compiled_plugin_cache.get_or_compile(openapi_doc_obj).plugin
         elif openapi_doc_url is not None:
             if openapi_doc_url.startswith("http"):
-                plugin_obj = PluginBuilder.build_from_openapi_doc_url(
+                plugin_obj = compiled_plugin_cache.get_or_compile_from_url(
                     openapi_doc_url
-                )
+                ).plugin
             else:
-                plugin_obj = PluginBuilder.build_from_openapi_doc_file(
+                plugin_obj = compiled_plugin_cache.get_or_compile_from_file(
                     openapi_doc_url
-                )
+                ).plugin
         else:
             return JSONResponse(
                 status_code=400,
@@ -156,16 +156,16 @@ async def arun_pipeline(
         pipeline = None
         input = Port(data_type=PortType.TEXT, value=prompt)
         if openapi_doc_obj is not None:
-            plugin_obj = PluginBuilder.build_from_openapi_doc_obj(openapi_doc_obj)
+            plugin_obj = compiled_plugin_cache.get_or_compile(openapi_doc_obj).plugin
         elif openapi_doc_url is not None:
             if openapi_doc_url.startswith("http"):
-                plugin_obj = PluginBuilder.build_from_openapi_doc_url(
+                plugin_obj = compiled_plugin_cache.get_or_compile_from_url(
                     openapi_doc_url
-                )
+                ).plugin
             else:
-                plugin_obj = PluginBuilder.build_from_openapi_doc_file(
+                plugin_obj = compiled_plugin_cache.get_or_compile_from_file(
                     openapi_doc_url
-                )
+                ).plugin
         else:
             return JSONResponse(
                 status_code=400,
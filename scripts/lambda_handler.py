@@ -2,11 +2,14 @@ from mangum import Mangum
 
 from openplugin.api import create_app
 
+# built once per container, so warm invocations reuse compiled plugins and a
+# snapshot set in OPENPLUGIN_PLUGIN_SNAPSHOT is loaded during the cold start
+app = create_app(root_path="openplugin")
+asgi_handler = Mangum(app, lifespan="off")
+
 
 def handler(event, context):
     print(f"Running event: {event}")
-    app = create_app(root_path="openplugin")
-    asgi_handler = Mangum(app, lifespan="off")
     response = asgi_handler(event, context)
     print(f"Response: {response}")
     return response
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import time
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from openplugin.core import function_providers
+from openplugin.core.config import Config
+from openplugin.core.function_providers import (
+    FunctionLLM,
+    LLMBasedFunctionProvider,
+    LLMConfig,
+)
+from openplugin.core.llm_client_pool import LLMClientPool
+from openplugin.core.messages import Message, MessageType
+from openplugin.core.operations.implementations.operation_signature_builder_custom import (  # noqa: E501
+    CustomOperationSignatureBuilder,
+)
+from openplugin.core.plugin import PluginBuilder
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+DELAY = 0.3
+
+
+class FakeToolCallingModel(BaseChatModel):
+    function_name: str = "get_products"
+    arguments: dict = {"category": "shoes"}
+    delay: float = 0
+    bound_tools: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-tool-calling"
+
+    def bind_tools(self, tools):
+        self.bound_tools.append(tools)
+        return self.bind(tools=tools)
+
+    def _result(self) -> ChatResult:
+        tool_call = {
+            "id": "call_1",
+            "type": "function",
+            "function": {
+                "name": self.function_name,
+                "arguments": json.dumps(self.arguments),
+            },
+        }
+        token_usage = {
+            "prompt_tokens": 100,
+            "completion_tokens": 20,
+            "total_tokens": 120,
+        }
+        message = AIMessage(
+            content="",
+            additional_kwargs={"tool_calls": [tool_call]},
+            response_metadata={"token_usage": token_usage},
+        )
+        return ChatResult(
+            generations=[ChatGeneration(message=message)],
+            llm_output={"token_usage": token_usage, "model_name": "gpt-4"},
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self._result()
+
+
+def build_provider(monkeypatch, model: FakeToolCallingModel):
+    monkeypatch.setattr(
+        FunctionLLM, "convert_to_langchain_llm_model", lambda self, config: model
+    )
+    return LLMBasedFunctionProvider(
+        provider="openai",
+        model="gpt-4",
+        name="fake",
+        required_auth_keys=set(),
+        type="llm",
+        llm=FunctionLLM(
+            provider="openai", model_name="gpt-4", configuration=LLMConfig()
+        ),
+    )
+
+
+def build_builder(function_provider, selected_operation: str):
+    with open(test_file_path, "r") as f:
+        plugin = PluginBuilder.build_from_openapi_doc_obj(json.load(f))
+    return CustomOperationSignatureBuilder(
+        plugin=plugin,
+        function_provider=function_provider,
+        config=Config(openai_api_key="sk-test"),
+        selected_operations=[selected_operation],
+    )
+
+
+@pytest.mark.parametrize(
+    "selected_operation,function_name,arguments",
+    [
+        ("get<PATH>/orders", "get_orders", {"status": "shipped"}),
+        ("get<PATH>/orders/{orderId}", "get_orders_orderId", {"orderId": "42"}),
+    ],
+)
+def test_arun_matches_run(monkeypatch, selected_operation, function_name, arguments):
+    model = FakeToolCallingModel(function_name=function_name, arguments=arguments)
+    builder = build_builder(build_provider(monkeypatch, model), selected_operation)
+    messages = [
+        Message(content="show me my orders", message_type=MessageType.HumanMessage)
+    ]
+
+    sync_response = builder.run(messages, conversation=[])
+    async_response = asyncio.run(builder.arun(messages, conversation=[]))
+
+    for response in [sync_response, async_response]:
+        assert response.run_completed
+        operation = response.detected_plugin_operations[0]
+        assert operation.mapped_operation_parameters == arguments
+        assert response.tokens_used == 120
+        assert response.llm_calls[0]["used_for"] == "signature_builder"
+        # went through the provider limiter without waiting
+        assert response.llm_calls[0]["queue_wait_seconds"] < 0.05
+    assert async_response.llm_api_cost > 0
+    assert async_response.llm_api_cost == sync_response.llm_api_cost
+    assert (
+        async_response.detected_plugin_operations[0].api_called
+        == sync_response.detected_plugin_operations[0].api_called
+    )
+
+
+@pytest.mark.parametrize("concurrency", [2, 4])
+def test_arun_does_not_block_the_event_loop(monkeypatch, concurrency):
+    model = FakeToolCallingModel(delay=DELAY)
+    provider = build_provider(monkeypatch, model)
+
+    async def run_all():
+        return await asyncio.gather(
+            *[
+                provider.arun(f"prompt {i}", [], Config(openai_api_key="sk-test"))
+                for i in range(concurrency)
+            ]
+        )
+
+    start_time = time.time()
+    responses = asyncio.run(run_all())
+    assert time.time() - start_time < DELAY * 1.8
+    assert all(
+        response.detected_function_name == "get_products" for response in responses
+    )
+
+
+@pytest.mark.parametrize(
+    "second_tools,second_examples,reused",
+    [
+        ([{"name": "get_orders"}], [], True),
+        ([{"name": "get_products"}], [], False),
+        (
+            [{"name": "get_orders"}],
+            [
+                {
+                    "prompt": "my orders",
+                    "name": "get_orders",
+                    "parameter_mapping": {},
+                    "tool_call_id": "1",
+                }
+            ],
+            False,
+        ),
+    ],
+)
+def test_few_shot_chain_is_cached_per_tools_and_examples(
+    monkeypatch, second_tools, second_examples, reused
+):
+    monkeypatch.setattr(function_providers, "llm_chain_cache", LLMClientPool())
+    model = FakeToolCallingModel(bound_tools=[])
+    provider = build_provider(monkeypatch, model)
+    config = Config(openai_api_key="sk-test")
+
+    first = provider.get_chain([{"name": "get_orders"}], config, [])
+    second = provider.get_chain(second_tools, config, second_examples)
+
+    assert (first is second) == reused
+    assert len(model.bound_tools) == (1 if reused else 2)
+
+
+@pytest.mark.parametrize(
+    "conversation",
+    [[], [{"role": "system", "content": "These are system variables: {}"}]],
+)
+def test_few_shot_prefix_is_identical_across_requests(monkeypatch, conversation):
+    provider = build_provider(monkeypatch, FakeToolCallingModel())
+    examples = [
+        {
+            "prompt": "show my orders",
+            "name": "get_orders",
+            "parameter_mapping": {"status": "shipped"},
+            "tool_call_id": "1",
+        }
+    ]
+    chain = provider.get_chain([], Config(openai_api_key="sk-test"), examples)
+    prompt = chain.first
+
+    messages = [
+        prompt.invoke(provider.build_chain_input(query, conversation)).to_messages()
+        for query in ["first prompt", "second prompt"]
+    ]
+    prefix_length = 1 + 2 + len(conversation)
+    assert messages[0][:prefix_length] == messages[1][:prefix_length]
+    assert [m.content for m in messages[1][-1:]] == ["second prompt"]
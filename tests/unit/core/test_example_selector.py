@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from openplugin.core.function_compaction import count_json_tokens
+from openplugin.core.plugin_cache import CompiledPluginCache
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+EXAMPLES = {
+    ("/products", "get"): [
+        {"prompt": "Show me some red shoes", "parameters": {"q": "red shoes"}},
+        {"prompt": "Find winter jackets for men", "parameters": {"q": "jacket"}},
+    ],
+    ("/orders", "post"): [
+        {"prompt": "Order two blue shirts", "parameters": {"quantity": 2}},
+    ],
+    ("/orders/{orderId}", "get"): [
+        {"prompt": "Where is my order 1234", "parameters": {"orderId": "1234"}},
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def functions():
+    with open(test_file_path, "r") as f:
+        doc = json.load(f)
+    for (path, method), examples in EXAMPLES.items():
+        doc["paths"][path][method]["x-few-shot-examples"] = examples
+    return CompiledPluginCache().get_or_compile(doc).functions
+
+
+@pytest.mark.parametrize(
+    "prompt,example_count,first_kept",
+    [
+        ("show me red running shoes", 1, "Show me some red shoes"),
+        ("where is my order 99", 1, "Where is my order 1234"),
+        ("order three shirts", 2, "Order two blue shirts"),
+    ],
+)
+def test_keeps_most_similar_examples(functions, prompt, example_count, first_kept):
+    example_tokens = [
+        count_json_tokens(example)
+        for examples in EXAMPLES.values()
+        for example in examples
+    ]
+    # room for exactly example_count of the largest examples
+    budget = max(example_tokens) * example_count
+
+    examples, selection = functions.get_few_shot_examples(prompt, budget)
+
+    assert selection.total_examples == 4
+    assert selection.kept[0].prompt == first_kept
+    assert len(examples) == len(selection.kept) >= example_count
+    assert selection.tokens_used <= budget
+    similarities = [example.similarity for example in selection.kept]
+    assert similarities == sorted(similarities, reverse=True)
+    # kept examples keep their tool call ids and plugin order
+    assert [e["tool_call_id"] for e in examples] == sorted(
+        e["tool_call_id"] for e in examples
+    )
+    assert {e["prompt"] for e in examples} == {e.prompt for e in selection.kept}
+
+
+@pytest.mark.parametrize("token_budget", [0, 10000])
+def test_budget_keeps_everything(functions, token_budget):
+    examples, selection = functions.get_few_shot_examples("anything", token_budget)
+
+    assert [e["prompt"] for e in examples] == [
+        example["prompt"] for values in EXAMPLES.values() for example in values
+    ]
+    assert [e["name"] for e in examples] == [
+        "get_products",
+        "get_products",
+        "post_orders",
+        "get_orders_orderId",
+    ]
+    assert (selection is None) == (token_budget == 0)
@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import pytest
+from loguru import logger
+from pydantic import ValidationError
+
+from openplugin.core import Config, Port, PortType
+from openplugin.core import flow_path as flow_path_module
+from openplugin.core.flow_path import FlowPath
+from openplugin.core.plugin import PluginBuilder
+from openplugin.processors.processor import PROCESSOR_NAME_MAP
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+# registered by the plugin runner and the api before processors run
+try:
+    logger.level("FLOW", no=38, color="<yellow>", icon="🚀")
+except Exception:
+    pass
+
+
+def build_flow_path(processor_type, implementation_type, metadata):
+    return FlowPath(
+        name="test_module",
+        initial_input_port="json",
+        finish_output_port="text",
+        processors=[
+            {
+                "input_port": "json",
+                "output_port": "text",
+                "processor_type": processor_type,
+                "processor_implementation_type": implementation_type,
+                "metadata": metadata,
+            }
+        ],
+    )
+
+
+def fail_build(**kwargs):
+    raise AssertionError("processor was built")
+
+
+@pytest.mark.parametrize(
+    "processor_type,implementation_type",
+    [
+        ("text_to_audio", "text_to_audio_with_azure"),
+        ("file_to_cloud", "file_to_cloud_with_s3"),
+        ("template_engine", "template_engine_with_jinja"),
+    ],
+)
+def test_processors_are_not_built_up_front(
+    monkeypatch, processor_type, implementation_type
+):
+    monkeypatch.setattr(flow_path_module, "get_processor_from_str", fail_build)
+    flow_path = build_flow_path(processor_type, implementation_type, {"a": 1})
+
+    node = flow_path.processors[0]
+    assert node.get_processor_name() == PROCESSOR_NAME_MAP[node.processor_type]
+    assert flow_path.get_processor_metadata() == {node.get_processor_name(): {"a": 1}}
+
+
+@pytest.mark.parametrize("openapi_doc_file", [test_file_path])
+def test_plugin_build_does_not_build_processors(monkeypatch, openapi_doc_file):
+    monkeypatch.setattr(flow_path_module, "get_processor_from_str", fail_build)
+    with open(openapi_doc_file, "r") as f:
+        plugin = PluginBuilder.build_from_openapi_doc_obj(json.load(f))
+    modules = plugin.get_supported_output_modules("/products", "get")
+    assert modules
+    assert all(module.get_processor_metadata() is not None for module in modules)
+
+
+@pytest.mark.parametrize(
+    "template,expected",
+    [("{% for p in products %}{{ p['name'] }};{% endfor %}", "a;b;")],
+)
+def test_each_run_builds_its_own_processor(monkeypatch, template, expected):
+    flow_path = build_flow_path(
+        "template_engine", "template_engine_with_jinja", {"template": template}
+    )
+    node = flow_path.processors[0]
+    built = []
+    build_processor = type(node).build_processor
+
+    def record_build(self):
+        processor = build_processor(self)
+        built.append(processor)
+        return processor
+
+    monkeypatch.setattr(type(node), "build_processor", record_build)
+    input_port = Port(
+        data_type=PortType.JSON, value={"products": [{"name": "a"}, {"name": "b"}]}
+    )
+
+    outputs = [asyncio.run(flow_path.run(input_port, Config())) for _ in range(2)]
+
+    assert [port.value for port in outputs] == [expected, expected]
+    assert len(built) == 2
+    assert built[0] is not built[1]
+    assert node.get_processor_name() == built[0].name == "Template Engine"
+    # the node is shared by every request, runs don't write to it
+    assert "processor_name" not in node.__dict__
+    assert flow_path.get_processor_metadata() == {
+        "Template Engine": {"template": template}
+    }
+
+
+@pytest.mark.parametrize(
+    "processor_type,implementation_type",
+    [("text_to_audio", "template_engine_with_jinja")],
+)
+def test_mismatched_implementation_is_rejected(processor_type, implementation_type):
+    with pytest.raises(ValidationError):
+        build_flow_path(processor_type, implementation_type, {})
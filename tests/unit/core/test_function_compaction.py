@@ -0,0 +1,140 @@
+import copy
+import json
+
+import pytest
+
+from openplugin.core.function_compaction import (
+    MAX_DESCRIPTION_CHARS,
+    compact_function_json,
+    count_json_tokens,
+)
+from openplugin.core.plugin_cache import CompiledPluginCache
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+LONG_DESCRIPTION = "Search for products in the store by name, brand or category. " * 6
+
+
+def build_function_json():
+    return [
+        {
+            "name": "get_products",
+            "description": LONG_DESCRIPTION,
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "q": {
+                        "type": "string",
+                        "description": "Search term",
+                        "example": "red running shoes for trail running",
+                    },
+                    "color": {
+                        "type": "string",
+                        "description": "Color",
+                        "enum": [f"color_{i}" for i in range(30)],
+                    },
+                    "limit": {"type": "integer", "description": "Max results"},
+                },
+                "required": [],
+            },
+        }
+    ]
+
+
+def compact(token_budget):
+    function_json = build_function_json()
+    return compact_function_json(
+        function_json,
+        [count_json_tokens(function) for function in function_json],
+        [{"color", "limit"}],
+        token_budget,
+    )
+
+
+@pytest.mark.parametrize(
+    "budget_offset,stages",
+    [
+        (0, []),
+        (-5, ["drop_examples"]),
+        (-40, ["drop_examples", "trim_descriptions"]),
+        (-110, ["drop_examples", "trim_descriptions", "collapse_enums"]),
+        (
+            -190,
+            [
+                "drop_examples",
+                "trim_descriptions",
+                "collapse_enums",
+                "drop_optional_parameters",
+            ],
+        ),
+    ],
+)
+def test_compaction_stages_in_order(budget_offset, stages):
+    function_json = build_function_json()
+    tokens = count_json_tokens(function_json[0])
+
+    compacted, report = compact(tokens + budget_offset)
+
+    assert report.tokens_before == tokens
+    assert report.stages == stages
+    assert report.within_budget
+    assert report.tokens_after == count_json_tokens(compacted[0])
+    assert report.tokens_after <= tokens + budget_offset
+    properties = compacted[0]["parameters"]["properties"]
+    assert ("example" in properties["q"]) == ("drop_examples" not in stages)
+    if "drop_optional_parameters" in stages:
+        # the largest optional parameter goes first
+        assert "color" not in properties
+        assert "get_products.parameters.properties.color" in report.removed_fields
+    else:
+        assert ("enum" in properties["color"]) == ("collapse_enums" not in stages)
+    if "trim_descriptions" in stages:
+        assert "get_products.description" in report.removed_fields
+        assert len(compacted[0]["description"]) <= MAX_DESCRIPTION_CHARS + 3
+    # required parameters are never dropped
+    assert "q" in properties
+    assert function_json == build_function_json()
+
+
+@pytest.mark.parametrize("token_budget", [0, 1])
+def test_functions_compacted_json(token_budget):
+    with open(test_file_path, "r") as f:
+        compiled_plugin = CompiledPluginCache().get_or_compile(json.load(f))
+    functions = compiled_plugin.functions
+    original = copy.deepcopy(functions.get_json())
+
+    function_json, report = functions.get_compacted_json(token_budget)
+    litellm_json, _ = functions.get_compacted_litellm_json(token_budget)
+
+    assert [tool["function"] for tool in litellm_json] == function_json
+    assert functions.get_json() == original
+    if token_budget == 0:
+        assert report is None
+        assert function_json == original
+    else:
+        assert not report.within_budget
+        assert "drop_optional_parameters" in report.stages
+        assert report.tokens_before == sum(
+            function.get_token_count() for function in functions.functions
+        )
+        assert report.tokens_after < report.tokens_before
+
+
+@pytest.mark.parametrize("budget_offset", [-5, -40])
+def test_dependent_parameters_are_kept(budget_offset):
+    function_json = build_function_json()
+    x_dependent = {"dependent_on": "brand", "values": ["nike", "adidas"]}
+    function_json[0]["parameters"]["properties"]["q"]["x_dependent"] = x_dependent
+    tokens = count_json_tokens(function_json[0])
+
+    compacted, report = compact_function_json(
+        function_json,
+        [tokens],
+        [{"color", "limit"}],
+        tokens + budget_offset,
+    )
+
+    assert "drop_examples" in report.stages
+    q = compacted[0]["parameters"]["properties"]["q"]
+    assert "example" not in q
+    assert q["x_dependent"] == x_dependent
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import time
+from typing import Optional
+
+import pytest
+
+from openplugin.core.config import Config
+from openplugin.core.function_hedging import (
+    ProviderLatencies,
+    arun_hedged,
+    is_valid_tool_call,
+)
+from openplugin.core.function_providers import (
+    FunctionProvider,
+    FunctionProviders,
+    FunctionResponse,
+)
+from openplugin.core.operations.implementations import (
+    operation_signature_builder_with_langchain as signature_builder,
+)
+from openplugin.core.plugin import PluginBuilder
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+FUNCTION_JSON = [
+    {
+        "name": "get_orders",
+        "parameters": {
+            "type": "object",
+            "properties": {"status": {"type": "string"}},
+            "required": ["status"],
+        },
+    }
+]
+
+
+class FakeFunctionProvider(FunctionProvider):
+    delay: float = 0
+    cost: float = 0.01
+    arguments: Optional[dict] = {"status": "shipped"}
+    error: Optional[str] = None
+    cancelled: bool = False
+    # part of delay spent in the provider queue
+    queue_wait: Optional[float] = None
+
+    def get_temperature(self) -> int:
+        return 0
+
+    def get_provider_name(self) -> str:
+        return self.provider
+
+    def get_top_p(self) -> float:
+        return 0
+
+    def get_max_tokens(self) -> int:
+        return 4096
+
+    def get_model_name(self) -> str:
+        return self.model
+
+    def run(self, request_prompt, function_json, config, **kwargs):
+        raise NotImplementedError
+
+    async def arun(self, request_prompt, function_json, config, **kwargs):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise ValueError(self.error)
+        return FunctionResponse(
+            response_content="",
+            usage={},
+            response_metadata={},
+            cost=self.cost,
+            llm_latency_seconds=self.delay,
+            total_tokens=100,
+            is_function_call=True,
+            detected_function_name="get_orders",
+            detected_function_arguments=self.arguments,
+            queue_wait_seconds=self.queue_wait,
+        )
+
+
+def build_provider(name: str, **values) -> FakeFunctionProvider:
+    return FakeFunctionProvider(
+        provider="fake",
+        model=f"{name}-model",
+        name=name,
+        required_auth_keys=set(),
+        type="llm-based",
+        **values,
+    )
+
+
+def run_hedged(primary, secondary, hedge_delay=0.1, latencies=None):
+    if latencies is None:
+        latencies = ProviderLatencies(min_samples=1, default_delay=hedge_delay)
+    return asyncio.run(
+        arun_hedged(
+            primary, secondary, "show my orders", FUNCTION_JSON, None, [], [], latencies
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    "primary_values,secondary_values,winner,statuses,total_cost",
+    [
+        # answered before the hedge delay, the secondary is never called
+        ({"delay": 0}, {"delay": 0}, "primary", ["won"], 0.01),
+        # slow primary, the secondary wins and the primary is cancelled
+        (
+            {"delay": 2},
+            {"delay": 0, "cost": 0.02},
+            "secondary",
+            ["cancelled", "won"],
+            0.02,
+        ),
+        # the faster secondary misses a required parameter, so it loses
+        (
+            {"delay": 0.3},
+            {"delay": 0, "arguments": {}},
+            "primary",
+            ["won", "lost"],
+            0.02,
+        ),
+        # a failed primary is replaced by the secondary
+        (
+            {"delay": 0.2, "error": "boom"},
+            {"delay": 0.3},
+            "secondary",
+            ["failed", "won"],
+            0.01,
+        ),
+    ],
+)
+def test_first_valid_tool_call_wins(
+    primary_values, secondary_values, winner, statuses, total_cost
+):
+    primary = build_provider("primary", **primary_values)
+    secondary = build_provider("secondary", **secondary_values)
+
+    start_time = time.time()
+    func_response, trace = run_hedged(primary, secondary)
+
+    assert time.time() - start_time < 1
+    assert trace.winner == winner
+    assert [attempt.status for attempt in trace.attempts] == statuses
+    assert trace.hedged == (len(statuses) == 2)
+    assert trace.total_cost == pytest.approx(total_cost)
+    assert is_valid_tool_call(func_response, FUNCTION_JSON)
+    assert primary.cancelled == ("cancelled" in statuses)
+
+
+@pytest.mark.parametrize("error", ["primary", "both"])
+def test_errors_without_any_response_are_raised(error):
+    primary = build_provider("primary", delay=0.2, error="primary failed")
+    secondary = build_provider(
+        "secondary", error="secondary failed" if error == "both" else None
+    )
+
+    if error == "both":
+        with pytest.raises(ValueError, match="primary failed"):
+            run_hedged(primary, secondary)
+    else:
+        _, trace = run_hedged(primary, secondary)
+        assert trace.winner == "secondary"
+
+
+@pytest.mark.parametrize(
+    "samples,expected_delay",
+    [([], 3.0), ([1.0] * 9 + [12.0], 12.0), ([1.0] * 95 + [12.0] * 5, 1.0)],
+)
+def test_hedge_delay_follows_the_rolling_p90(samples, expected_delay):
+    latencies = ProviderLatencies(
+        min_samples=5, default_delay=3.0, min_delay=0.5, percentile=0.9
+    )
+    for sample in samples:
+        latencies.record("primary", sample)
+
+    assert latencies.get_hedge_delay("primary") == expected_delay
+
+
+@pytest.mark.parametrize(
+    "primary_values,expected_sample",
+    [
+        ({"delay": 0.1}, 0.1),
+        # queued behind our own rate limit, not slow to answer
+        ({"delay": 0.1, "queue_wait": 0.08}, 0.02),
+        # a cancelled attempt is not recorded
+        ({"delay": 0.5}, None),
+    ],
+)
+def test_hedge_latencies_leave_out_queue_wait(primary_values, expected_sample):
+    latencies = ProviderLatencies(min_samples=1, default_delay=0.2)
+    primary = build_provider("primary", **primary_values)
+
+    run_hedged(primary, build_provider("secondary"), latencies=latencies)
+
+    samples = list(latencies._latencies.get("primary") or [])
+    if expected_sample is None:
+        assert samples == []
+    else:
+        [sample] = samples
+        assert sample == pytest.approx(expected_sample, abs=0.05)
+
+
+@pytest.mark.parametrize(
+    "hedge_function_provider,expected_name",
+    [("openai [gpt-4o]", "OpenAI [gpt-4o]"), ("primary", None)],
+)
+def test_hedge_provider_is_looked_up_without_rebuilding(
+    monkeypatch, hedge_function_provider, expected_name
+):
+    builds = []
+    build = FunctionProviders.build
+
+    def record_build(file_location=None):
+        builds.append(file_location)
+        function_providers = build(file_location)
+        function_providers.providers.append(build_provider("primary"))
+        return function_providers
+
+    monkeypatch.setattr(FunctionProviders, "build", staticmethod(record_build))
+    monkeypatch.setattr(signature_builder, "_function_providers", None)
+    with open(test_file_path, "r") as f:
+        plugin = PluginBuilder.build_from_openapi_doc_obj(json.load(f))
+    builder = signature_builder.LangchainOperationSignatureBuilder(
+        plugin=plugin,
+        function_provider=build_provider("primary"),
+        config=Config(
+            openai_api_key="sk-test", hedge_function_provider=hedge_function_provider
+        ),
+    )
+
+    for _ in range(3):
+        provider = builder.get_hedge_function_provider()
+        assert (provider and provider.name) == expected_name
+    assert len(builds) == 1
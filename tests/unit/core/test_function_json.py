@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from openplugin.core.functions import Functions
+from openplugin.core.plugin import PluginBuilder
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+
+@pytest.fixture(scope="module")
+def functions():
+    with open(test_file_path, "r") as f:
+        plugin = PluginBuilder.build_from_openapi_doc_obj(json.load(f))
+    functions = Functions()
+    functions.add_from_plugin(plugin)
+    return functions
+
+
+@pytest.mark.parametrize(
+    "getter", ["get_json", "get_litellm_json", "get_expanded_json"]
+)
+def test_tool_json_is_memoized(functions, getter):
+    first = getattr(functions, getter)()
+    second = getattr(functions, getter)()
+
+    assert first == second
+    assert first is not second
+    if getter == "get_litellm_json":
+        first = [tool["function"] for tool in first]
+        second = [tool["function"] for tool in second]
+    assert all(a is b for a, b in zip(first, second))
+
+
+@pytest.mark.parametrize("function_name", ["get_products", "post_orders"])
+def test_function_json_is_built_once(functions, function_name):
+    function = functions.function_map[function_name]
+    tool_json = function.get_openai_function_json()
+
+    assert function.get_openai_function_json() is tool_json
+    assert tool_json == function._build_openai_function_json()
+
+
+@pytest.mark.parametrize("removed_function", ["get_orders"])
+def test_litellm_json_follows_functions(functions, removed_function):
+    selected = Functions(
+        functions=[f for f in functions.functions if f.name != removed_function]
+    )
+    assert len(functions.get_litellm_json()) == len(functions.functions)
+    assert len(selected.get_litellm_json()) == len(functions.get_litellm_json()) - 1
+    assert len(selected.get_json()) == len(functions.get_json()) - 1
@@ -0,0 +1,66 @@
+import json
+import pickle
+
+import pytest
+
+from openplugin.core.functions import Function, FunctionModel, FunctionProperty
+from openplugin.core.plugin_cache import CompiledPluginCache
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+
+def load_functions():
+    with open(test_file_path, "r") as f:
+        openapi_doc_obj = json.load(f)
+    return CompiledPluginCache().get_or_compile(openapi_doc_obj).functions
+
+
+@pytest.mark.parametrize("name", ["get_products", "post_orders"])
+def test_compiled_functions_are_frozen_records(name):
+    func = load_functions().get_function_from_func_name(name)
+
+    assert not hasattr(func, "__dict__")
+    with pytest.raises(AttributeError):
+        func.name = "renamed"
+    with pytest.raises(AttributeError):
+        func.param_properties[0].type = "integer"
+    assert all(isinstance(p, FunctionProperty) for p in func.param_properties)
+
+
+@pytest.mark.parametrize("name", ["get_products", "get_orders_orderId"])
+def test_function_model_round_trip(name):
+    func = load_functions().get_function_from_func_name(name)
+
+    model = func.to_model()
+    assert isinstance(model, FunctionModel)
+    assert model.api.url == func.get_api_url()
+    assert [p.name for p in model.param_properties] == [
+        p.name for p in func.param_properties
+    ]
+    rebuilt = Function.from_model(model)
+    assert rebuilt == func
+    assert rebuilt.get_openai_function_json() == func.get_openai_function_json()
+
+
+@pytest.mark.parametrize("name", ["get_products", "post_orders"])
+def test_pickled_function_keeps_its_tool_json(name):
+    func = load_functions().get_function_from_func_name(name)
+    func_json = func.get_openai_function_json()
+
+    restored = pickle.loads(pickle.dumps(func))
+    assert restored == func
+    assert restored._openai_function_json == func_json
+    with pytest.raises(AttributeError):
+        restored.path = "/other"
+
+
+@pytest.mark.parametrize(
+    "values,error",
+    [
+        ({"type": "string"}, "missing field: name"),
+        ({"name": "id", "type": "string", "unknown": 1}, "unknown fields: unknown"),
+    ],
+)
+def test_function_property_rejects_bad_fields(values, error):
+    with pytest.raises(TypeError, match=error):
+        FunctionProperty(**values)
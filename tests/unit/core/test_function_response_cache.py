@@ -0,0 +1,174 @@
+import copy
+import json
+import time
+
+import pytest
+
+from openplugin.core.config import Config
+from openplugin.core.function_providers import (
+    FunctionLLM,
+    FunctionResponse,
+    LLMBasedFunctionProvider,
+    LLMConfig,
+)
+from openplugin.core.function_response_cache import (
+    FunctionResponseCache,
+    MemoryFunctionResponseCacheBackend,
+    SQLiteFunctionResponseCacheBackend,
+    compute_function_cache_key,
+)
+from openplugin.core.messages import Message, MessageType
+from openplugin.core.operations.implementations import (
+    operation_signature_builder_with_langchain,
+)
+from openplugin.core.operations.implementations.operation_signature_builder_with_langchain import (  # noqa: E501
+    LangchainOperationSignatureBuilder,
+)
+from openplugin.core.plugin_cache import CompiledPluginCache
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteFunctionResponseCacheBackend(str(tmp_path / "cache.sqlite"))
+    return MemoryFunctionResponseCacheBackend()
+
+
+def build_func_response(function_name="get_orders") -> FunctionResponse:
+    return FunctionResponse(
+        response_content="",
+        usage={},
+        response_metadata={},
+        cost=0.01,
+        llm_latency_seconds=1.0,
+        total_tokens=120,
+        is_function_call=True,
+        detected_function_name=function_name,
+        detected_function_arguments={"status": "shipped"},
+    )
+
+
+@pytest.mark.parametrize(
+    "other_prompt,hit",
+    [
+        ("show   my orders ", True),
+        ("Show my orders", False),
+        ("show my products", False),
+    ],
+)
+def test_cache_key_normalizes_prompt_whitespace(other_prompt, hit):
+    key = compute_function_cache_key("gpt-4", 0, [{"name": "f"}], "show my orders")
+    other_key = compute_function_cache_key("gpt-4", 0, [{"name": "f"}], other_prompt)
+    assert (key == other_key) == hit
+
+
+@pytest.mark.parametrize(
+    "ttl_seconds,version,hit",
+    [(300, "v1", True), (-1, "v1", True), (300, "v2", False)],
+)
+def test_cache_ttl_and_plugin_version(backend, ttl_seconds, version, hit):
+    cache = FunctionResponseCache(backend, ttl_seconds=ttl_seconds, enabled=True)
+    cache.put("key", "Sample Store", "v1", build_func_response())
+
+    cached = cache.get("key", version)
+    assert (cached is not None) == hit
+    if hit:
+        assert cached.cached
+        assert cached.detected_function_arguments == {"status": "shipped"}
+    # a stale version is dropped, not just skipped
+    assert len(backend) == (1 if hit else 0)
+
+
+def test_cache_expired_entries_are_dropped(backend, monkeypatch):
+    cache = FunctionResponseCache(backend, ttl_seconds=10, enabled=True)
+    cache.put("key", "Sample Store", "v1", build_func_response())
+    now = time.time()
+    monkeypatch.setattr(
+        "openplugin.core.function_response_cache.time.time", lambda: now + 11
+    )
+
+    assert cache.get("key", "v1") is None
+    assert cache.get_stats()["expirations"] == 1
+    assert len(backend) == 0
+
+
+def test_cache_is_invalidated_when_compiled_plugin_changes(backend, monkeypatch):
+    cache = FunctionResponseCache(backend, enabled=True)
+    monkeypatch.setattr("openplugin.core.plugin_cache.function_response_cache", cache)
+    with open(test_file_path, "r") as f:
+        openapi_doc_obj = json.load(f)
+    plugin_cache = CompiledPluginCache()
+    plugin = plugin_cache.get_or_compile(openapi_doc_obj).plugin
+    # another plugin with the same name, served elsewhere
+    other_doc_obj = copy.deepcopy(openapi_doc_obj)
+    other_doc_obj["servers"][0]["url"] = "https://other.example.com/api"
+    other_plugin = plugin_cache.get_or_compile(other_doc_obj).plugin
+    assert plugin.get_source_id() != other_plugin.get_source_id()
+    cache.put("key", plugin.get_source_id(), "v1", build_func_response())
+    cache.put("other", other_plugin.get_source_id(), "v1", build_func_response())
+
+    plugin_cache.get_or_compile(openapi_doc_obj)
+    assert len(backend) == 2
+    openapi_doc_obj["info"]["description"] = "changed"
+    plugin_cache.get_or_compile(openapi_doc_obj)
+    assert len(backend) == 1
+    assert cache.get("other", "v1") is not None
+
+
+@pytest.mark.parametrize(
+    "cache_function_response,llm_calls", [(True, 1), (False, 2), (None, 2)]
+)
+def test_signature_builder_serves_repeated_prompts_from_cache(
+    monkeypatch, cache_function_response, llm_calls
+):
+    cache = FunctionResponseCache(MemoryFunctionResponseCacheBackend())
+    monkeypatch.setattr(
+        operation_signature_builder_with_langchain, "function_response_cache", cache
+    )
+    calls = []
+
+    def run(self, request_prompt, function_json, config, **kwargs):
+        calls.append(request_prompt)
+        return build_func_response()
+
+    monkeypatch.setattr(LLMBasedFunctionProvider, "run", run)
+    with open(test_file_path, "r") as f:
+        plugin = CompiledPluginCache().get_or_compile(json.load(f)).plugin
+    builder = LangchainOperationSignatureBuilder(
+        plugin=plugin,
+        function_provider=LLMBasedFunctionProvider(
+            provider="openai",
+            model="gpt-4",
+            name="fake",
+            required_auth_keys=set(),
+            type="llm",
+            llm=FunctionLLM(
+                provider="openai", model_name="gpt-4", configuration=LLMConfig()
+            ),
+        ),
+        config=Config(
+            openai_api_key="sk-test", cache_function_response=cache_function_response
+        ),
+        selected_operations=["get<PATH>/orders"],
+    )
+    messages = [
+        Message(content="show my orders", message_type=MessageType.HumanMessage)
+    ]
+
+    first = builder.run(messages, conversation=[])
+    second = builder.run(messages, conversation=[])
+
+    assert len(calls) == llm_calls
+    for response in [first, second]:
+        assert response.detected_plugin_operations[0].mapped_operation_parameters == {
+            "status": "shipped"
+        }
+    if cache_function_response:
+        assert first.function_response_cache["hit"] is False
+        assert second.function_response_cache["hit"] is True
+        assert second.llm_api_cost == 0
+        assert second.llm_calls[0]["cached"] is True
+    else:
+        assert second.function_response_cache is None
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from openplugin.core.functions import Functions, parse_selected_operations
+from openplugin.core.plugin_cache import CompiledPluginCache, compiled_plugin_cache
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+
+def load_doc():
+    with open(test_file_path, "r") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize(
+    "selected_operations,expected_names",
+    [
+        (None, None),
+        (["get<PATH>/products/{productId}"], ["get_products_productId"]),
+        (["GET<PATH>/Products/{PRODUCTID}"], ["get_products_productId"]),
+        (
+            ["get<PATH>/orders", "post<PATH>/orders", "get<PATH>/orders"],
+            ["post_orders", "get_orders"],
+        ),
+        (["get<PATH>/unknown"], []),
+    ],
+)
+def test_compiled_plugin_functions_view(selected_operations, expected_names):
+    compiled_plugin = CompiledPluginCache().get_or_compile(load_doc())
+    view = compiled_plugin.get_functions(parse_selected_operations(selected_operations))
+
+    all_functions = compiled_plugin.functions.functions
+    if expected_names is None:
+        expected_names = [f.name for f in all_functions]
+    assert [f.name for f in view.functions] == expected_names
+    for func in view.functions:
+        assert compiled_plugin.functions.function_map[func.name] is func
+        assert view.get_plugin_from_func_name(func.name) is compiled_plugin.plugin
+    assert view.get_json() == [
+        f.get_openai_function_json() for f in all_functions if f.name in expected_names
+    ]
+
+
+@pytest.mark.parametrize("cached", [True, False])
+def test_add_from_plugin_selected_operations(cached):
+    doc = load_doc()
+    doc["paths"]["/Stores"] = {
+        "get": {"summary": "List stores", "responses": {"200": {"description": "ok"}}}
+    }
+    compiled_plugin = compiled_plugin_cache.get_or_compile(doc)
+    plugin = compiled_plugin.plugin.model_copy()
+    if not cached:
+        plugin.content_hash = None
+
+    functions = Functions()
+    functions.add_from_plugin(plugin, ["get<PATH>/Stores", "get<PATH>/orders"])
+
+    assert [f.path for f in functions.functions] == ["/orders", "/Stores"]
+    compiled_function = compiled_plugin.functions.function_map["get_orders"]
+    assert (functions.functions[0] is compiled_function) == cached
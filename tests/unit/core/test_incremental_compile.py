@@ -0,0 +1,154 @@
+import copy
+import json
+
+import pytest
+
+from openplugin.core.plugin import PluginBuilder
+from openplugin.core.plugin_cache import (
+    CompiledPluginCache,
+    compile_plugin,
+    compute_openapi_doc_hash,
+)
+from openplugin.core.plugin_fingerprint import DocFingerprint
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+
+def load_doc():
+    with open(test_file_path, "r") as f:
+        return json.load(f)
+
+
+def add_few_shot_example(doc):
+    doc["paths"]["/products"]["get"]["x-few-shot-examples"].append(
+        {"prompt": "shoes", "function_call": {"name": "get_products"}}
+    )
+
+
+def change_helpers(doc):
+    doc["paths"]["/orders"]["post"]["x-helpers"] = ["Ask for the quantity"]
+
+
+def change_component(doc):
+    doc["components"]["schemas"]["Address"]["properties"]["zip"] = {"type": "string"}
+
+
+def add_path(doc):
+    doc["paths"]["/stores"] = {
+        "get": {"summary": "List stores", "responses": {"200": {"description": "ok"}}}
+    }
+
+
+def remove_path(doc):
+    del doc["paths"]["/orders/{orderId}"]
+
+
+def change_server(doc):
+    doc["servers"][0]["url"] = "https://other.example.com/api"
+
+
+def compile_in_full(doc):
+    return compile_plugin(
+        compute_openapi_doc_hash(doc),
+        lambda: PluginBuilder.build_from_openapi_doc_obj(copy.deepcopy(doc)),
+    )
+
+
+@pytest.mark.parametrize(
+    "edit,recompiled_operations",
+    [
+        (add_few_shot_example, 1),
+        (change_helpers, 1),
+        (change_component, 2),
+        (add_path, 1),
+        (remove_path, 0),
+        (change_server, None),
+    ],
+)
+def test_recompile_matches_full_compile(edit, recompiled_operations):
+    cache = CompiledPluginCache()
+    doc = load_doc()
+    previous = cache.get_or_compile(doc)
+    new_doc = copy.deepcopy(doc)
+    edit(new_doc)
+
+    compiled_plugin = cache.get_or_compile(new_doc)
+    expected = compile_in_full(new_doc)
+
+    assert compiled_plugin.recompiled_operations == recompiled_operations
+    assert compiled_plugin.functions.get_json() == expected.functions.get_json()
+    assert [f.response_obj_200 for f in compiled_plugin.functions.functions] == [
+        f.response_obj_200 for f in expected.functions.functions
+    ]
+    assert (
+        compiled_plugin.plugin.plugin_op_property_map
+        == expected.plugin.plugin_op_property_map
+    )
+    assert compiled_plugin.plugin.operation_index.entries.keys() == (
+        expected.plugin.operation_index.entries.keys()
+    )
+    assert compiled_plugin.size_bytes > 0
+
+    if recompiled_operations is not None:
+        previous_function = previous.functions.function_map["get_products_productId"]
+        function = compiled_plugin.functions.function_map["get_products_productId"]
+        assert function is previous_function
+
+
+@pytest.mark.parametrize(
+    "ref,incremental",
+    [("#/components/schemas/Node", False), ("#/paths/~1products/get", False)],
+)
+def test_fingerprint_falls_back_to_full_compile(ref, incremental):
+    doc = {
+        "paths": {"/nodes": {"get": {"responses": {"200": {"$ref": ref}}}}},
+        "components": {
+            "schemas": {
+                "Node": {
+                    "type": "object",
+                    "properties": {"children": {"items": {"$ref": ref}}},
+                }
+            }
+        },
+    }
+    fingerprint = DocFingerprint.build(doc)
+    assert fingerprint.incremental == incremental
+    assert fingerprint.get_changed_operations(fingerprint) is None
+
+
+@pytest.mark.parametrize(
+    "first_source,second_source,incremental",
+    [
+        ("https://a.example.com/store.json", "https://a.example.com/store.json", True),
+        # plugins sharing a name are different plugins
+        ("https://a.example.com/store.json", "https://b.example.com/store.json", False),
+        (None, None, True),
+    ],
+)
+def test_recompile_only_follows_the_same_source(
+    first_source, second_source, incremental
+):
+    cache = CompiledPluginCache()
+    doc = load_doc()
+    cache.get_or_compile(doc, first_source)
+    new_doc = copy.deepcopy(doc)
+    add_few_shot_example(new_doc)
+
+    compiled_plugin = cache.get_or_compile(new_doc, second_source)
+
+    assert (compiled_plugin.recompiled_operations is not None) == incremental
+    assert compiled_plugin.plugin.get_source_id() == (
+        second_source or "Sample Store@https://store.example.com/api"
+    )
+
+
+@pytest.mark.parametrize("source", ["/srv/plugins/store.json"])
+def test_source_is_not_in_the_manifest(source):
+    doc = load_doc()
+    doc["x-plugin-auth"] = {"type": "user_http", "authorization_type": "bearer"}
+    compiled_plugin = CompiledPluginCache().get_or_compile(doc, source)
+
+    assert compiled_plugin.plugin.get_source_id() == source
+    manifest = compiled_plugin.plugin.get_manifest_dict()
+    assert "source_id" not in manifest
+    assert source not in str(manifest)
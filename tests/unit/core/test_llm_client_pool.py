@@ -0,0 +1,144 @@
+import asyncio
+from typing import Any, Optional
+
+import langchain_openai
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from openplugin.core import function_providers
+from openplugin.core.config import Config
+from openplugin.core.function_providers import (
+    FunctionLLM,
+    LLMBasedFunctionProvider,
+    LLMConfig,
+)
+from openplugin.core.llm_client_pool import LLMClientPool
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = LLMClientPool(max_size=8, idle_seconds=300)
+    monkeypatch.setattr(function_providers, "llm_client_pool", pool)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    return pool
+
+
+def build_llm(temperature=0, model_name="gpt-4"):
+    return FunctionLLM(
+        provider="openai",
+        model_name=model_name,
+        configuration=LLMConfig(temperature=temperature),
+    )
+
+
+@pytest.mark.parametrize(
+    "first,second,reused",
+    [
+        ((0, "gpt-4", "sk-a"), (0, "gpt-4", "sk-a"), True),
+        ((0, "gpt-4", "sk-a"), (1, "gpt-4", "sk-a"), False),
+        ((0, "gpt-4", "sk-a"), (0, "gpt-3.5-turbo", "sk-a"), False),
+        ((0, "gpt-4", "sk-a"), (0, "gpt-4", "sk-b"), False),
+    ],
+)
+def test_clients_are_reused_per_key(pool, first, second, reused):
+    clients = []
+    for temperature, model_name, api_key in [first, second]:
+        llm = build_llm(temperature, model_name)
+        clients.append(
+            llm.convert_to_langchain_llm_model(Config(openai_api_key=api_key))
+        )
+
+    assert (clients[0] is clients[1]) == reused
+    stats = pool.get_stats()
+    assert stats["hits"] == (1 if reused else 0)
+    assert stats["clients"] == (1 if reused else 2)
+    assert stats["clients_by_provider"] == {"openai": stats["clients"]}
+    assert stats["connections"] == 0
+    # only a hash of the api key is kept
+    assert all("sk-a" not in str(key) for key in pool._clients)
+
+
+@pytest.mark.parametrize("max_size,expected_evictions", [(1, 2), (2, 1), (3, 0)])
+def test_least_recently_used_clients_are_evicted(max_size, expected_evictions):
+    pool = LLMClientPool(max_size=max_size)
+    for name in ["a", "b", "c"]:
+        pool.get(("openai", name), object)
+
+    stats = pool.get_stats()
+    assert stats["clients"] == 3 - expected_evictions
+    assert stats["evictions"] == expected_evictions
+    assert ("openai", "c") in pool._clients
+
+
+@pytest.mark.parametrize("idle_seconds,reused", [(0, False), (300, True)])
+def test_idle_clients_are_evicted(idle_seconds, reused):
+    pool = LLMClientPool(idle_seconds=idle_seconds)
+    first = pool.get(("openai", "gpt-4"), object)
+    second = pool.get(("openai", "gpt-4"), object)
+
+    assert (first is second) == reused
+    assert pool.get_stats()["idle_evictions"] == (0 if reused else 2)
+
+
+class LoopBoundModel(BaseChatModel):
+    loop: Optional[Any] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-loop-bound"
+
+    def bind_tools(self, tools):
+        return self.bind(tools=tools)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        # async connections only work in the loop they were opened in
+        loop = asyncio.get_running_loop()
+        if self.loop is None:
+            self.loop = loop
+        if self.loop is not loop:
+            raise RuntimeError("Event loop is closed")
+        tool_call = {
+            "id": "call_1",
+            "type": "function",
+            "function": {"name": "get_products", "arguments": "{}"},
+        }
+        message = AIMessage(content="", additional_kwargs={"tool_calls": [tool_call]})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+@pytest.mark.parametrize("runs", [2, 3])
+def test_async_clients_are_not_shared_across_event_loops(pool, monkeypatch, runs):
+    monkeypatch.setattr(
+        langchain_openai, "ChatOpenAI", lambda **kwargs: LoopBoundModel()
+    )
+    provider = LLMBasedFunctionProvider(
+        provider="openai",
+        model="gpt-4",
+        name="fake",
+        required_auth_keys=set(),
+        type="llm",
+        llm=build_llm(),
+    )
+    config = Config(openai_api_key="sk-a")
+
+    async def run_twice():
+        responses = []
+        for _ in range(2):
+            responses.append(await provider.arun("show me shoes", [], config))
+        return responses
+
+    for _ in range(runs):
+        responses = asyncio.run(run_twice())
+        assert all(response.is_function_call for response in responses)
+
+    stats = pool.get_stats()
+    # reused within a loop, rebuilt for each new one
+    assert stats["hits"] == runs
+    assert stats["misses"] == runs
+    assert stats["loop_evictions"] == runs
+    assert stats["clients"] == 0
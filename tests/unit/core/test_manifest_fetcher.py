@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from openplugin.core.manifest_fetcher import ManifestFetcher
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+
+class ManifestHandler(BaseHTTPRequestHandler):
+    body = b""
+    etag = '"v1"'
+    delay_seconds = 0.0
+    requests_seen: list = []
+    current_server = None
+
+    def do_GET(self):
+        # a background revalidation of a previous test may still reach its
+        # own server, so only count requests to the current one
+        if self.server is ManifestHandler.current_server:
+            ManifestHandler.requests_seen.append(dict(self.headers))
+        time.sleep(ManifestHandler.delay_seconds)
+        if self.headers.get("If-None-Match") == ManifestHandler.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", ManifestHandler.etag)
+        self.end_headers()
+        self.wfile.write(ManifestHandler.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def manifest_url():
+    with open(test_file_path, "rb") as f:
+        ManifestHandler.body = f.read()
+    ManifestHandler.etag = '"v1"'
+    ManifestHandler.delay_seconds = 0.0
+    ManifestHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ManifestHandler)
+    ManifestHandler.current_server = server
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/openapi.json"
+    server.shutdown()
+
+
+@pytest.mark.parametrize("ttl_seconds", [60])
+def test_fresh_manifest_is_served_from_memory(manifest_url, ttl_seconds, tmp_path):
+    fetcher = ManifestFetcher(cache_dir=str(tmp_path), ttl_seconds=ttl_seconds)
+    first = fetcher.fetch(manifest_url)
+    second = fetcher.fetch(manifest_url)
+
+    assert first is second
+    assert first.etag == '"v1"'
+    assert first.get_json()["x-openplugin"]["name"] == "Sample Store"
+    assert len(ManifestHandler.requests_seen) == 1
+    assert fetcher.get_stats()["hits"] == 1
+
+
+@pytest.mark.parametrize("etag", ['"v1"'])
+def test_expired_manifest_is_revalidated(manifest_url, etag, tmp_path):
+    fetcher = ManifestFetcher(
+        cache_dir=str(tmp_path), ttl_seconds=0, stale_ttl_seconds=0
+    )
+    first = fetcher.fetch(manifest_url)
+    second = fetcher.fetch(manifest_url)
+
+    assert ManifestHandler.requests_seen[1].get("If-None-Match") == etag
+    assert fetcher.get_stats()["not_modified"] == 1
+    assert second.content == first.content
+    assert second.fetched_at >= first.fetched_at
+
+
+@pytest.mark.parametrize("new_etag", ['"v2"'])
+def test_stale_manifest_is_served_while_revalidating(manifest_url, new_etag, tmp_path):
+    fetcher = ManifestFetcher(
+        cache_dir=str(tmp_path), ttl_seconds=0, stale_ttl_seconds=60
+    )
+    first = fetcher.fetch(manifest_url)
+    ManifestHandler.etag = new_etag
+
+    # served immediately from the store, refreshed in the background
+    assert fetcher.fetch(manifest_url) is first
+    for _ in range(50):
+        if fetcher.fetch(manifest_url).etag == new_etag:
+            break
+        time.sleep(0.05)
+    assert fetcher.fetch(manifest_url).etag == new_etag
+    assert fetcher.get_stats()["stale_hits"] >= 1
+
+
+@pytest.mark.parametrize("concurrency", [8])
+def test_concurrent_fetches_are_collapsed(manifest_url, concurrency, tmp_path):
+    ManifestHandler.delay_seconds = 0.3
+    fetcher = ManifestFetcher(cache_dir=str(tmp_path))
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(
+            executor.map(lambda _: fetcher.fetch(manifest_url), range(concurrency))
+        )
+
+    assert len(ManifestHandler.requests_seen) == 1
+    assert all(result.content == results[0].content for result in results)
+
+
+@pytest.mark.parametrize("ttl_seconds", [60])
+def test_manifest_is_loaded_from_disk(manifest_url, ttl_seconds, tmp_path):
+    ManifestFetcher(cache_dir=str(tmp_path), ttl_seconds=ttl_seconds).fetch(
+        manifest_url
+    )
+    fetcher = ManifestFetcher(cache_dir=str(tmp_path), ttl_seconds=ttl_seconds)
+    manifest = fetcher.fetch(manifest_url)
+
+    assert len(ManifestHandler.requests_seen) == 1
+    assert json.loads(manifest.content) == json.loads(ManifestHandler.body)
@@ -0,0 +1,65 @@
+import io
+import json
+
+import pytest
+
+from openplugin.core import plugin_cache as plugin_cache_module
+from openplugin.core.openapi_stream import iter_file_chunks, read_openapi_doc
+from openplugin.core.plugin import PluginBuilder
+from openplugin.core.plugin_cache import CompiledPluginCache, compile_plugin
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+
+def load_doc():
+    with open(test_file_path, "r") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_read_openapi_doc_in_chunks(chunk_size, indent):
+    doc = load_doc()
+    doc["x-values"] = [12345678901234567890, -1.5e-10, 'snow ☃ "quoted"', None]
+    data = json.dumps(doc, indent=indent, ensure_ascii=False).encode("utf-8")
+
+    assert read_openapi_doc(iter_file_chunks(io.BytesIO(data), chunk_size)) == doc
+
+
+@pytest.mark.parametrize(
+    "data", [b'{"paths": {"/a": {}},}', b'{"paths": {"/a": ', b"[1]", b'{"a": tru}']
+)
+def test_read_invalid_openapi_doc(data):
+    with pytest.raises(json.JSONDecodeError):
+        read_openapi_doc(iter_file_chunks(io.BytesIO(data), 4))
+
+
+@pytest.mark.parametrize("openapi_doc_file", [test_file_path])
+def test_streaming_compile_matches_full_compile(openapi_doc_file):
+    full = compile_plugin(
+        "full", lambda: PluginBuilder.build_from_openapi_doc_file(openapi_doc_file)
+    )
+    streaming = compile_plugin(
+        "streaming",
+        lambda: PluginBuilder.build_from_openapi_doc_file(
+            openapi_doc_file, streaming=True
+        ),
+        resolve_per_operation=True,
+    )
+
+    assert streaming.plugin.openapi_doc_obj == full.plugin.openapi_doc_obj
+    assert streaming.plugin.plugin_op_property_map == full.plugin.plugin_op_property_map
+    assert streaming.functions.get_litellm_json() == full.functions.get_litellm_json()
+
+
+@pytest.mark.parametrize("openapi_doc_file", [test_file_path])
+def test_cache_streams_large_files(monkeypatch, openapi_doc_file):
+    monkeypatch.setattr(plugin_cache_module, "STREAMING_MIN_BYTES", 0)
+    cache = CompiledPluginCache()
+
+    compiled_plugin = cache.get_or_compile_from_file(openapi_doc_file)
+
+    assert compiled_plugin.plugin.name == "Sample Store"
+    assert cache.get_or_compile_from_file(openapi_doc_file) is compiled_plugin
+    monkeypatch.setattr(plugin_cache_module, "STREAMING_MIN_BYTES", 1 << 30)
+    assert cache.get_or_compile_from_file(openapi_doc_file) is compiled_plugin
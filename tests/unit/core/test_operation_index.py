@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from openplugin.core.config import Config
+from openplugin.core.execution.implementations.operation_execution_with_imprompt import (  # noqa: E501
+    OperationExecutionWithImprompt,
+)
+from openplugin.core.execution.operation_execution import OperationExecutionParams
+from openplugin.core.function_providers import FunctionProviders
+from openplugin.core.plugin import PluginBuilder
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+
+@pytest.fixture(scope="module")
+def plugin():
+    with open(test_file_path, "r") as f:
+        return PluginBuilder.build_from_openapi_doc_obj(json.load(f))
+
+
+@pytest.mark.parametrize(
+    "path,method,url_template",
+    [
+        ("/products", "get", "https://store.example.com/api/products"),
+        ("/PRODUCTS", "GET", "https://store.example.com/api/products"),
+        ("/orders/{orderId}", "get", "https://store.example.com/api/orders/{orderId}"),
+    ],
+)
+def test_index_lookup(plugin, path, method, url_template):
+    entry = plugin.operation_index.get(path, method)
+    assert entry is not None
+    assert entry.url_template == url_template
+    assert entry.operation == plugin.plugin_op_property_map[entry.path][entry.method]
+
+
+@pytest.mark.parametrize(
+    "operation,method,expected_names",
+    [
+        ("/products", "get", ["default_cleanup_response", "product_names"]),
+        (
+            "https://store.example.com/api/products",
+            "get",
+            ["default_cleanup_response", "product_names"],
+        ),
+        ("/products", "post", ["default_cleanup_response"]),
+        ("/orders", "get", ["default_cleanup_response"]),
+    ],
+)
+def test_supported_output_modules(plugin, operation, method, expected_names):
+    modules = plugin.get_supported_output_modules(operation, method)
+    assert [module.name for module in modules] == expected_names
+    assert plugin.get_filter_module(operation, method) is None
+
+
+@pytest.mark.parametrize(
+    "path,method,expected_required",
+    [
+        ("/products", "get", ["q"]),
+        ("/orders", "post", ["productId", "quantity"]),
+        ("/orders/{orderId}", "get", ["orderId"]),
+    ],
+)
+def test_missing_required_parameters(plugin, path, method, expected_required):
+    entry = plugin.operation_index.get(path, method)
+    assert [p["name"] for p in entry.required_parameters] == expected_required
+
+    for operation_index in [plugin.operation_index, None]:
+        params = OperationExecutionParams(
+            config=Config(),
+            api=entry.url_template,
+            path=path,
+            method=method,
+            query_params={},
+            body=None,
+            header={},
+            response_obj_200=None,
+            function_provider=FunctionProviders.build().get_default_provider(),
+            plugin_op_property_map=plugin.plugin_op_property_map,
+            operation_index=operation_index,
+        )
+        missing = OperationExecutionWithImprompt(
+            params
+        ).get_missing_required_parameter()
+        assert [p["name"] for p in missing] == expected_required
+
+
+@pytest.mark.parametrize(
+    "path,method,lookup_path",
+    [("/orders", "get", "/orders/{orderId}")],
+)
+def test_x_lookup_specs(plugin, path, method, lookup_path):
+    entry = plugin.operation_index.get(path, method)
+    assert len(entry.x_lookups) == 1
+    assert entry.x_lookups[0]["path"] == lookup_path
+    assert entry.x_lookups[0]["parameter_name"] is None
+    lookup_entry = plugin.operation_index.get(lookup_path, "get")
+    assert lookup_entry.query_parameter_names == ()
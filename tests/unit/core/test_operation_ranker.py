@@ -0,0 +1,83 @@
+import json
+
+import numpy as np
+import pytest
+
+from openplugin.core.operation_ranker import OperationRanker, tokenize
+from openplugin.core.plugin_cache import CompiledPluginCache
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+
+@pytest.fixture(scope="module")
+def functions():
+    with open(test_file_path, "r") as f:
+        return CompiledPluginCache().get_or_compile(json.load(f)).functions
+
+
+@pytest.mark.parametrize(
+    "text,tokens",
+    [
+        ("get_products_productId", ["product", "product", "id"]),
+        ("List the recent orderIds", ["list", "recent", "order", "id"]),
+        ("Show me the address", ["show", "address"]),
+    ],
+)
+def test_tokenize(text, tokens):
+    assert tokenize(text) == tokens
+
+
+@pytest.mark.parametrize(
+    "query,best",
+    [("show me a winter jacket", 0), ("place an order", 2), ("weather", None)],
+)
+def test_bm25_scores(query, best):
+    ranker = OperationRanker(
+        [
+            tokenize("search products, show winter jackets"),
+            tokenize("product by id"),
+            tokenize("place an order for a product"),
+        ]
+    )
+    scores = ranker.score(query)
+    assert scores.shape == (3,)
+    if best is None:
+        assert not np.any(scores)
+    else:
+        assert int(np.argmax(scores)) == best
+
+
+@pytest.mark.parametrize(
+    "prompt,top_k,min_score,expected",
+    [
+        ("place an order for 2 pairs", 2, 0.2, ["post_orders", "get_orders_orderId"]),
+        ("place an order for 2 pairs", 2, 0.5, ["post_orders"]),
+        ("show me some winter jackets", 1, 0.2, ["get_products"]),
+        ("what's the weather tomorrow", 2, 0.2, None),
+        ("place an order", 0, 0.2, None),
+        ("place an order", 5, 0.2, None),
+    ],
+)
+def test_functions_shortlist(functions, prompt, top_k, min_score, expected):
+    shortlisted, report = functions.get_shortlist(
+        prompt, top_k=top_k, min_score=min_score
+    )
+
+    if top_k == 0:
+        assert report is None
+    else:
+        assert report.applied == (expected is not None)
+    if expected is None:
+        assert shortlisted is functions
+        return
+
+    assert [op.name for op in report.shortlist] == expected
+    scores = [op.score for op in report.shortlist]
+    assert scores == sorted(scores, reverse=True)
+    assert report.margin == pytest.approx(scores[-1] - report.next_score, abs=1e-3)
+    # tools keep the plugin order
+    names = [f.name for f in functions.functions]
+    assert [f.name for f in shortlisted.functions] == sorted(expected, key=names.index)
+    for func in shortlisted.functions:
+        assert func is functions.get_function_from_func_name(func.name)
+        assert shortlisted.get_plugin_from_func_name(func.name) is not None
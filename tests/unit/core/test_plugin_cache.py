@@ -0,0 +1,109 @@
+import copy
+import json
+
+import pytest
+
+from openplugin.core.functions import Functions
+from openplugin.core.plugin import PluginBuilder
+from openplugin.core.plugin_cache import (
+    CompiledPluginCache,
+    compute_openapi_doc_hash,
+)
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+
+def load_openapi_doc():
+    with open(test_file_path, "r") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("openapi_doc_file", [test_file_path])
+def test_openapi_doc_hash_is_stable(openapi_doc_file):
+    with open(openapi_doc_file, "r") as f:
+        openapi_doc = json.load(f)
+    reordered_doc = dict(reversed(list(openapi_doc.items())))
+    assert compute_openapi_doc_hash(openapi_doc) == compute_openapi_doc_hash(
+        reordered_doc
+    )
+    changed_doc = copy.deepcopy(openapi_doc)
+    changed_doc["info"]["version"] = "2.0.0"
+    assert compute_openapi_doc_hash(openapi_doc) != compute_openapi_doc_hash(
+        changed_doc
+    )
+
+
+@pytest.mark.parametrize("repeat", [3])
+def test_compiled_plugin_is_reused(repeat):
+    cache = CompiledPluginCache()
+    openapi_doc = load_openapi_doc()
+    original_doc = copy.deepcopy(openapi_doc)
+
+    first = cache.get_or_compile(openapi_doc)
+    for _ in range(repeat):
+        assert cache.get_or_compile(load_openapi_doc()) is first
+
+    # compiling must not modify the caller's document
+    assert openapi_doc == original_doc
+    assert first.plugin.content_hash == first.key
+    assert set(first.get_plugin_op_property_map().keys()) == set(
+        openapi_doc["paths"].keys()
+    )
+    stats = cache.get_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == repeat
+    assert stats["entries"] == 1
+    assert stats["memory_bytes"] == first.size_bytes > 0
+
+
+@pytest.mark.parametrize(
+    "selected_operations,expected_names",
+    [
+        (None, ["get_products", "get_products_productId", "post_orders"]),
+        (["get<PATH>/products"], ["get_products"]),
+        (["post<PATH>/orders"], ["post_orders"]),
+    ],
+)
+def test_cached_functions_match_uncached(selected_operations, expected_names):
+    cache = CompiledPluginCache()
+    openapi_doc = load_openapi_doc()
+    compiled_plugin = cache.get_or_compile(openapi_doc)
+
+    cached = Functions()
+    cached.add_from_plugin(compiled_plugin.plugin, selected_operations)
+    uncached = Functions()
+    uncached.add_from_plugin(
+        PluginBuilder.build_from_openapi_doc_obj(load_openapi_doc()),
+        selected_operations,
+    )
+
+    assert cached.get_json() == uncached.get_json()
+    for name in expected_names:
+        assert cached.get_function_from_func_name(name) is not None
+        assert cached.get_plugin_from_func_name(name) is compiled_plugin.plugin
+
+
+@pytest.mark.parametrize("max_entries", [2])
+def test_lru_eviction(max_entries):
+    cache = CompiledPluginCache(max_entries=max_entries)
+    keys = []
+    for version in range(max_entries + 1):
+        openapi_doc = load_openapi_doc()
+        openapi_doc["info"]["version"] = str(version)
+        keys.append(cache.get_or_compile(openapi_doc).key)
+
+    assert cache.peek(keys[0]) is None
+    assert all(cache.peek(key) is not None for key in keys[1:])
+    assert cache.get_stats()["evictions"] == 1
+
+
+@pytest.mark.parametrize("max_memory_bytes", [1])
+def test_memory_ceiling_keeps_latest_entry(max_memory_bytes):
+    cache = CompiledPluginCache(max_memory_bytes=max_memory_bytes)
+    first = cache.get_or_compile(load_openapi_doc())
+    openapi_doc = load_openapi_doc()
+    openapi_doc["info"]["version"] = "2.0.0"
+    second = cache.get_or_compile(openapi_doc)
+
+    assert cache.peek(first.key) is None
+    assert cache.peek(second.key) is second
@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from openplugin.core import plugin_loader
+from openplugin.core.functions import Functions
+from openplugin.core.manifest_fetcher import ManifestFetcher
+from openplugin.core.plugin_cache import CompiledPluginCache
+from openplugin.core.plugin_loader import FunctionNameCollisionError
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+DELAY_SECONDS = 0.3
+
+
+def load_doc(name=None, path_prefix=""):
+    with open(test_file_path, "r") as f:
+        doc = json.load(f)
+    if name:
+        doc["x-openplugin"]["name"] = name
+    doc["paths"] = {path_prefix + path: obj for path, obj in doc["paths"].items()}
+    return doc
+
+
+DOCS = {
+    "/store.json": load_doc(),
+    "/store_v2.json": load_doc("Sample Store V2", path_prefix="/v2"),
+    "/store_copy.json": load_doc("Sample Store Copy"),
+}
+
+
+class DocHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(DELAY_SECONDS)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(DOCS[self.path]).encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def base_url(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        plugin_loader, "manifest_fetcher", ManifestFetcher(cache_dir=str(tmp_path))
+    )
+    monkeypatch.setattr(plugin_loader, "compiled_plugin_cache", CompiledPluginCache())
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DocHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.mark.parametrize(
+    "paths,selected_operations,expected_names",
+    [
+        (
+            ["/store.json", "/store_v2.json"],
+            None,
+            [
+                "get_products",
+                "get_products_productId",
+                "post_orders",
+                "get_orders",
+                "get_orders_orderId",
+                "get_v2_products",
+                "get_v2_products_productId",
+                "post_v2_orders",
+                "get_v2_orders",
+                "get_v2_orders_orderId",
+            ],
+        ),
+        (
+            ["/store_v2.json", "/store.json"],
+            {
+                "/store.json": ["get<PATH>/orders"],
+                "/store_v2.json": ["post<PATH>/v2/orders"],
+            },
+            ["post_v2_orders", "get_orders"],
+        ),
+        (["/store.json", "/store.json"], None, None),
+    ],
+)
+def test_from_plugins_fetches_concurrently(
+    base_url, paths, selected_operations, expected_names
+):
+    urls = [base_url + path for path in paths]
+    if selected_operations is not None:
+        selected_operations = {
+            base_url + path: ops for path, ops in selected_operations.items()
+        }
+
+    start_time = time.perf_counter()
+    functions = Functions.from_plugins(urls, selected_operations)
+    elapsed = time.perf_counter() - start_time
+
+    # one download time, a url listed twice is downloaded once
+    assert elapsed < DELAY_SECONDS * 1.8
+    if expected_names is None:
+        expected_names = [f.name for f in functions.functions]
+        assert len(expected_names) == 5
+    assert [f.name for f in functions.functions] == expected_names
+    assert list(functions.function_map) == expected_names
+    for func in functions.functions:
+        plugin = functions.get_plugin_from_func_name(func.name)
+        assert plugin.name == (
+            "Sample Store V2" if "_v2_" in func.name else "Sample Store"
+        )
+
+
+@pytest.mark.parametrize("order", [[0, 1, 2], [2, 1, 0]])
+def test_from_plugins_reports_collisions_in_url_order(base_url, order):
+    paths = ["/store.json", "/store_v2.json", "/store_copy.json"]
+    urls = [base_url + paths[index] for index in order]
+
+    with pytest.raises(FunctionNameCollisionError) as e:
+        Functions.from_plugins(urls)
+
+    first, last = urls[0], urls[-1]
+    assert list(e.value.collisions) == [
+        "get_products",
+        "get_products_productId",
+        "post_orders",
+        "get_orders",
+        "get_orders_orderId",
+    ]
+    assert all(owners == [first, last] for owners in e.value.collisions.values())
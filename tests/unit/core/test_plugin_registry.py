@@ -0,0 +1,88 @@
+import json
+import shutil
+
+import pytest
+
+from openplugin.core import plugin_cache, plugin_registry
+from openplugin.core.functions import Functions
+from openplugin.core.plugin_cache import CompiledPluginCache, compute_openapi_doc_hash
+from openplugin.core.plugin_registry import PluginRegistry, PluginRegistryError
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+
+@pytest.fixture
+def registry():
+    return PluginRegistry(plugin_cache=CompiledPluginCache(max_entries=1))
+
+
+@pytest.mark.parametrize("openapi_doc_file", [test_file_path])
+def test_register_once_and_get_by_id(registry, openapi_doc_file):
+    with open(openapi_doc_file, "r") as f:
+        openapi_doc_obj = json.load(f)
+
+    registration = registry.register(openapi_doc_obj)
+    assert registration.plugin_id == compute_openapi_doc_hash(openapi_doc_obj)
+    assert registration.name == "Sample Store"
+    assert registration.operation_count == 5
+    assert registration.size_bytes > 0
+    assert registry.register(openapi_doc_obj) is registration
+
+    compiled_plugin = registry.get(registration.plugin_id)
+    assert compiled_plugin.plugin.name == "Sample Store"
+
+    # registered plugins stay hot even when the plugin cache evicts them
+    registry.plugin_cache.get_or_compile({**openapi_doc_obj, "info": {}})
+    assert registry.plugin_cache.peek(registration.plugin_id) is None
+    assert registry.get(registration.plugin_id) is compiled_plugin
+
+
+@pytest.mark.parametrize(
+    "openapi_doc_file,selected_operations",
+    [(test_file_path, None), (test_file_path, ["get<PATH>/products"])],
+)
+def test_evicted_registered_plugin_is_not_recompiled(
+    monkeypatch, registry, openapi_doc_file, selected_operations
+):
+    monkeypatch.setattr(plugin_cache, "compiled_plugin_cache", registry.plugin_cache)
+    monkeypatch.setattr(plugin_registry, "plugin_registry", registry)
+    with open(openapi_doc_file, "r") as f:
+        openapi_doc_obj = json.load(f)
+    compiled_plugin = registry.get(registry.register(openapi_doc_obj).plugin_id)
+    registry.plugin_cache.get_or_compile({**openapi_doc_obj, "info": {}})
+    assert registry.plugin_cache.peek(compiled_plugin.key) is None
+
+    functions = Functions()
+    functions.add_from_plugin(compiled_plugin.plugin, selected_operations)
+
+    compiled_functions = compiled_plugin.functions.functions
+    assert functions.functions
+    assert all(
+        any(func is compiled for compiled in compiled_functions)
+        for func in functions.functions
+    )
+
+
+@pytest.mark.parametrize("plugin_id", ["unknown"])
+def test_unknown_plugin_id(registry, plugin_id):
+    with pytest.raises(PluginRegistryError) as e:
+        registry.get(plugin_id)
+    assert e.value.status_code == 404
+    with pytest.raises(PluginRegistryError):
+        registry.unregister(plugin_id)
+
+
+@pytest.mark.parametrize("openapi_doc_file", [test_file_path])
+def test_preload_dir(registry, tmp_path, openapi_doc_file):
+    shutil.copy(openapi_doc_file, tmp_path / "store.json")
+    (tmp_path / "broken.json").write_text("{not json")
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    registrations = registry.preload_dir(str(tmp_path))
+
+    assert [r.name for r in registrations] == ["Sample Store"]
+    assert registrations[0].source == str(tmp_path / "store.json")
+    assert registry.get_stats()["plugins"] == 1
+
+    registry.unregister(registrations[0].plugin_id)
+    assert registry.list() == []
@@ -0,0 +1,66 @@
+import pytest
+
+from openplugin.core.plugin_cache import CompiledPluginCache
+from openplugin.core.plugin_registry import PluginRegistry
+from openplugin.core.plugin_snapshot import (
+    SNAPSHOT_MAGIC,
+    PluginSnapshotError,
+    SnapshotHeader,
+    compile_sources,
+    load_snapshot,
+    read_snapshot,
+    write_snapshot,
+)
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+
+@pytest.mark.parametrize("openapi_doc_file", [test_file_path])
+def test_snapshot_roundtrip(tmp_path, openapi_doc_file):
+    compiled_plugins = compile_sources([openapi_doc_file])
+    snapshot_file = str(tmp_path / "plugins.snapshot")
+    header = write_snapshot(compiled_plugins, snapshot_file)
+    assert header.plugin_ids == [compiled_plugins[0].key]
+
+    registry = PluginRegistry(plugin_cache=CompiledPluginCache())
+    loaded = load_snapshot(
+        snapshot_file, registry=registry, plugin_cache=registry.plugin_cache
+    )
+
+    original, restored = compiled_plugins[0], loaded[0]
+    assert restored.key == original.key
+    assert restored.functions.get_json() == original.functions.get_json()
+    assert restored.plugin.plugin_op_property_map == (
+        original.plugin.plugin_op_property_map
+    )
+    entry = restored.plugin.operation_index.get("/products", "get")
+    assert entry.url_template == "https://store.example.com/api/products"
+    assert registry.get(original.key) is restored
+    assert registry.plugin_cache.peek(original.key) is restored
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        SnapshotHeader(format_version=0),
+        # written before compiled functions were slotted records
+        SnapshotHeader(format_version=1),
+        SnapshotHeader(pydantic_version="1.10.0"),
+        SnapshotHeader(python_version="2.7.18"),
+    ],
+)
+def test_incompatible_snapshot_is_rejected(tmp_path, header):
+    snapshot_file = tmp_path / "plugins.snapshot"
+    snapshot_file.write_bytes(
+        SNAPSHOT_MAGIC + header.model_dump_json().encode("utf-8") + b"\n"
+    )
+    with pytest.raises(PluginSnapshotError):
+        read_snapshot(str(snapshot_file))
+
+
+@pytest.mark.parametrize("content", [b"not a snapshot\n"])
+def test_unknown_file_is_rejected(tmp_path, content):
+    snapshot_file = tmp_path / "plugins.snapshot"
+    snapshot_file.write_bytes(content)
+    with pytest.raises(PluginSnapshotError):
+        read_snapshot(str(snapshot_file))
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from openplugin.core import plugin_validation
+from openplugin.core.plugin_validation import expand_sources, validate_plugins
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_validate_plugins_reports_every_source(tmp_path, max_workers):
+    with open(test_file_path, "r") as f:
+        openapi_doc_obj = json.load(f)
+    (tmp_path / "store.json").write_text(json.dumps(openapi_doc_obj))
+    (tmp_path / "invalid.json").write_text(json.dumps({"openapi": "3.0.1"}))
+    sources = [*expand_sources([str(tmp_path)]), openapi_doc_obj]
+
+    results = {
+        result.source: result
+        for result in validate_plugins(sources, max_workers=max_workers)
+    }
+
+    assert len(results) == 3
+    invalid = results[str(tmp_path / "invalid.json")]
+    assert not invalid.valid
+    assert "x-openplugin is missing" in invalid.error
+
+    for source in [str(tmp_path / "store.json"), "openapi_doc_objs[2] Sample Store"]:
+        result = results[source]
+        assert result.valid
+        assert result.plugin_name == "Sample Store"
+        assert result.function_count == 5
+        assert result.tool_json_tokens > 0
+        assert result.tool_json_bytes > result.tool_json_tokens
+
+
+@pytest.mark.parametrize("max_workers", [2])
+def test_validations_share_one_pool(max_workers):
+    with open(test_file_path, "r") as f:
+        openapi_doc_obj = json.load(f)
+    sources = [openapi_doc_obj] * 3
+
+    for _ in range(2):
+        results = list(validate_plugins(sources, max_workers=max_workers))
+        assert [result.valid for result in results] == [True] * 3
+
+    executor = plugin_validation.get_executor()
+    assert executor is plugin_validation.get_executor()
+    assert executor._mp_context.get_start_method() != "fork"
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_files_are_not_read_when_not_allowed(tmp_path, max_workers):
+    (tmp_path / "store.json").write_text(open(test_file_path).read())
+    sources = [str(tmp_path / "store.json"), str(tmp_path / "missing.json")]
+
+    results = list(
+        validate_plugins(sources, max_workers=max_workers, allow_files=False)
+    )
+
+    assert len(results) == 2
+    # existing and missing files can't be told apart
+    assert {result.error for result in results} == {"Only http(s) urls are supported"}
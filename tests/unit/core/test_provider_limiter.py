@@ -0,0 +1,217 @@
+import asyncio
+import threading
+import time
+
+import litellm
+import pytest
+
+from openplugin.core import provider_limiter
+from openplugin.core.config import Config
+from openplugin.core.function_providers import FunctionLLM, LLMConfig
+from openplugin.core.provider_limiter import (
+    ProviderLimit,
+    ProviderLimiter,
+    ProviderQueueTimeoutError,
+    _Ticket,
+    estimate_tokens,
+)
+from openplugin.utils.llm_manager_handler import get_llm_response_from_messages
+
+
+def run_concurrently(limiter, count, hold_seconds, **limits):
+    order = []
+
+    async def call(index):
+        async with limiter.alimit("openai", "sk-test", **limits) as lease:
+            order.append(index)
+            await asyncio.sleep(hold_seconds)
+        return lease
+
+    async def main():
+        tasks = []
+        for index in range(count):
+            tasks.append(asyncio.ensure_future(call(index)))
+            # queue in a known order
+            await asyncio.sleep(0)
+        return await asyncio.gather(*tasks)
+
+    return asyncio.run(main()), order
+
+
+@pytest.mark.parametrize(
+    "max_in_flight,expected_seconds", [(1, 0.4), (2, 0.2), (4, 0.1)]
+)
+def test_in_flight_limit_queues_in_order(max_in_flight, expected_seconds):
+    limiter = ProviderLimiter({"openai": {"max_in_flight": max_in_flight}})
+
+    start_time = time.monotonic()
+    leases, order = run_concurrently(limiter, 4, 0.1)
+    elapsed = time.monotonic() - start_time
+
+    assert order == [0, 1, 2, 3]
+    assert expected_seconds <= elapsed < expected_seconds + 0.15
+    [stats] = limiter.get_stats().values()
+    assert stats["granted"] == 4
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
+    assert stats["max_wait_seconds"] == pytest.approx(
+        max(lease.wait_seconds for lease in leases), abs=1e-3
+    )
+
+
+@pytest.mark.parametrize(
+    "requests_per_minute,tokens_per_minute,tokens,expected_wait",
+    [
+        # one request per second
+        (60, 0, 0, 1.0),
+        # 600 tokens per second
+        (0, 36000, 300, 0.5),
+        # estimates above the bucket size only wait for a full bucket
+        (0, 600, 10000, 60.0),
+    ],
+)
+def test_empty_buckets_delay_the_next_request(
+    requests_per_minute, tokens_per_minute, tokens, expected_wait
+):
+    limit = ProviderLimit(
+        "openai",
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+    )
+    for bucket in [limit.requests, limit.tokens]:
+        if bucket is not None:
+            bucket.tokens = 0
+
+    wait_seconds = limit._enqueue(_Ticket(tokens, None))
+
+    assert wait_seconds == pytest.approx(expected_wait, rel=0.05)
+    assert limit.get_stats()["queue_depth"] == 1
+
+
+@pytest.mark.parametrize(
+    "tokens_used,expected_tokens", [(100, 900), (900, 100), (1600, -600)]
+)
+def test_release_settles_the_token_estimate(tokens_used, expected_tokens):
+    limit = ProviderLimit("openai", tokens_per_minute=1000)
+
+    lease = limit.acquire(600)
+    lease.tokens_used = tokens_used
+    limit.release(lease)
+
+    assert limit.tokens.tokens == pytest.approx(expected_tokens, abs=1)
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_queue_timeout_raises_and_frees_the_queue(mode):
+    limit = ProviderLimit("openai", max_in_flight=1, queue_timeout_seconds=0.1)
+    held = limit.acquire()
+
+    with pytest.raises(ProviderQueueTimeoutError) as e:
+        if mode == "sync":
+            limit.acquire()
+        else:
+            asyncio.run(limit.aacquire())
+
+    assert e.value.provider == "openai"
+    assert e.value.wait_seconds >= 0.1
+    stats = limit.get_stats()
+    assert stats["timeouts"] == 1
+    assert stats["queue_depth"] == 0
+    limit.release(held)
+    assert limit.get_stats()["in_flight"] == 0
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_waiter_is_woken_on_release(mode):
+    limit = ProviderLimit("openai", max_in_flight=1, queue_timeout_seconds=5)
+    held = limit.acquire()
+    timer = threading.Timer(0.1, limit.release, args=[held])
+    timer.start()
+
+    start_time = time.monotonic()
+    if mode == "sync":
+        lease = limit.acquire()
+    else:
+        lease = asyncio.run(limit.aacquire())
+    limit.release(lease)
+    timer.join()
+
+    assert 0.08 <= time.monotonic() - start_time < 1
+    assert lease.wait_seconds >= 0.08
+
+
+@pytest.mark.parametrize(
+    "first,second,shared",
+    [
+        (("openai", "sk-1"), ("OpenAI", "sk-1"), True),
+        (("openai", "sk-1"), ("openai", "sk-2"), False),
+        (("openai", "sk-1"), ("anthropic", "sk-1"), False),
+    ],
+)
+def test_limits_are_kept_per_provider_and_api_key(first, second, shared):
+    limiter = ProviderLimiter({})
+
+    assert (limiter.get_limit(*first) is limiter.get_limit(*second)) == shared
+    for key in limiter.get_stats():
+        assert "sk-" not in key
+
+
+@pytest.mark.parametrize(
+    "parts,expected", [(["abcd" * 10], 11), ([None, {"a": 1}], 3), ([], 1)]
+)
+def test_estimate_tokens(parts, expected):
+    assert estimate_tokens(*parts) == expected
+
+
+@pytest.mark.parametrize("cancel_after", [0.05])
+def test_cancelled_waiter_is_not_a_timeout(cancel_after):
+    limit = ProviderLimit("openai", max_in_flight=1, queue_timeout_seconds=5)
+    held = limit.acquire()
+
+    async def main():
+        # e.g. the losing attempt of a hedged request
+        task = asyncio.ensure_future(limit.aacquire())
+        await asyncio.sleep(cancel_after)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    limit.release(held)
+
+    stats = limit.get_stats()
+    assert stats["cancellations"] == 1
+    assert stats["timeouts"] == 0
+    assert stats["queue_depth"] == 0
+    assert stats["in_flight"] == 0
+
+
+@pytest.mark.parametrize(
+    "provider,config_attr",
+    [("togetherai", "together_api_key"), ("openai", "openai_api_key")],
+)
+def test_api_key_is_found_for_provider(monkeypatch, provider, config_attr):
+    monkeypatch.delenv("TOGETHER_API_KEY", raising=False)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    llm = FunctionLLM(provider=provider, model_name="model", configuration=LLMConfig())
+
+    assert llm.get_api_key(Config(**{config_attr: "sk-test"})) == "sk-test"
+
+
+@pytest.mark.parametrize("llm_api_key", [None, "sk-test"])
+def test_llm_manager_limits_by_the_given_key(monkeypatch, llm_api_key):
+    api_keys = []
+
+    class RecordingLimiter:
+        def limit(self, provider, api_key, tokens=0):
+            api_keys.append(api_key)
+            raise ProviderQueueTimeoutError(provider, 0)
+
+    monkeypatch.setattr(provider_limiter, "provider_limiter", RecordingLimiter())
+    monkeypatch.setattr(litellm, "api_key", litellm.api_key)
+
+    with pytest.raises(ProviderQueueTimeoutError):
+        get_llm_response_from_messages(
+            [{"role": "user", "content": "hi"}], "gpt-4", llm_api_key
+        )
+    assert api_keys == [llm_api_key]
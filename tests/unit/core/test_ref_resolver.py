@@ -0,0 +1,91 @@
+import copy
+import json
+
+import jsonref
+import pytest
+
+from openplugin.core.ref_resolver import (
+    RefResolutionError,
+    resolve_refs,
+    to_plain_dict,
+)
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+
+
+@pytest.mark.parametrize("openapi_doc_file", [test_file_path])
+def test_matches_jsonref(openapi_doc_file):
+    with open(openapi_doc_file, "r") as f:
+        openapi_doc = json.load(f)
+    original_doc = copy.deepcopy(openapi_doc)
+
+    resolved = resolve_refs(openapi_doc)
+
+    assert resolved == to_plain_dict(jsonref.JsonRef.replace_refs(openapi_doc))
+    assert openapi_doc == original_doc
+
+
+@pytest.mark.parametrize("ref", ["#/components/schemas/Order"])
+def test_resolved_subtrees_are_shared(ref):
+    with open(test_file_path, "r") as f:
+        openapi_doc = json.load(f)
+
+    resolved = resolve_refs(openapi_doc)
+    request_schema = resolved["paths"]["/orders"]["post"]["requestBody"]["content"][
+        "application/json"
+    ]["schema"]
+    response_schema = resolved["paths"]["/orders"]["post"]["responses"]["200"][
+        "content"
+    ]["application/json"]["schema"]
+
+    assert request_schema is response_schema
+    assert request_schema is not openapi_doc["components"]["schemas"]["Order"]
+    assert "$ref" not in json.dumps(request_schema)
+
+
+@pytest.mark.parametrize("ref", ["#/components/schemas/Node"])
+def test_cycles_are_broken(ref):
+    doc = {
+        "components": {
+            "schemas": {
+                "Node": {
+                    "type": "object",
+                    "properties": {
+                        "value": {"type": "string"},
+                        "children": {"type": "array", "items": {"$ref": ref}},
+                    },
+                }
+            }
+        },
+        "schema": {"$ref": ref},
+    }
+
+    resolved = resolve_refs(doc)
+
+    node = resolved["schema"]
+    assert node["properties"]["value"] == {"type": "string"}
+    assert node["properties"]["children"]["items"] == {"$ref": ref}
+
+
+@pytest.mark.parametrize(
+    "ref,expected",
+    [
+        ("#/definitions/a~1b", {"type": "string"}),
+        ("#/definitions/list/1", {"type": "integer"}),
+    ],
+)
+def test_json_pointer_escapes(ref, expected):
+    doc = {
+        "definitions": {
+            "a/b": {"type": "string"},
+            "list": [{"type": "boolean"}, {"type": "integer"}],
+        },
+        "value": {"$ref": ref},
+    }
+    assert resolve_refs(doc)["value"] == expected
+
+
+@pytest.mark.parametrize("ref", ["#/components/schemas/Missing"])
+def test_missing_ref_raises(ref):
+    with pytest.raises(RefResolutionError):
+        resolve_refs({"components": {"schemas": {}}, "value": {"$ref": ref}})
@@ -0,0 +1,300 @@
+import asyncio
+import json
+import time
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from loguru import logger
+
+from openplugin.core import plugin_execution_pipeline
+from openplugin.core.config import Config
+from openplugin.core.execution.operation_execution import OperationExecutionResponse
+from openplugin.core.function_providers import (
+    FunctionLLM,
+    LLMBasedFunctionProvider,
+    LLMConfig,
+    get_streamed_tool_call,
+)
+from openplugin.core.functions import Functions
+from openplugin.core.plugin import PluginBuilder
+from openplugin.core.plugin_execution_pipeline import PluginExecutionPipeline
+from openplugin.core.port import Port, PortType
+
+test_file_path = "tests/resources/sample_openplugin_doc.json"
+ORDER_OPERATION = "get<PATH>/orders/{orderId}"
+TRAILING_SECONDS = 0.4
+
+# registered by the plugin runner and the api before pipelines run
+try:
+    logger.level("FLOW", no=38, color="<yellow>", icon="🚀")
+except Exception:
+    pass
+
+
+class FakeStreamingModel(BaseChatModel):
+    """Streams the tool call arguments in pieces, then keeps generating."""
+
+    function_name: str = "get_orders_orderId"
+    argument_chunks: list = ['{"order', 'Id": "4', '2"}']
+    trailing_seconds: float = TRAILING_SECONDS
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def bind_tools(self, tools):
+        return self.bind(tools=tools)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for index, args in enumerate(self.argument_chunks):
+            tool_call_chunk = {
+                "name": self.function_name if index == 0 else None,
+                "args": args,
+                "id": "call_1" if index == 0 else None,
+                "index": 0,
+            }
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(content="", tool_call_chunks=[tool_call_chunk])
+            )
+            await asyncio.sleep(0.01)
+        # reasoning models keep generating after the tool call
+        await asyncio.sleep(self.trailing_seconds)
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="", response_metadata={"finish_reason": "tool_calls"}
+            )
+        )
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+
+def build_plugin():
+    with open(test_file_path, "r") as f:
+        return PluginBuilder.build_from_openapi_doc_obj(json.load(f))
+
+
+def build_provider(monkeypatch, model) -> LLMBasedFunctionProvider:
+    monkeypatch.setattr(
+        FunctionLLM, "convert_to_langchain_llm_model", lambda self, config: model
+    )
+    return LLMBasedFunctionProvider(
+        provider="openai",
+        model="gpt-4",
+        name="fake",
+        required_auth_keys=set(),
+        type="llm",
+        llm=FunctionLLM(
+            provider="openai", model_name="gpt-4", configuration=LLMConfig()
+        ),
+    )
+
+
+class FakeOperationExecution:
+    calls: list = []
+
+    def __init__(self, params):
+        self.params = params
+
+    def run(self):
+        FakeOperationExecution.calls.append((self.params.api, time.monotonic()))
+        return OperationExecutionResponse(
+            original_response={"orderId": "42", "status": "shipped"},
+            clarifying_response=None,
+            api_call_status_code=200,
+            api_call_response_seconds=0.0,
+            clarifying_question_status_code=None,
+            clarifying_question_response_seconds=None,
+            llm_calls=None,
+            x_lookup_tracing=None,
+            missing_params=None,
+        )
+
+
+@pytest.mark.parametrize(
+    "args_chunks,expected",
+    [
+        (['{"order'], None),
+        (['{"order', 'Id": "42"'], None),
+        (['{"order', 'Id": "42"}'], ("get_orders_orderId", {"orderId": "42"})),
+        (["{}"], ("get_orders_orderId", {})),
+    ],
+)
+def test_streamed_tool_call_needs_complete_arguments(args_chunks, expected):
+    message = None
+    for index, args in enumerate(args_chunks):
+        chunk = AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                {
+                    "name": "get_orders_orderId" if index == 0 else None,
+                    "args": args,
+                    "id": None,
+                    "index": 0,
+                }
+            ],
+        )
+        message = chunk if message is None else message + chunk
+
+    assert get_streamed_tool_call(message) == expected
+
+
+@pytest.mark.parametrize(
+    "tool_calls,expected",
+    [
+        (
+            [{"name": "get_orders", "args": {"status": "shipped"}, "id": "1"}],
+            ("get_orders", {"status": "shipped"}),
+        ),
+        ([], None),
+    ],
+)
+def test_streamed_tool_call_of_whole_messages(tool_calls, expected):
+    # models that do not stream send a single message
+    message = AIMessage(content="", tool_calls=tool_calls)
+    assert get_streamed_tool_call(message) == expected
+
+
+@pytest.mark.parametrize(
+    "operation,arguments,errors",
+    [
+        (ORDER_OPERATION, {"orderId": "42"}, []),
+        (ORDER_OPERATION, {}, ["missing required parameter orderId"]),
+        (ORDER_OPERATION, {"orderId": 42}, ["orderId is not of type string"]),
+        (
+            ORDER_OPERATION,
+            {"orderId": "42", "status": "shipped"},
+            ["unknown parameter status"],
+        ),
+        ("get<PATH>/products", {"q": "shoes", "limit": 5}, []),
+        (
+            "get<PATH>/products",
+            {"q": "shoes", "limit": True},
+            ["limit is not of type integer"],
+        ),
+        (ORDER_OPERATION, ["42"], ["arguments are not an object"]),
+    ],
+)
+def test_validate_arguments_against_compiled_function(operation, arguments, errors):
+    functions = Functions()
+    functions.add_from_plugin(build_plugin(), [operation])
+
+    assert functions.functions[0].validate_arguments(arguments) == errors
+
+
+@pytest.mark.parametrize(
+    "argument_chunks,method,early_dispatch",
+    [
+        # valid tool call of a get, the api runs while the stream drains
+        (['{"order', 'Id": "4', '2"}'], "get", True),
+        # invalid arguments are only called once the response is complete
+        (['{"orderId": ', "42}"], "get", False),
+        # methods with side effects wait for the complete response
+        (['{"order', 'Id": "4', '2"}'], "post", False),
+    ],
+)
+def test_pipeline_starts_api_call_from_streamed_tool_call(
+    monkeypatch, argument_chunks, method, early_dispatch
+):
+    FakeOperationExecution.calls = []
+    monkeypatch.setattr(
+        plugin_execution_pipeline,
+        "OperationExecutionWithImprompt",
+        FakeOperationExecution,
+    )
+    monkeypatch.setattr(
+        plugin_execution_pipeline, "STREAM_DISPATCH_METHODS", ["get", "head"]
+    )
+    if method == "post":
+        monkeypatch.setattr(
+            plugin_execution_pipeline.Function,
+            "get_api_method",
+            lambda self: "post",
+        )
+    model = FakeStreamingModel(argument_chunks=argument_chunks)
+    pipeline = PluginExecutionPipeline(plugin=build_plugin())
+
+    start_time = time.monotonic()
+    response = asyncio.run(
+        pipeline.start(
+            input=Port(data_type=PortType.TEXT, value="where is order 42"),
+            config=Config(openai_api_key="sk-test", stream_function_call=True),
+            function_provider=build_provider(monkeypatch, model),
+            header={},
+            auth_query_param=None,
+            selected_operations=[ORDER_OPERATION],
+        )
+    )
+    end_time = time.monotonic()
+
+    [(api, called_at)] = FakeOperationExecution.calls
+    assert api == "https://store.example.com/api/orders/42"
+    streaming = response.api_and_signature_detection_step["metadata"]["streaming"]
+    assert streaming["tool_call_seconds"] < TRAILING_SECONDS
+    assert streaming["response_seconds"] >= TRAILING_SECONDS
+    assert streaming["dispatched"] == early_dispatch
+    # path parameters are left out either way
+    assert json.loads(response.session_variables) == {}
+    assert bool(streaming["validation_errors"]) == (argument_chunks[-1] == "42}")
+    # dispatched calls start before the stream is drained
+    assert (called_at < end_time - TRAILING_SECONDS / 2) == early_dispatch
+    [api_trace] = [
+        step for step in pipeline.tracing_steps if step["name"] == "api_execution_step"
+    ]
+    assert api_trace["early_dispatch"] == early_dispatch
+    names = [step["name"] for step in pipeline.tracing_steps]
+    assert names.index("api_and_signature_detection_step") < names.index(
+        "api_execution_step"
+    )
+    assert end_time - start_time < 2
+
+
+@pytest.mark.parametrize("final_order_id", ["41", "42"])
+def test_early_call_is_only_used_for_the_same_signature(monkeypatch, final_order_id):
+    FakeOperationExecution.calls = []
+    monkeypatch.setattr(
+        plugin_execution_pipeline,
+        "OperationExecutionWithImprompt",
+        FakeOperationExecution,
+    )
+    pipeline = PluginExecutionPipeline(plugin=build_plugin())
+    functions = Functions()
+    functions.add_from_plugin(build_plugin(), [ORDER_OPERATION])
+    early_execution: dict = {}
+
+    async def main():
+        dispatched = pipeline._dispatch_plugin_execution(
+            functions.functions[0],
+            {"orderId": "41"},
+            early_execution,
+            config=Config(openai_api_key="sk-test"),
+            header={},
+            auth_query_param=None,
+            function_provider=build_provider(monkeypatch, FakeStreamingModel()),
+        )
+        port = Port(
+            data_type=PortType.JSON,
+            value={
+                "api_called": "https://store.example.com/api/orders/{orderId}",
+                "method": "get",
+                "mapped_operation_parameters": {"orderId": final_order_id},
+            },
+        )
+        return dispatched, await pipeline._get_dispatched_plugin_execution(
+            port, early_execution
+        )
+
+    dispatched, api_execution_step = asyncio.run(main())
+
+    assert dispatched
+    if final_order_id == "41":
+        assert api_execution_step.original_response.value["status"] == "shipped"
+        assert pipeline.tracing_steps[0]["early_dispatch"]
+    else:
+        assert api_execution_step is None
+        assert pipeline.tracing_steps == []